@@ -22,14 +22,31 @@ from hathor import (
 
 PRECISION = Amount(10**20)
 MINIMUM_LIQUIDITY = Amount(10**3)  # Multiplier for minimum liquidity burn
-MAX_POOLS_TO_ITERATE = 1000  # Maximum pools in graph building methods to prevent DoS
+MAX_POOLS_TO_ITERATE = 1000  # Maximum pools handled by a single rebuild_signed_pool_index or backfill_pool_ids call
+MAX_ROUTE_LABELS = 2  # Route labels kept per (token, hops), enough for exact simple paths up to 3 hops
+MAX_ROUTE_EDGES = 6000  # Maximum pool edges examined by a single route search (1000 pools, both ways, 3 hops)
+MAX_SPLIT_ROUTES = 4  # Maximum pool-disjoint routes a split swap is divided across
+MAX_POOLS_PAGE_SIZE = 50  # Maximum pools returned by a single get_pools_page call
+MAX_POOLS_PAGE_SCAN = 200  # Maximum pool keys examined by a single get_pools_page call
+MAX_QUOTE_BATCH_SIZE = 50  # Maximum amounts or percentages quoted by a single batch quote call
+MAX_PATH_BATCH_SIZE = 200  # Maximum requests answered by a single find_best_swap_paths_batch call
+MAX_MIGRATION_BATCH_SIZE = 100  # Maximum addresses migrated by a single migrate_user_states call
+STORAGE_LAYOUT = 2  # Version of the scalar field layout, bumped whenever scalar fields are added
 
 # Price precision constants
 PRICE_PRECISION = 10**8  # 8 decimal places for price calculations (including TWAP)
+TWAP_OBSERVATION_CARDINALITY = 144  # TWAP observations kept per pool
+TWAP_OBSERVATION_INTERVAL = 600  # Minimum seconds between kept TWAP observations (144 * 10 min = 24 hours)
+POOL_STATS_BUCKET_SECONDS = 3600  # Width of a pool statistics bucket
+POOL_STATS_BUCKETS = 168  # Pool statistics buckets kept per pool (7 days)
 MAX_PRICE_IMPACT = Amount(500)  # 5% in basis points (500/10000) for single token ops
 
 # Type alias for pool identifier keys
+# Per-pool containers added along with pool ids are keyed by PoolId. The older
+# ones (pools and the legacy per-user dicts) stay keyed by PoolKey: the legacy
+# per-user entries are moved into pool_user_states on their first write instead.
 PoolKey = str
+PoolId = int  # Sequential pool id, the pool's position in all_pools
 
 
 class PoolState(NamedTuple):
@@ -128,6 +145,29 @@ class InvalidState(NCFail):
     pass
 
 
+class PoolUserState(NamedTuple):
+    """A user's state in a pool, stored as a single (pool, user) entry."""
+
+    liquidity: Amount
+    balance_a: Amount  # Change owed to the user in token_a
+    balance_b: Amount  # Change owed to the user in token_b
+    deposit_value_usd: Amount  # USD value of the position at the last liquidity action
+    cost_basis_a: Amount  # token_a in the position at the last liquidity action (lazy profit tracking)
+    cost_basis_b: Amount  # token_b in the position at the last liquidity action (lazy profit tracking)
+    last_action_timestamp: int
+
+
+EMPTY_POOL_USER_STATE = PoolUserState(
+    liquidity=Amount(0),
+    balance_a=Amount(0),
+    balance_b=Amount(0),
+    deposit_value_usd=Amount(0),
+    cost_basis_a=Amount(0),
+    cost_basis_b=Amount(0),
+    last_action_timestamp=0,
+)
+
+
 class SwapResult(NamedTuple):
     """Result for an executed swap with the details of the execution.
 
@@ -156,6 +196,28 @@ class PoolApiInfo(NamedTuple):
     signer: str | None
 
 
+class PoolStatsBucket(NamedTuple):
+    """Swap statistics of a pool over one POOL_STATS_BUCKET_SECONDS period."""
+
+    period: int  # timestamp // POOL_STATS_BUCKET_SECONDS
+    volume_a: Amount
+    volume_b: Amount
+    fee_a: Amount  # Swap fees charged in token_a, including the protocol share
+    fee_b: Amount  # Swap fees charged in token_b, including the protocol share
+    transactions: Amount
+
+
+class PoolStats(NamedTuple):
+    """Swap statistics of a pool over a recent window, as returned by get_pool_stats."""
+
+    volume_a: Amount
+    volume_b: Amount
+    fee_a: Amount
+    fee_b: Amount
+    transactions: Amount
+    window_start: int  # Timestamp the statistics start from
+
+
 class PoolInfo(NamedTuple):
     """Detailed information about a pool."""
 
@@ -173,6 +235,15 @@ class PoolInfo(NamedTuple):
     signer: str | None
 
 
+class PoolsPage(NamedTuple):
+    """A page of pools with their details, as returned by get_pools_page."""
+
+    pool_keys: list[str]
+    pools: list[PoolInfo]
+    api_pools: list[PoolApiInfo]
+    next_cursor: int | None  # Opaque cursor for the next page, None when the listing is exhausted
+
+
 class UserInfo(NamedTuple):
     """Detailed information about a user's position in a pool."""
 
@@ -199,6 +270,23 @@ class UserPosition(NamedTuple):
     token_b: str
 
 
+class LiquiditySnapshot(NamedTuple):
+    """Pool state and one position in it, read together by integrating contracts."""
+
+    token_a: str
+    token_b: str
+    reserve_a: Amount
+    reserve_b: Amount
+    total_liquidity: Amount
+    liquidity: Amount  # The address's liquidity in the pool
+    token0Amount: Amount  # The address's share of reserve_a
+    token1Amount: Amount  # The address's share of reserve_b
+    twap_price_a: Amount  # Windowed TWAP of token_b per token_a, 0 without liquidity
+    twap_price_b: Amount  # Windowed TWAP of token_a per token_b, 0 without liquidity
+    htr_price_usd: Amount  # Stored USD price of HTR, 0 if not available
+    quote_amount: Amount  # Other-token amount to pair with amount_in when adding liquidity
+
+
 class SwapPathInfo(NamedTuple):
     """Information about the best swap path between tokens."""
 
@@ -208,6 +296,15 @@ class SwapPathInfo(NamedTuple):
     price_impact: Amount
 
 
+class RouteLabel(NamedTuple):
+    """A partial route in the hop-indexed route search."""
+
+    amount: Amount
+    prev_token: TokenUid
+    pool_key: str
+    prev_rank: int  # Index of the predecessor label at (prev_token, hops - 1)
+
+
 class SwapPathExactOutputInfo(NamedTuple):
     """Information about the best swap path for exact output swaps."""
 
@@ -217,6 +314,32 @@ class SwapPathExactOutputInfo(NamedTuple):
     price_impact: Amount
 
 
+class SplitSwapInfo(NamedTuple):
+    """Information about the best division of a swap across pool-disjoint routes."""
+
+    paths: list[str]  # Comma-separated pool keys of each route
+    amounts_in: list[Amount]  # Input amount sent through each route
+    amounts_out: list[Amount]  # Expected output of each route
+    amount_out: Amount  # Total expected output
+
+
+class TwapObservation(NamedTuple):
+    """Cumulative pool prices at a point in time, kept in a per-pool ring buffer."""
+
+    timestamp: int
+    price_a_cumulative: int  # Sum of price_a * seconds since the first observation
+    price_b_cumulative: int  # Sum of price_b * seconds since the first observation
+
+
+class DepthCurvePoint(NamedTuple):
+    """One sample of a swap depth curve."""
+
+    amount_in: Amount
+    amount_out: Amount
+    marginal_price: Amount  # token_out per token_in at this input size, with PRICE_PRECISION
+    price_impact: Amount  # Basis points, as returned by find_best_swap_path
+
+
 class UserProfitInfo(NamedTuple):
     """Information about user's profit/loss in a pool."""
 
@@ -227,6 +350,36 @@ class UserProfitInfo(NamedTuple):
     last_action_timestamp: int
 
 
+class PortfolioPosition(NamedTuple):
+    """A user's position in one pool, as returned by get_user_portfolio."""
+
+    pool_key: str
+    token_a: str
+    token_b: str
+    liquidity: Amount
+    amount_a: Amount  # token_a owned through the liquidity
+    amount_b: Amount  # token_b owned through the liquidity
+    balance_a: Amount  # Cashback in token_a
+    balance_b: Amount  # Cashback in token_b
+    value_usd: Amount  # USD value of amount_a and amount_b
+    cashback_value_usd: Amount  # USD value of balance_a and balance_b
+    initial_value_usd: Amount  # Cost basis, as in get_user_profit_info
+    profit_amount_usd: int
+    profit_percentage: int  # With 2 decimal places (e.g., 341 = 3.41%)
+    last_action_timestamp: int
+
+
+class UserPortfolio(NamedTuple):
+    """All of a user's positions valued with a single USD price table."""
+
+    positions: list[PortfolioPosition]
+    total_value_usd: Amount
+    total_cashback_value_usd: Amount
+    total_initial_value_usd: Amount
+    total_profit_amount_usd: int
+    total_profit_percentage: int  # With 2 decimal places (e.g., 341 = 3.41%)
+
+
 class SingleTokenLiquidityQuote(NamedTuple):
     """Quote information for single token liquidity addition."""
 
@@ -305,6 +458,7 @@ class DozerPoolManager(Blueprint):
 
     # Version control
     contract_version: str
+    initialized_layouts: set[int]  # Storage layouts whose scalar fields are set (see post_upgrade_init)
 
     # Administrative state
     owner: Address
@@ -312,31 +466,53 @@ class DozerPoolManager(Blueprint):
     authorized_signers: set[CallerId]  # Addresses authorized to sign pools
     htr_usd_pool_key: str | None  # Reference pool key for HTR-USD price calculations
     paused: bool  # For emergency pause
+    lazy_profit_tracking: bool  # Record token cost basis instead of USD values on liquidity actions
 
     # Token registry
-    all_pools: list[str]  # List of all pool keys
+    all_pools: list[str]  # List of all pool keys, indexed by pool id
+    pool_ids: dict[PoolKey, PoolId]  # pool_key -> pool id
     token_to_pools: dict[TokenUid, list[str]]  # Token -> list of pool keys
 
     # Signed pools for dApp listing
     signed_pools: list[str]  # List of all signed pools
     pool_signers: dict[str, CallerId]  # pool_key -> signer_address
+    signed_token_to_pools: dict[TokenUid, list[str]]  # Token -> list of signed pool keys (routing index)
+    signed_token_pool_positions: dict[TokenUid, dict[str, int]]  # token -> pool_key -> index in signed_token_to_pools
+    signed_htr_pools: dict[TokenUid, list[str]]  # token -> its signed HTR pool keys (one per fee tier)
 
     # Price calculation
     htr_token_map: dict[
         TokenUid, str
-    ]  # token -> pool_key with lowest fee (for HTR pairs)
+    ]  # token -> signed pool_key with lowest fee (for HTR pairs)
+    usd_prices: dict[TokenUid, Amount]  # token -> price (8 decimals) in the token its route's first hop leads to
+    usd_price_routes: dict[TokenUid, str]  # token -> comma-separated USD → token pool keys
+    usd_price_tokens: list[TokenUid]  # Tokens with a stored USD price, in pricing order
+    pool_usd_price_dependents: dict[PoolId, list[TokenUid]]  # pool id -> tokens whose route uses the pool
 
     # Pool data
     pools: dict[str, PoolState]  # pool_key -> PoolState (primitives only)
 
     # Container fields for pool state
+    pool_user_states: dict[PoolId, dict[CallerId, PoolUserState]]  # pool id -> user -> state
+    user_pools: dict[CallerId, list[PoolId]]  # user -> ids of the pools where the user has liquidity
+    user_pool_positions: dict[CallerId, dict[PoolId, int]]  # user -> pool id -> index in user_pools
+    legacy_pool_count: int  # Pools created before user_pools, the first ones of all_pools
+    user_pools_backfilled: set[CallerId]  # Users whose legacy positions are all in user_pools
+    pool_accumulated_fee: dict[str, dict[TokenUid, Amount]]  # pool_key -> token -> fee
+
+    # Legacy per-user containers, read until each (pool, user) entry is migrated on its first write
     pool_user_liquidity: dict[str, dict[CallerId, Amount]]  # pool_key -> user -> liquidity
     pool_change: dict[str, dict[CallerId, tuple[Amount, Amount]]]  # pool_key -> user -> (balance_a, balance_b)
-    pool_accumulated_fee: dict[str, dict[TokenUid, Amount]]  # pool_key -> token -> fee
     pool_user_deposit_price_usd: dict[str, dict[CallerId, Amount]]  # pool_key -> user -> price
     pool_user_last_action_timestamp: dict[str, dict[CallerId, int]]  # pool_key -> user -> timestamp
     # TWAP Oracle configuration
     default_twap_window: int  # Default time window for TWAP calculation (applied to new pools)
+    pool_twap_observations: dict[PoolId, dict[int, TwapObservation]]  # pool id -> slot -> observation
+    pool_twap_observation_cursor: dict[PoolId, tuple[int, int]]  # pool id -> (newest slot, observations kept)
+
+    # Rolling swap statistics
+    pool_stats_buckets: dict[PoolId, dict[int, PoolStatsBucket]]  # pool id -> period % POOL_STATS_BUCKETS -> bucket
+
     @public
     def initialize(self, ctx: Context) -> None:
         """Initialize the DozerPoolManager contract.
@@ -344,22 +520,37 @@ class DozerPoolManager(Blueprint):
         Sets up the initial state for the contract.
         """
         self.contract_version = "1.0.0"
+        self.initialized_layouts: set[int] = set()
+        self.initialized_layouts.add(STORAGE_LAYOUT)
         self.owner = Address(ctx.caller_id)
         self.default_protocol_fee = Amount(40)
 
         # Initialize dictionaries and lists
         self.authorized_signers: set[CallerId] = set()
         self.all_pools: list[str] = []
+        self.pool_ids: dict[PoolKey, PoolId] = {}
         self.token_to_pools: dict[TokenUid, list[str]] = {}
         self.signed_pools: list[str] = []
         self.pool_signers: dict[str, CallerId] = {}
+        self.signed_token_to_pools: dict[TokenUid, list[str]] = {}
+        self.signed_token_pool_positions: dict[TokenUid, dict[str, int]] = {}
+        self.signed_htr_pools: dict[TokenUid, list[str]] = {}
         self.htr_token_map: dict[TokenUid, str] = {}
+        self.usd_prices: dict[TokenUid, Amount] = {}
+        self.usd_price_routes: dict[TokenUid, str] = {}
+        self.usd_price_tokens: list[TokenUid] = []
+        self.pool_usd_price_dependents: dict[PoolId, list[TokenUid]] = {}
         self.pools: dict[str, PoolState] = {}
 
         # Container fields for pool state
+        self.pool_user_states: dict[PoolId, dict[CallerId, PoolUserState]] = {}
+        self.user_pools: dict[CallerId, list[PoolId]] = {}
+        self.user_pool_positions: dict[CallerId, dict[PoolId, int]] = {}
+        self.legacy_pool_count = 0
+        self.user_pools_backfilled: set[CallerId] = set()
+        self.pool_accumulated_fee: dict[str, dict[TokenUid, Amount]] = {}
         self.pool_user_liquidity: dict[str, dict[CallerId, Amount]] = {}
         self.pool_change: dict[str, dict[CallerId, tuple[Amount, Amount]]] = {}
-        self.pool_accumulated_fee: dict[str, dict[TokenUid, Amount]] = {}
         self.pool_user_deposit_price_usd: dict[str, dict[CallerId, Amount]] = {}
         self.pool_user_last_action_timestamp: dict[str, dict[CallerId, int]] = {}
 
@@ -372,10 +563,14 @@ class DozerPoolManager(Blueprint):
 
         # Initialize pause state
         self.paused = False
+        self.lazy_profit_tracking = False
 
         # Initialize default TWAP window to 4 hours (14400 seconds)
         # This is used for new pools; existing pools maintain their individual windows
         self.default_twap_window = 14400
+        self.pool_twap_observations: dict[PoolId, dict[int, TwapObservation]] = {}
+        self.pool_twap_observation_cursor: dict[PoolId, tuple[int, int]] = {}
+        self.pool_stats_buckets: dict[PoolId, dict[int, PoolStatsBucket]] = {}
 
         self.log.info('contract initialized',
                       owner=str(self.owner),
@@ -424,9 +619,35 @@ class DozerPoolManager(Blueprint):
         return token_a, token_b
 
     def _update_pool(self, pool_key: str, **kwargs) -> None:
-        """Update pool state with specified fields using _replace()."""
+        """Update pool state with specified fields using _replace().
+
+        When the reserves change, the stored USD prices routed through this pool
+        are re-derived (see _refresh_usd_prices_for_pool).
+        """
         pool = self.pools[pool_key]
-        self.pools[pool_key] = pool._replace(**kwargs)
+        updated_pool = pool._replace(**kwargs)
+        self.pools[pool_key] = updated_pool
+
+        if (
+            (updated_pool.reserve_a != pool.reserve_a or updated_pool.reserve_b != pool.reserve_b)
+            and self._get_pool_id(pool_key) in self.pool_usd_price_dependents
+        ):
+            self._refresh_usd_prices_for_pool(pool_key)
+
+    def _get_pool_id(self, pool_key: PoolKey) -> PoolId:
+        """Get the id of an existing pool.
+
+        Pools of a contract upgraded from a version without pool ids have none until
+        backfill_pool_ids reaches them; their id is then found by its position in
+        all_pools.
+        """
+        pool_id = self.pool_ids.get(pool_key)
+        if pool_id is not None:
+            return pool_id
+        for position in range(len(self.all_pools)):
+            if self.all_pools[position] == pool_key:
+                return position
+        raise PoolNotFound(f"Pool does not exist: {pool_key}")
 
     def _setup_pool_from_context(self, ctx: Context, fee: Amount) -> tuple[str, PoolState, CallerId]:
         """Extract tokens, order them, validate pool exists, return (pool_key, pool, caller_id)."""
@@ -441,13 +662,114 @@ class DozerPoolManager(Blueprint):
         if self.paused and ctx.caller_id != self.owner:
             raise InvalidState("Contract is paused")
 
+    def _get_pool_user_state(self, pool_key: PoolKey, user_address: CallerId) -> PoolUserState:
+        """Get a user's state in a pool, empty if the user never interacted with it.
+
+        Entries not migrated yet from the legacy per-user containers are read from them.
+        """
+        pool_id = self._get_pool_id(pool_key)
+        if pool_id in self.pool_user_states and user_address in self.pool_user_states[pool_id]:
+            return self.pool_user_states[pool_id][user_address]
+        return self._get_legacy_pool_user_state(pool_key, user_address)
+
+    def _get_legacy_pool_user_state(self, pool_key: PoolKey, user_address: CallerId) -> PoolUserState:
+        """Build a user's state from the legacy per-user containers, empty if they hold none."""
+        if pool_key not in self.pool_user_liquidity:
+            return EMPTY_POOL_USER_STATE
+
+        balance_a, balance_b = self.pool_change[pool_key].get(user_address, (Amount(0), Amount(0)))
+        return PoolUserState(
+            liquidity=Amount(self.pool_user_liquidity[pool_key].get(user_address, 0)),
+            balance_a=Amount(balance_a),
+            balance_b=Amount(balance_b),
+            deposit_value_usd=Amount(self.pool_user_deposit_price_usd[pool_key].get(user_address, 0)),
+            cost_basis_a=Amount(0),
+            cost_basis_b=Amount(0),
+            last_action_timestamp=self.pool_user_last_action_timestamp[pool_key].get(user_address, 0),
+        )
+
+    def _update_pool_user_state(self, pool_key: PoolKey, user_address: CallerId, **kwargs) -> PoolUserState:
+        """Update a user's state in a pool with specified fields using _replace().
+
+        The first write of an entry still held by the legacy per-user containers
+        moves it to pool_user_states. Returns the updated state.
+        """
+        pool_id = self._get_pool_id(pool_key)
+        state = self._get_pool_user_state(pool_key, user_address)._replace(**kwargs)
+        if pool_id not in self.pool_user_states:
+            self.pool_user_states[pool_id] = {}
+        if user_address not in self.pool_user_states[pool_id]:
+            self._drop_legacy_pool_user_state(pool_key, user_address)
+        self.pool_user_states[pool_id][user_address] = state
+        return state
+
+    def _drop_legacy_pool_user_state(self, pool_key: PoolKey, user_address: CallerId) -> None:
+        """Delete a user's legacy entries in a pool, indexing the pool in user_pools if they held liquidity."""
+        if pool_key not in self.pool_user_liquidity:
+            return
+
+        legacy_liquidity = self.pool_user_liquidity[pool_key]
+        if user_address in legacy_liquidity:
+            if legacy_liquidity[user_address] > 0:
+                self._add_user_pool(user_address, pool_key)
+            del legacy_liquidity[user_address]
+        if user_address in self.pool_change[pool_key]:
+            del self.pool_change[pool_key][user_address]
+        if user_address in self.pool_user_deposit_price_usd[pool_key]:
+            del self.pool_user_deposit_price_usd[pool_key][user_address]
+        if user_address in self.pool_user_last_action_timestamp[pool_key]:
+            del self.pool_user_last_action_timestamp[pool_key][user_address]
+
     def _update_user_liquidity(
         self, pool_key: PoolKey, user_address: CallerId, delta_liquidity: Amount
     ) -> None:
-        """Update user's liquidity by delta (positive or negative)."""
-        user_liquidity = self.pool_user_liquidity[pool_key]
-        current = user_liquidity.get(user_address, Amount(0))
-        user_liquidity[user_address] = Amount(current + delta_liquidity)
+        """Update user's liquidity by delta (positive or negative).
+
+        Keeps user_pools in sync when the balance moves between zero and non-zero.
+        """
+        current = self._get_pool_user_state(pool_key, user_address).liquidity
+        updated = Amount(current + delta_liquidity)
+        self._update_pool_user_state(pool_key, user_address, liquidity=updated)
+
+        if current == 0 and updated > 0:
+            self._add_user_pool(user_address, pool_key)
+        elif current > 0 and updated == 0:
+            self._remove_user_pool(user_address, pool_key)
+
+    def _add_user_pool(self, user_address: CallerId, pool_key: PoolKey) -> None:
+        """Record that a user holds liquidity in pool_key."""
+        pool_id = self._get_pool_id(pool_key)
+        if user_address not in self.user_pools:
+            self.user_pools[user_address] = [pool_id]
+            self.user_pool_positions[user_address] = {pool_id: 0}
+            return
+        if pool_id in self.user_pool_positions[user_address]:
+            return
+        self.user_pool_positions[user_address][pool_id] = len(self.user_pools[user_address])
+        self.user_pools[user_address].append(pool_id)
+
+    def _remove_user_pool(self, user_address: CallerId, pool_key: PoolKey) -> None:
+        """Forget a pool the user no longer holds liquidity in.
+
+        The last pool id of the user's list takes the place of the removed one.
+        """
+        if user_address not in self.user_pools:
+            return
+        pool_id = self._get_pool_id(pool_key)
+        positions = self.user_pool_positions[user_address]
+        if pool_id not in positions:
+            return
+
+        index = positions[pool_id]
+        last_pool_id = self.user_pools[user_address].pop()
+        if last_pool_id != pool_id:
+            self.user_pools[user_address][index] = last_pool_id
+            positions[last_pool_id] = index
+        del positions[pool_id]
+
+        if len(self.user_pools[user_address]) == 0:
+            del self.user_pools[user_address]
+            del self.user_pool_positions[user_address]
 
     def _calculate_protocol_fee(self, fee_amount: Amount) -> Amount:
         """Calculate protocol fee, rounding up to 1 for very small amounts."""
@@ -477,8 +799,12 @@ class DozerPoolManager(Blueprint):
         token_in: TokenUid,
         fee_amount: Amount,
         current_total_liquidity: Amount,
+        sqrt_k: int | None = None,
     ) -> Amount:
-        """Calculate protocol fee liquidity increase without modifying state."""
+        """Calculate protocol fee liquidity increase without modifying state.
+
+        sqrt_k is the pool's current _isqrt(reserve_a * reserve_b), computed here when not given.
+        """
         protocol_fee_amount = self._calculate_protocol_fee(fee_amount)
         if protocol_fee_amount == 0:
             return Amount(0)
@@ -499,7 +825,7 @@ class DozerPoolManager(Blueprint):
             product_before = Amount(pool.reserve_a * pool.reserve_b)
 
         sqrt_after = self._isqrt(product_after)
-        sqrt_before = self._isqrt(product_before)
+        sqrt_before = self._isqrt(product_before) if sqrt_k is None else sqrt_k
         delta_sqrt = sqrt_after - sqrt_before
 
         liquidity_increase = delta_sqrt * PRECISION
@@ -517,10 +843,7 @@ class DozerPoolManager(Blueprint):
         )
 
         # Mint liquidity to owner
-        user_liquidity = self.pool_user_liquidity[pool_key]
-        user_liquidity[self.owner] = Amount(
-            user_liquidity.get(self.owner, 0) + liquidity_increase
-        )
+        self._update_user_liquidity(pool_key, self.owner, liquidity_increase)
 
         # Update pool total liquidity
         pool = self.pools[pool_key]
@@ -557,6 +880,7 @@ class DozerPoolManager(Blueprint):
         fee_numerator: Amount,
         fee_denominator: Amount,
         current_total_liquidity: Amount,
+        sqrt_k: int | None = None,
     ) -> tuple[Amount, Amount]:
         """Simulate fee processing without modifying state, return (fee_amount, liquidity_increase)."""
         # Calculate fee (no state modification)
@@ -564,7 +888,7 @@ class DozerPoolManager(Blueprint):
 
         # Simulate protocol fee liquidity increase (no state modification)
         liquidity_increase = self._simulate_protocol_fee_liquidity_increase(
-            pool_key, token_in, fee_amount, current_total_liquidity
+            pool_key, token_in, fee_amount, current_total_liquidity, sqrt_k
         )
 
         return (fee_amount, liquidity_increase)
@@ -652,14 +976,11 @@ class DozerPoolManager(Blueprint):
         pool = self.pools[pool_key]
 
         # Get current balances
-        current_balance_a, current_balance_b = self.pool_change[pool_key].get(
-            address, (Amount(0), Amount(0))
-        )
+        state = self._get_pool_user_state(pool_key, address)
 
         if token == pool.token_a:
             # Update balance_a
-            new_balance_a = Amount(current_balance_a + amount)
-            self.pool_change[pool_key][address] = (new_balance_a, current_balance_b)
+            self._update_pool_user_state(pool_key, address, balance_a=Amount(state.balance_a + amount))
 
             # Update total balance
             new_total_change_a = pool.total_change_a + amount
@@ -672,8 +993,7 @@ class DozerPoolManager(Blueprint):
             assert token == pool.token_b, f"Token {token} is not part of pool {pool_key}"
 
             # Update balance_b
-            new_balance_b = Amount(current_balance_b + amount)
-            self.pool_change[pool_key][address] = (current_balance_a, new_balance_b)
+            self._update_pool_user_state(pool_key, address, balance_b=Amount(state.balance_b + amount))
 
             # Update total balance
             new_total_change_b = pool.total_change_b + amount
@@ -748,33 +1068,69 @@ class DozerPoolManager(Blueprint):
     def _update_user_profit_tracking(
         self, user_address: CallerId, pool_key: str, ctx: Context
     ) -> None:
-        """Update user profit tracking after liquidity operations."""
-        # Calculate current USD value of user's position
-        current_usd_value = self._calculate_user_position_usd_value(user_address, pool_key)
+        """Update user profit tracking after liquidity operations.
 
-        # Update the stored USD price 
-        self.pool_user_deposit_price_usd[pool_key][user_address] = current_usd_value
+        With lazy_profit_tracking the position's token amounts are stored as its
+        cost basis and converted to USD only by get_user_profit_info. Otherwise
+        the position is valued in USD now. Only the record of the active mode is
+        kept, so get_user_profit_info works for positions recorded in either mode.
+        """
+        state = self._get_pool_user_state(pool_key, user_address)
+        timestamp = int(ctx.block.timestamp)
 
-        # Update timestamp 
-        self.pool_user_last_action_timestamp[pool_key][user_address] = int(ctx.block.timestamp)
+        if self.lazy_profit_tracking:
+            amount_a, amount_b = self._calculate_position_token_amounts(pool_key, state.liquidity)
+            self._update_pool_user_state(
+                pool_key,
+                user_address,
+                deposit_value_usd=Amount(0),
+                cost_basis_a=amount_a,
+                cost_basis_b=amount_b,
+                last_action_timestamp=timestamp,
+            )
+            return
 
-    def _calculate_user_position_usd_value(
-        self, user_address: CallerId, pool_key: str
-    ) -> Amount:
-        """Calculate current USD value of user's position in pool."""
+        # Store the current USD value of the position and the action timestamp
+        self._update_pool_user_state(
+            pool_key,
+            user_address,
+            deposit_value_usd=self._calculate_position_usd_value(pool_key, state.liquidity),
+            cost_basis_a=Amount(0),
+            cost_basis_b=Amount(0),
+            last_action_timestamp=timestamp,
+        )
+
+    def _calculate_position_token_amounts(
+        self, pool_key: str, user_liquidity: Amount
+    ) -> tuple[Amount, Amount]:
+        """Calculate (amount_a, amount_b) of a position of user_liquidity in pool."""
         pool = self.pools[pool_key]
 
-        # Get user liquidity from blueprint attribute
-        user_liquidity = self.pool_user_liquidity[pool_key].get(user_address, Amount(0))
-        if user_liquidity == 0:
-            return Amount(0)
+        if user_liquidity == 0 or pool.total_liquidity == 0:
+            return Amount(0), Amount(0)
+
+        return (
+            Amount((pool.reserve_a * user_liquidity) // pool.total_liquidity),
+            Amount((pool.reserve_b * user_liquidity) // pool.total_liquidity),
+        )
 
-        if pool.total_liquidity == 0:
+    def _calculate_position_usd_value(
+        self, pool_key: str, user_liquidity: Amount
+    ) -> Amount:
+        """Calculate current USD value of a position of user_liquidity in pool."""
+        user_token_a_amount, user_token_b_amount = self._calculate_position_token_amounts(
+            pool_key, user_liquidity
+        )
+        return self._calculate_token_amounts_usd_value(pool_key, user_token_a_amount, user_token_b_amount)
+
+    def _calculate_token_amounts_usd_value(
+        self, pool_key: str, user_token_a_amount: Amount, user_token_b_amount: Amount
+    ) -> Amount:
+        """Calculate current USD value of amounts of the pool's two tokens."""
+        if user_token_a_amount == 0 and user_token_b_amount == 0:
             return Amount(0)
 
-        # Calculate user's share of the pool
-        user_token_a_amount = (pool.reserve_a * user_liquidity) // pool.total_liquidity
-        user_token_b_amount = (pool.reserve_b * user_liquidity) // pool.total_liquidity
+        pool = self.pools[pool_key]
 
         # Get token prices in USD
         token_a_price_usd = self.get_token_price_in_usd(pool.token_a)
@@ -872,9 +1228,55 @@ class DozerPoolManager(Blueprint):
                 price_b_window_sum=new_window_sum_b,
                 block_timestamp_last=current_timestamp,
             )
+            self._record_twap_observation(pool_key, pool, current_timestamp, price_a, price_b)
         else:
             # Just update timestamp if no liquidity
             self._update_pool(pool_key, block_timestamp_last=current_timestamp)
+            self._record_twap_observation(pool_key, pool, current_timestamp, Amount(0), Amount(0))
+
+    def _initialize_twap_observations(self, pool_key: str, timestamp: int) -> None:
+        """Start the TWAP observation ring buffer of a pool with a zero observation."""
+        pool_id = self._get_pool_id(pool_key)
+        self.pool_twap_observations[pool_id] = {
+            0: TwapObservation(timestamp=timestamp, price_a_cumulative=0, price_b_cumulative=0)
+        }
+        self.pool_twap_observation_cursor[pool_id] = (0, 1)
+
+    def _record_twap_observation(
+        self, pool_key: str, pool: PoolState, current_timestamp: int, price_a: Amount, price_b: Amount
+    ) -> None:
+        """Accumulate the prices held since the newest observation into the ring buffer.
+
+        The newest observation is overwritten until it is TWAP_OBSERVATION_INTERVAL
+        newer than the one before it, so kept observations span
+        TWAP_OBSERVATION_CARDINALITY intervals whatever the pool's activity.
+        Pools created before the buffer existed start it at their last TWAP update.
+        """
+        pool_id = self._get_pool_id(pool_key)
+        if pool_id not in self.pool_twap_observation_cursor:
+            self._initialize_twap_observations(pool_key, pool.block_timestamp_last)
+
+        observations = self.pool_twap_observations[pool_id]
+        slot, count = self.pool_twap_observation_cursor[pool_id]
+        newest = observations[slot]
+        time_elapsed = current_timestamp - newest.timestamp
+        observation = TwapObservation(
+            timestamp=current_timestamp,
+            price_a_cumulative=newest.price_a_cumulative + price_a * time_elapsed,
+            price_b_cumulative=newest.price_b_cumulative + price_b * time_elapsed,
+        )
+
+        if count > 1:
+            previous = observations[(slot - 1) % TWAP_OBSERVATION_CARDINALITY]
+            if newest.timestamp - previous.timestamp < TWAP_OBSERVATION_INTERVAL:
+                observations[slot] = observation
+                return
+
+        slot = (slot + 1) % TWAP_OBSERVATION_CARDINALITY
+        if count < TWAP_OBSERVATION_CARDINALITY:
+            count += 1
+        observations[slot] = observation
+        self.pool_twap_observation_cursor[pool_id] = (slot, count)
 
     def _check_k_not_decreased(
         self,
@@ -1030,18 +1432,52 @@ class DozerPoolManager(Blueprint):
         self, token_in: TokenUid, amount_in: Amount, token_out: TokenUid, fee: Amount
     ) -> SingleTokenLiquidityQuote:
         """Quote liquidity addition with a single token."""
+        pool_key = self._get_single_token_pool_key(token_in, token_out, fee)
+        return self._quote_add_liquidity_single_token(pool_key, self.pools[pool_key], token_in, amount_in)
+
+    @view
+    def quote_add_liquidity_single_token_batch(
+        self, token_in: TokenUid, amounts_in: list[Amount], token_out: TokenUid, fee: Amount
+    ) -> list[SingleTokenLiquidityQuote]:
+        """Quote liquidity addition with a single token for several input amounts.
+
+        All quotes are computed against one pool snapshot, sharing its square root of k,
+        and each matches quote_add_liquidity_single_token for its amount.
+
+        Raises:
+            InvalidAction: If more than MAX_QUOTE_BATCH_SIZE amounts are given
+        """
+        if len(amounts_in) > MAX_QUOTE_BATCH_SIZE:
+            raise InvalidAction("Too many amounts to quote")
+        pool_key = self._get_single_token_pool_key(token_in, token_out, fee)
+        pool = self.pools[pool_key]
+        sqrt_k = self._isqrt(pool.reserve_a * pool.reserve_b)
+
+        result = []
+        for amount_in in amounts_in:
+            result.append(self._quote_add_liquidity_single_token(pool_key, pool, token_in, amount_in, sqrt_k))
+        return result
+
+    def _get_single_token_pool_key(self, token_in: TokenUid, token_out: TokenUid, fee: Amount) -> str:
+        """Get the key of the existing pool of token_in and token_out, raise if they are the same."""
         if token_in == token_out:
             raise InvalidTokens("Input and output tokens cannot be the same")
 
-        if token_in > token_out:
-            token_a, token_b = token_out, token_in
-        else:
-            token_a, token_b = token_in, token_out
-
-        pool_key = self._get_pool_key(token_a, token_b, fee)
+        pool_key = self._get_pool_key(token_in, token_out, fee)
         self._validate_pool_exists(pool_key)
+        return pool_key
 
-        pool = self.pools[pool_key]
+    def _quote_add_liquidity_single_token(
+        self,
+        pool_key: str,
+        pool: PoolState,
+        token_in: TokenUid,
+        amount_in: Amount,
+        sqrt_k: int | None = None,
+    ) -> SingleTokenLiquidityQuote:
+        """Quote a single token liquidity addition against a pool snapshot."""
+        token_a = pool.token_a
+        token_b = pool.token_b
 
         result = self._compute_add_liquidity_single_token(
             amount_in=amount_in,
@@ -1054,6 +1490,7 @@ class DozerPoolManager(Blueprint):
             fee_numerator=pool.fee_numerator,
             fee_denominator=pool.fee_denominator,
             pool_key=pool_key,
+            sqrt_k=sqrt_k,
         )
 
         if result.excess_a > 0:
@@ -1094,70 +1531,77 @@ class DozerPoolManager(Blueprint):
 
         pool = self.pools[pool_key]
         self._validate_token_in_pool(token_out, pool, "token_out")
-        user_liquidity = self.pool_user_liquidity[pool_key].get(user_address, Amount(0))
+        user_liquidity = self._get_pool_user_state(pool_key, user_address).liquidity
         if user_liquidity == 0:
             raise InvalidAction("No liquidity to remove")
 
-        result = self._compute_remove_liquidity_single_token(
-            liquidity_to_remove=user_liquidity,
-            token_out=token_out,
-            reserve_a=pool.reserve_a,
-            reserve_b=pool.reserve_b,
-            token_a=token_a,
-            token_b=token_b,
-            total_liquidity=pool.total_liquidity,
-            fee_numerator=pool.fee_numerator,
-            fee_denominator=pool.fee_denominator,
-            pool_key=pool_key,
-        )
-
-        if result.swap_amount > 0:
-            if token_out == token_a:
-                swap_reserve_in = Amount(pool.reserve_b - result.amount_b + result.swap_amount)
-                swap_reserve_out = Amount(pool.reserve_a - result.amount_a)
-                price_impact = self._calculate_single_swap_price_impact(
-                    result.swap_amount, result.swap_output, swap_reserve_in, swap_reserve_out
-                )
-            else:
-                swap_reserve_in = Amount(pool.reserve_a - result.amount_a + result.swap_amount)
-                swap_reserve_out = Amount(pool.reserve_b - result.amount_b)
-                price_impact = self._calculate_single_swap_price_impact(
-                    result.swap_amount, result.swap_output, swap_reserve_in, swap_reserve_out
-                )
-        else:
-            price_impact = Amount(0)
-
-        return SingleTokenRemovalQuote(
-            amount_out=result.total_amount_out,
-            token_a_withdrawn=result.amount_a,
-            token_b_withdrawn=result.amount_b,
-            swap_amount=result.swap_amount,
-            swap_output=result.swap_output,
-            price_impact=price_impact,
-            user_liquidity=user_liquidity,
-            protocol_liquidity_increase=result.protocol_liquidity_increase,
-        )
+        return self._quote_remove_liquidity_single_token(pool_key, pool, token_out, user_liquidity, user_liquidity)
 
     @view
     def quote_remove_liquidity_single_token_percentage(
         self, user_address: CallerId, pool_key: str, token_out: TokenUid, percentage: Amount
     ) -> SingleTokenRemovalQuote:
         """Quote liquidity removal to receive a single token based on percentage."""
+        return self._quote_remove_liquidity_single_token_percentages(
+            user_address, pool_key, token_out, [percentage]
+        )[0]
+
+    @view
+    def quote_remove_liquidity_single_token_percentage_batch(
+        self, user_address: CallerId, pool_key: str, token_out: TokenUid, percentages: list[Amount]
+    ) -> list[SingleTokenRemovalQuote]:
+        """Quote liquidity removal to receive a single token for several percentages.
+
+        All quotes are computed against one pool snapshot, sharing its square root of k,
+        and each matches quote_remove_liquidity_single_token_percentage for its percentage.
+
+        Raises:
+            InvalidAction: If more than MAX_QUOTE_BATCH_SIZE percentages are given
+        """
+        if len(percentages) > MAX_QUOTE_BATCH_SIZE:
+            raise InvalidAction("Too many percentages to quote")
+        return self._quote_remove_liquidity_single_token_percentages(
+            user_address, pool_key, token_out, percentages
+        )
+
+    def _quote_remove_liquidity_single_token_percentages(
+        self, user_address: CallerId, pool_key: str, token_out: TokenUid, percentages: list[Amount]
+    ) -> list[SingleTokenRemovalQuote]:
+        """Quote single token liquidity removals of percentages of the user's liquidity."""
         self._validate_pool_exists(pool_key)
 
-        if percentage <= 0 or percentage > 10000:
-            raise InvalidAction("Invalid percentage")
+        for percentage in percentages:
+            if percentage <= 0 or percentage > 10000:
+                raise InvalidAction("Invalid percentage")
 
         pool = self.pools[pool_key]
         self._validate_token_in_pool(token_out, pool, "token_out")
-        token_a = pool.token_a
-        token_b = pool.token_b
 
-        user_liquidity = self.pool_user_liquidity[pool_key].get(user_address, 0)
+        user_liquidity = self._get_pool_user_state(pool_key, user_address).liquidity
         if user_liquidity == 0:
             raise InvalidAction("No liquidity to remove")
 
-        liquidity_to_remove = Amount((user_liquidity * percentage) // 10000)
+        sqrt_k = self._isqrt(pool.reserve_a * pool.reserve_b)
+        result = []
+        for percentage in percentages:
+            liquidity_to_remove = Amount((user_liquidity * percentage) // 10000)
+            result.append(self._quote_remove_liquidity_single_token(
+                pool_key, pool, token_out, user_liquidity, liquidity_to_remove, sqrt_k
+            ))
+        return result
+
+    def _quote_remove_liquidity_single_token(
+        self,
+        pool_key: str,
+        pool: PoolState,
+        token_out: TokenUid,
+        user_liquidity: Amount,
+        liquidity_to_remove: Amount,
+        sqrt_k: int | None = None,
+    ) -> SingleTokenRemovalQuote:
+        """Quote a single token liquidity removal against a pool snapshot."""
+        token_a = pool.token_a
+        token_b = pool.token_b
 
         result = self._compute_remove_liquidity_single_token(
             liquidity_to_remove=liquidity_to_remove,
@@ -1170,21 +1614,19 @@ class DozerPoolManager(Blueprint):
             fee_numerator=pool.fee_numerator,
             fee_denominator=pool.fee_denominator,
             pool_key=pool_key,
+            sqrt_k=sqrt_k,
         )
 
         if result.swap_amount > 0:
             if token_out == token_a:
                 swap_reserve_in = Amount(pool.reserve_b - result.amount_b + result.swap_amount)
                 swap_reserve_out = Amount(pool.reserve_a - result.amount_a)
-                price_impact = self._calculate_single_swap_price_impact(
-                    result.swap_amount, result.swap_output, swap_reserve_in, swap_reserve_out
-                )
             else:
                 swap_reserve_in = Amount(pool.reserve_a - result.amount_a + result.swap_amount)
                 swap_reserve_out = Amount(pool.reserve_b - result.amount_b)
-                price_impact = self._calculate_single_swap_price_impact(
-                    result.swap_amount, result.swap_output, swap_reserve_in, swap_reserve_out
-                )
+            price_impact = self._calculate_single_swap_price_impact(
+                result.swap_amount, result.swap_output, swap_reserve_in, swap_reserve_out
+            )
         else:
             price_impact = Amount(0)
 
@@ -1388,17 +1830,19 @@ class DozerPoolManager(Blueprint):
             twap_window=self.default_twap_window,  # Use default window for new pools
         )
 
+        # Update registry, the pool id is its position in all_pools
+        # all_pools should already be initialized by the Blueprint system
+        pool_id = len(self.all_pools)
+        self.pool_ids[pool_key] = pool_id
+        self.all_pools.append(pool_key)
+        self._initialize_twap_observations(pool_key, int(ctx.block.timestamp))
+
         # Initialize container attributes separately
         # User receives initial_liquidity (not including burned amount)
-        self.pool_user_liquidity[pool_key] = {ctx.caller_id: Amount(initial_liquidity)}
-        self.pool_change[pool_key] = {}
+        self.pool_user_states[pool_id] = {}
+        self._update_user_liquidity(pool_key, ctx.caller_id, Amount(initial_liquidity))
         self.pool_accumulated_fee[pool_key] = {token_a: Amount(0), token_b: Amount(0)}
-        self.pool_user_deposit_price_usd[pool_key] = {}
-        self.pool_user_last_action_timestamp[pool_key] = {}
-
-        # Update registry
-        # all_pools should already be initialized by the Blueprint system
-        self.all_pools.append(pool_key)
+        self.pool_stats_buckets[pool_id] = {}
 
         # Update token to pools mapping
         if token_a in self.token_to_pools:
@@ -1412,23 +1856,6 @@ class DozerPoolManager(Blueprint):
         else:
             self.token_to_pools[token_b] = [pool_key]
 
-        # Update HTR token map if this is an HTR pool
-        if token_a == HATHOR_TOKEN_UID or token_b == HATHOR_TOKEN_UID:
-            other_token = token_b if token_a == HATHOR_TOKEN_UID else token_a
-
-            # If token not in map or new pool has lower fee, update the map
-            current_pool_key = self.htr_token_map.get(other_token)
-            if (
-                current_pool_key is None
-                or self.pools[pool_key].fee_numerator
-                < self.pools[current_pool_key].fee_numerator
-            ):
-                self.htr_token_map[other_token] = pool_key
-                self.log.debug('updating htr token map for pool',
-                               pool_key=pool_key,
-                               other_token=other_token.hex(),
-                               fee_numerator=fee)
-
         self.log.info('pool created successfully',
                       pool_key=pool_key,
                       token_a=token_a.hex(),
@@ -1630,22 +2057,19 @@ class DozerPoolManager(Blueprint):
                        reserve_b_before=reserve_b_before)
 
         # Check if user has liquidity
-        user_liquidity = self.pool_user_liquidity[pool_key]
-        if (
-            user_address not in user_liquidity
-            or user_liquidity[user_address] == 0
-        ):
+        user_liquidity = self._get_pool_user_state(pool_key, user_address).liquidity
+        if user_liquidity == 0:
             raise InvalidAction("No liquidity to remove")
 
         # Calculate maximum withdrawal
         max_withdraw = (
-            user_liquidity[user_address]
+            user_liquidity
             * pool.reserve_a
             // pool.total_liquidity
         )
 
         self.log.debug('max withdrawal calculated',
-                       user_liquidity=user_liquidity[user_address],
+                       user_liquidity=user_liquidity,
                        max_withdraw=max_withdraw,
                        action_a_amount=action_a_amount)
 
@@ -1872,6 +2296,10 @@ class DozerPoolManager(Blueprint):
             volume_b=Amount(pool.volume_b + volume_b_increment),
             last_activity=Timestamp(ctx.block.timestamp)
         )
+        if result.optimal_swap_amount > 0:
+            self._record_swap_stats(
+                pool_key, pool, token_in, result.optimal_swap_amount, volume_a_increment, volume_b_increment, ctx
+            )
 
         if result.excess_a > 0:
             self._update_change(user_address, result.excess_a, token_a, pool_key)
@@ -1901,11 +2329,16 @@ class DozerPoolManager(Blueprint):
 
     def _isqrt(self, n: Amount) -> Amount:
         """
-        Integer square root using Newton's method (Babylonian algorithm).
-        Same algorithm used in Uniswap V2 and other DeFi protocols.
+        Integer square root using Newton's method seeded from the bit length.
 
         Returns the largest integer x such that x² ≤ n.
 
+        The initial guess 2^ceil(bit_length/2) is always ≥ √n, so the
+        iteration decreases monotonically and stops exactly at floor(√n).
+        Quadratic convergence from this seed takes ~log2(bit_length) steps
+        (about 9 for 256-bit operands) instead of the dozens needed when
+        starting from n // 2 + 1.
+
         Raises:
             InvalidState: If square root calculation does not converge
         """
@@ -1918,29 +2351,17 @@ class DozerPoolManager(Blueprint):
         if n <= 3:
             return Amount(1)
 
-        # Newton's method with optimized initial guess
-        # For very large numbers (>128 bits), use bit-length based initial guess
-        # Otherwise use Uniswap V2's approach: n // 2 + 1
-        if n > (1 << 128):
-            # Use bit-length for better initial guess on very large numbers
-            # Initial guess: 2^(ceil(bit_length/2))
-            bit_length = n.bit_length()
-            x = Amount(1 << ((bit_length + 1) // 2))
-            z = Amount(n)
-        else:
-            # Standard Uniswap V2 approach for smaller numbers
-            z = Amount(n)
-            x = Amount(n // 2 + 1)
+        x = 1 << ((n.bit_length() + 1) // 2)
 
-        # Newton's method converges in O(log(log(n)))
-        # With optimized initial guess, ~10-30 iterations needed for very large numbers
-        max_iterations = 200
+        # Each step at least halves the error once x is within 2x of √n,
+        # so 64 steps are far beyond what any supported operand needs
+        max_iterations = 64
 
         for iteration in range(max_iterations):
-            if x >= z:
-                return Amount(z)
-            z = x
-            x = Amount((n // x + x) // 2)
+            y = (x + n // x) // 2
+            if y >= x:
+                return Amount(x)
+            x = y
 
         # Should never reach here for valid inputs
         raise InvalidState(f"Square root calculation did not converge after {max_iterations} iterations")
@@ -2008,6 +2429,7 @@ class DozerPoolManager(Blueprint):
         fee_numerator: Amount,
         fee_denominator: Amount,
         pool_key: str,
+        sqrt_k: int | None = None,
     ) -> _AddLiquiditySingleTokenResult:
         """Shared calculation logic for add liquidity single token operations."""
         if token_in == token_a:
@@ -2040,6 +2462,7 @@ class DozerPoolManager(Blueprint):
                 fee_numerator=fee_numerator,
                 fee_denominator=fee_denominator,
                 current_total_liquidity=total_liquidity,
+                sqrt_k=sqrt_k,
             )
         else:
             protocol_liquidity_increase = Amount(0)
@@ -2115,6 +2538,7 @@ class DozerPoolManager(Blueprint):
         fee_numerator: Amount,
         fee_denominator: Amount,
         pool_key: str,
+        sqrt_k: int | None = None,
     ) -> _RemoveLiquiditySingleTokenResult:
         """Shared calculation logic for remove liquidity single token operations."""
         # Reserves and total_liquidity can never be zero after initial liquidity burn
@@ -2157,6 +2581,7 @@ class DozerPoolManager(Blueprint):
                     fee_numerator=fee_numerator,
                     fee_denominator=fee_denominator,
                     current_total_liquidity=current_total_liquidity,
+                    sqrt_k=sqrt_k,
                 )
             else:
                 total_amount_out = amount_a
@@ -2193,6 +2618,7 @@ class DozerPoolManager(Blueprint):
                     fee_numerator=fee_numerator,
                     fee_denominator=fee_denominator,
                     current_total_liquidity=current_total_liquidity,
+                    sqrt_k=sqrt_k,
                 )
             else:
                 total_amount_out = amount_b
@@ -2342,8 +2768,7 @@ class DozerPoolManager(Blueprint):
         token_b = pool.token_b
 
         # Check if user has liquidity
-        pool_user_liquidity = self.pool_user_liquidity[pool_key]
-        user_liquidity = pool_user_liquidity.get(user_address, 0)
+        user_liquidity = self._get_pool_user_state(pool_key, user_address).liquidity
         if user_liquidity == 0:
             raise InvalidAction("No liquidity to remove")
 
@@ -2464,9 +2889,9 @@ class DozerPoolManager(Blueprint):
         # Update pool statistics (transactions, volume, last_activity)
         pool = self.pools[pool_key]
         # Track internal swap volume if there was a swap
+        # Determine which token was swapped
+        swap_token_in = token_b if token_out == token_a else token_a
         if result.swap_amount > 0:
-            # Determine which token was swapped
-            swap_token_in = token_b if token_out == token_a else token_a
             volume_a_increment, volume_b_increment = self._get_volume_increments(swap_token_in, result.swap_amount, result.swap_output, pool)
         else:
             volume_a_increment, volume_b_increment = Amount(0), Amount(0)
@@ -2477,6 +2902,10 @@ class DozerPoolManager(Blueprint):
             volume_b=Amount(pool.volume_b + volume_b_increment),
             last_activity=Timestamp(ctx.block.timestamp)
         )
+        if result.swap_amount > 0:
+            self._record_swap_stats(
+                pool_key, pool, swap_token_in, result.swap_amount, volume_a_increment, volume_b_increment, ctx
+            )
 
         # Update profit tracking
         self._update_user_profit_tracking(user_address, pool_key, ctx)
@@ -2798,20 +3227,166 @@ class DozerPoolManager(Blueprint):
             token_out,
         )
 
-    def _swap_exact_out(
-        self,
-        amount_in: Amount,
-        token_in: TokenUid,
-        amount_out: Amount,
-        pool_key: str,
-        ctx: Context,
-    ) -> None:
-        """Execute a swap in a single pool with exact output amount, updating reserves, volumes, and fees.
+    @public(allow_withdrawal=True, allow_deposit=True)
+    def swap_exact_tokens_for_tokens_split(
+        self, ctx: Context, paths: list[str], amounts_in: list[Amount], deadline: Timestamp
+    ) -> SwapResult:
+        """Execute an exact input swap divided across several pool-disjoint paths.
+
+        The deposit is split as given by amounts_in, usually the quote returned by
+        find_best_split_swap(). Every leg is executed before a single slippage check
+        on the total output, so the whole swap either meets the withdrawal amount or
+        fails. Any output above the withdrawal is kept as change in the last pool of
+        the first path.
 
         Args:
-            amount_in: The calculated amount of input tokens
-            token_in: The input token
-            amount_out: The exact amount of output tokens
+            ctx: The transaction context
+            paths: Comma-separated pool keys of each path
+            amounts_in: Input amount sent through each path, summing to the deposit
+            deadline: Block timestamp by which transaction must be included
+
+        Returns:
+            SwapResult with details of the swap
+
+        Raises:
+            PoolNotFound: If any pool in the paths does not exist
+            InvalidPath: If a path is invalid or two paths share a pool
+            InvalidAction: If the actions are invalid, the amounts do not match the
+                deposit, the output is below the withdrawal or deadline has passed
+        """
+        self._check_not_paused(ctx)
+
+        # Validate deadline
+        assert ctx.block.timestamp <= deadline, f"Transaction expired: block timestamp {ctx.block.timestamp} > deadline {deadline}"
+
+        if len(paths) == 0 or len(paths) > MAX_SPLIT_ROUTES:
+            raise InvalidPath("Invalid number of paths")
+        if len(paths) != len(amounts_in):
+            raise InvalidAction("Number of paths and amounts must match")
+
+        user_address = ctx.caller_id
+        deposit_action, withdrawal_action = self._get_deposit_and_withdrawal_actions(ctx)
+        token_in = deposit_action.token_uid
+        token_out = withdrawal_action.token_uid
+
+        if sum(amounts_in) != deposit_action.amount:
+            raise InvalidAction("Split amounts must add up to the deposit")
+
+        # Parse and validate every path before swapping
+        routes: list[list[str]] = []
+        used_pools: set[str] = set()
+        for path_str in paths:
+            if not path_str:
+                raise InvalidPath("Empty path")
+            pool_keys = path_str.split(",")
+            if len(pool_keys) > 3:
+                raise InvalidPath("Invalid path length")
+            for pool_key in pool_keys:
+                if pool_key not in self.all_pools:
+                    raise PoolNotFound()
+                if pool_key in used_pools:
+                    raise InvalidPath("Split paths must not share pools")
+                used_pools.add(pool_key)
+            routes.append(pool_keys)
+
+        total_out = Amount(0)
+        for index in range(len(routes)):
+            if amounts_in[index] <= 0:
+                raise InvalidAction("Split amounts must be positive")
+            current_amount = Amount(amounts_in[index])
+            current_token = token_in
+            for pool_key in routes[index]:
+                next_token = self._get_other_token(self.pools[pool_key], current_token)
+                current_amount = self._swap(current_amount, current_token, pool_key, ctx)
+                current_token = next_token
+            if current_token != token_out:
+                raise InvalidAction("Withdrawal token does not match output token")
+            total_out = Amount(total_out + current_amount)
+
+        # Single slippage check for the whole swap
+        if withdrawal_action.amount > total_out:
+            raise InvalidAction("Amount out is too high")
+
+        change_out = Amount(total_out - withdrawal_action.amount)
+        if change_out > 0:
+            self._update_change(user_address, change_out, token_out, routes[0][-1])
+
+        self.log.info('split swap executed successfully',
+                      user=str(user_address),
+                      token_in=token_in.hex(),
+                      token_out=token_out.hex(),
+                      paths=len(routes),
+                      amount_in=deposit_action.amount,
+                      amount_out=total_out,
+                      slippage=change_out)
+
+        return SwapResult(
+            Amount(deposit_action.amount),
+            change_out,
+            token_in,
+            Amount(withdrawal_action.amount),
+            token_out,
+        )
+
+    def _record_swap_stats(
+        self,
+        pool_key: str,
+        pool: PoolState,
+        token_in: TokenUid,
+        amount_in: Amount,
+        volume_a_increment: Amount,
+        volume_b_increment: Amount,
+        ctx: Context,
+    ) -> None:
+        """Add a swap to the pool's statistics bucket for the current period.
+
+        Buckets form a ring of POOL_STATS_BUCKETS periods, a bucket left from an
+        older period is reset before being reused.
+        """
+        period = int(ctx.block.timestamp) // POOL_STATS_BUCKET_SECONDS
+        slot = period % POOL_STATS_BUCKETS
+        # Pools created before the statistics existed start them with their next swap
+        pool_id = self._get_pool_id(pool_key)
+        if pool_id not in self.pool_stats_buckets:
+            self.pool_stats_buckets[pool_id] = {}
+        buckets = self.pool_stats_buckets[pool_id]
+
+        bucket = buckets.get(slot)
+        if bucket is None or bucket.period != period:
+            bucket = PoolStatsBucket(
+                period=period,
+                volume_a=Amount(0),
+                volume_b=Amount(0),
+                fee_a=Amount(0),
+                fee_b=Amount(0),
+                transactions=Amount(0),
+            )
+
+        fee_amount = self._calculate_swap_fee(amount_in, pool.fee_numerator, pool.fee_denominator)
+        fee_a = fee_amount if token_in == pool.token_a else Amount(0)
+        fee_b = fee_amount if token_in == pool.token_b else Amount(0)
+        buckets[slot] = bucket._replace(
+            volume_a=Amount(bucket.volume_a + volume_a_increment),
+            volume_b=Amount(bucket.volume_b + volume_b_increment),
+            fee_a=Amount(bucket.fee_a + fee_a),
+            fee_b=Amount(bucket.fee_b + fee_b),
+            transactions=Amount(bucket.transactions + 1),
+        )
+
+    def _swap_exact_out(
+        self,
+        amount_in: Amount,
+        token_in: TokenUid,
+        amount_out: Amount,
+        pool_key: str,
+        ctx: Context,
+    ) -> None:
+        """Execute a swap in a single pool with exact output amount, updating reserves, volumes, and fees.
+
+        Args:
+            amount_in: The calculated amount of input tokens
+            token_in: The input token
+            amount_out: The exact amount of output tokens
             pool_key: The pool key
             ctx: The execution context (for TWAP update and timestamp)
         """
@@ -2851,6 +3426,7 @@ class DozerPoolManager(Blueprint):
             last_activity=Timestamp(ctx.block.timestamp),
             transactions=Amount(pool.transactions + 1)
         )
+        self._record_swap_stats(pool_key, pool, token_in, amount_in, volume_a_increment, volume_b_increment, ctx)
 
         # Verify K invariant (should increase due to swap fees)
         pool_after = self.pools[pool_key]
@@ -2919,6 +3495,7 @@ class DozerPoolManager(Blueprint):
             last_activity=Timestamp(ctx.block.timestamp),
             transactions=Amount(pool.transactions + 1)
         )
+        self._record_swap_stats(pool_key, pool, token_in, amount_in, volume_a_increment, volume_b_increment, ctx)
 
         # Verify K invariant (should increase due to swap fees)
         pool_after = self.pools[pool_key]
@@ -3343,9 +3920,9 @@ class DozerPoolManager(Blueprint):
         pool = self.pools[pool_key]
 
         # Get user's current cashback balance
-        current_balance_a, current_balance_b = self.pool_change[pool_key].get(
-            user_address, (Amount(0), Amount(0))
-        )
+        state = self._get_pool_user_state(pool_key, user_address)
+        current_balance_a = state.balance_a
+        current_balance_b = state.balance_b
 
         self.log.debug('withdrawing cashback',
                        pool_key=pool_key,
@@ -3383,7 +3960,12 @@ class DozerPoolManager(Blueprint):
         # Update user balances
         new_balance_a = Amount(current_balance_a - withdraw_a)
         new_balance_b = Amount(current_balance_b - withdraw_b)
-        self.pool_change[pool_key][user_address] = (new_balance_a, new_balance_b)
+        self._update_pool_user_state(
+            pool_key,
+            user_address,
+            balance_a=new_balance_a,
+            balance_b=new_balance_b,
+        )
 
         # Update pool total balances
         self._update_pool(
@@ -3595,8 +4177,15 @@ class DozerPoolManager(Blueprint):
         pool_key = self._get_pool_key(token_a, token_b, fee)
         self._validate_pool_exists(pool_key)
 
+        newly_signed = pool_key not in self.pool_signers
+        if newly_signed:
+            self._add_signed_pool_to_index(pool_key)
         self.pool_signers[pool_key] = ctx.caller_id
 
+        # A new signed pool can open better USD pricing routes
+        if newly_signed:
+            self._recompute_usd_prices()
+
         self.log.info('pool signed',
                       pool_key=pool_key,
                       token_a=token_a.hex(),
@@ -3638,6 +4227,8 @@ class DozerPoolManager(Blueprint):
 
         if pool_key in self.pool_signers:
             del self.pool_signers[pool_key]
+            self._remove_signed_pool_from_index(pool_key)
+            self._recompute_usd_prices()
 
         self.log.info('pool unsigned',
                       pool_key=pool_key,
@@ -3646,6 +4237,278 @@ class DozerPoolManager(Blueprint):
                       fee=fee,
                       caller=str(ctx.caller_id))
 
+    @public
+    def rebuild_signed_pool_index(self, ctx: Context, cursor: int) -> int | None:
+        """Rebuild the routing index of signed pools from pool_signers.
+
+        Contracts upgraded from a version without the index must call this after
+        the upgrade, starting from cursor 0 and passing back the returned cursor
+        until it is None. Each call reconciles at most MAX_POOLS_TO_ITERATE pools
+        with pool_signers, so a repeated or interrupted rebuild is harmless. The HTR
+        pair map is rebuilt along with the index, and the stored USD prices are
+        recomputed after the last pool. Only the owner can rebuild the index.
+
+        Args:
+            ctx: The transaction context
+            cursor: 0 for the first call, otherwise the cursor returned by the previous one
+
+        Returns:
+            The cursor of the next call, None once every pool is indexed
+
+        Raises:
+            Unauthorized: If the caller is not the owner
+            InvalidAction: If the cursor is invalid
+        """
+        if ctx.caller_id != self.owner:
+            raise Unauthorized("Only the owner can rebuild the signed pool index")
+        if cursor < 0 or cursor > len(self.all_pools):
+            raise InvalidAction("Invalid cursor")
+
+        end = min(len(self.all_pools), cursor + MAX_POOLS_TO_ITERATE)
+        for position in range(cursor, end):
+            pool_key = self.all_pools[position]
+            self._remove_signed_pool_from_index(pool_key)
+            if pool_key in self.pool_signers:
+                self._add_signed_pool_to_index(pool_key)
+
+        next_cursor = end if end < len(self.all_pools) else None
+        if next_cursor is None:
+            self._recompute_usd_prices()
+
+        self.log.info('signed pool index rebuilt',
+                      pools=end - cursor,
+                      next_cursor=next_cursor,
+                      caller=str(ctx.caller_id))
+        return next_cursor
+
+    @public
+    def refresh_usd_prices(self, ctx: Context) -> None:
+        """Recompute every stored USD price and its route from scratch.
+
+        Swaps and liquidity changes only re-derive prices along the stored routes;
+        calling this periodically also picks up routes that became better since the
+        last signed pool change. Only authorized signers can refresh the prices.
+
+        Args:
+            ctx: The transaction context
+
+        Raises:
+            Unauthorized: If the caller is not an authorized signer
+        """
+        if ctx.caller_id not in self.authorized_signers:
+            raise Unauthorized("Only authorized signers can refresh USD prices")
+
+        self._recompute_usd_prices()
+
+        self.log.info('usd prices refreshed',
+                      tokens=len(self.usd_price_tokens),
+                      caller=str(ctx.caller_id))
+
+    @public
+    def migrate_user_states(self, ctx: Context, pool_key: str, addresses: list[CallerId]) -> None:
+        """Move the given addresses' entries in a pool from the legacy per-user containers.
+
+        Contracts upgraded through upgrade_contract from a version with the legacy
+        containers keep working without this: every entry is read from them until
+        its first write moves it to pool_user_states (see _update_pool_user_state).
+        This lets the owner move entries ahead of time, which also indexes them in
+        user_pools. Calling it again for an address is harmless. Only the owner can
+        migrate.
+
+        Args:
+            ctx: The transaction context
+            pool_key: The pool whose entries should be migrated
+            addresses: Addresses whose state in the pool should be migrated
+
+        Raises:
+            Unauthorized: If the caller is not the owner
+            InvalidAction: If more than MAX_MIGRATION_BATCH_SIZE addresses are given
+            PoolNotFound: If the pool does not exist
+        """
+        if ctx.caller_id != self.owner:
+            raise Unauthorized("Only the owner can migrate user states")
+        if len(addresses) > MAX_MIGRATION_BATCH_SIZE:
+            raise InvalidAction("Too many addresses to migrate")
+        self._validate_pool_exists(pool_key)
+
+        migrated = 0
+        if pool_key in self.pool_user_liquidity:
+            for address in addresses:
+                if (
+                    address in self.pool_user_liquidity[pool_key]
+                    or address in self.pool_change[pool_key]
+                    or address in self.pool_user_deposit_price_usd[pool_key]
+                    or address in self.pool_user_last_action_timestamp[pool_key]
+                ):
+                    # A write without changes moves the entry
+                    self._update_pool_user_state(pool_key, address)
+                    migrated += 1
+
+        self.log.info('user states migrated',
+                      pool_key=pool_key,
+                      addresses=len(addresses),
+                      migrated_positions=migrated,
+                      caller=str(ctx.caller_id))
+
+    @public
+    def backfill_user_pools(self, ctx: Context, addresses: list[CallerId], cursor: int) -> int | None:
+        """Index the pools created before an upgrade where the given addresses hold liquidity.
+
+        Positions left in the legacy per-user containers only reach user_pools on
+        their first write, so get_user_pools scans the legacy pools for every
+        address not backfilled yet. This adds those positions to user_pools
+        without moving them. Start from cursor 0 and pass back the returned cursor
+        until it is None; each call checks at most MAX_POOLS_TO_ITERATE
+        (pool, address) pairs, and the addresses count as backfilled after the
+        last call. Calling it again is harmless. Only the owner can backfill.
+
+        Args:
+            ctx: The transaction context
+            addresses: Addresses to backfill, the same ones on every call of a run
+            cursor: 0 for the first call, otherwise the cursor returned by the previous one
+
+        Returns:
+            The cursor of the next call, None once every legacy pool is checked
+
+        Raises:
+            Unauthorized: If the caller is not the owner
+            InvalidAction: If the cursor is invalid or more than
+                MAX_MIGRATION_BATCH_SIZE addresses are given
+        """
+        if ctx.caller_id != self.owner:
+            raise Unauthorized("Only the owner can backfill user pools")
+        if len(addresses) == 0 or len(addresses) > MAX_MIGRATION_BATCH_SIZE:
+            raise InvalidAction("Invalid number of addresses to backfill")
+        if cursor < 0 or cursor > self.legacy_pool_count:
+            raise InvalidAction("Invalid cursor")
+
+        end = min(self.legacy_pool_count, cursor + max(1, MAX_POOLS_TO_ITERATE // len(addresses)))
+        for pool_id in range(cursor, end):
+            pool_key = self.all_pools[pool_id]
+            for address in addresses:
+                if self._get_legacy_user_liquidity(pool_key, address) > 0:
+                    self._add_user_pool(address, pool_key)
+
+        next_cursor = end if end < self.legacy_pool_count else None
+        if next_cursor is None:
+            for address in addresses:
+                self.user_pools_backfilled.add(address)
+
+        self.log.info('user pools backfilled',
+                      addresses=len(addresses),
+                      pools=end - cursor,
+                      next_cursor=next_cursor,
+                      caller=str(ctx.caller_id))
+        return next_cursor
+
+    @public
+    def backfill_pool_ids(self, ctx: Context, cursor: int) -> int | None:
+        """Assign pool ids to the pools of a contract upgraded from a version without them.
+
+        Start from cursor 0 and pass back the returned cursor until it is None. Each
+        call assigns at most MAX_POOLS_TO_ITERATE ids. Ids are the pools' positions in
+        all_pools, so calling it again is harmless. Until a pool has its id, looking it
+        up scans all_pools (see _get_pool_id). Only the owner can backfill pool ids.
+
+        Args:
+            ctx: The transaction context
+            cursor: 0 for the first call, otherwise the cursor returned by the previous one
+
+        Returns:
+            The cursor of the next call, None once every pool has an id
+
+        Raises:
+            Unauthorized: If the caller is not the owner
+            InvalidAction: If the cursor is invalid
+        """
+        if ctx.caller_id != self.owner:
+            raise Unauthorized("Only the owner can backfill pool ids")
+        if cursor < 0 or cursor > len(self.all_pools):
+            raise InvalidAction("Invalid cursor")
+
+        end = min(len(self.all_pools), cursor + MAX_POOLS_TO_ITERATE)
+        for pool_id in range(cursor, end):
+            self.pool_ids[self.all_pools[pool_id]] = pool_id
+
+        next_cursor = end if end < len(self.all_pools) else None
+        self.log.info('pool ids backfilled',
+                      pools=end - cursor,
+                      next_cursor=next_cursor,
+                      caller=str(ctx.caller_id))
+        return next_cursor
+
+    def _add_signed_pool_to_index(self, pool_key: str) -> None:
+        """Add a newly signed pool to the routing index of both of its tokens."""
+        pool = self.pools[pool_key]
+        for token in (pool.token_a, pool.token_b):
+            if token not in self.signed_token_to_pools:
+                self.signed_token_to_pools[token] = [pool_key]
+                self.signed_token_pool_positions[token] = {pool_key: 0}
+                continue
+            if pool_key in self.signed_token_pool_positions[token]:
+                continue
+            self.signed_token_pool_positions[token][pool_key] = len(self.signed_token_to_pools[token])
+            self.signed_token_to_pools[token].append(pool_key)
+
+        # Update HTR token map if this is an HTR pool with a lower fee
+        if pool.token_a == HATHOR_TOKEN_UID or pool.token_b == HATHOR_TOKEN_UID:
+            other_token = pool.token_b if pool.token_a == HATHOR_TOKEN_UID else pool.token_a
+            if other_token not in self.signed_htr_pools:
+                self.signed_htr_pools[other_token] = [pool_key]
+            elif pool_key not in self.signed_htr_pools[other_token]:
+                self.signed_htr_pools[other_token].append(pool_key)
+            current_pool_key = self.htr_token_map.get(other_token)
+            if current_pool_key is None or pool.fee_numerator < self.pools[current_pool_key].fee_numerator:
+                self.htr_token_map[other_token] = pool_key
+                self.log.debug('updating htr token map for pool',
+                               pool_key=pool_key,
+                               other_token=other_token.hex(),
+                               fee_numerator=pool.fee_numerator)
+
+    def _remove_signed_pool_from_index(self, pool_key: str) -> None:
+        """Remove an unsigned pool from the routing index of both of its tokens.
+
+        The last pool key of each token's list takes the place of the removed one.
+        """
+        pool = self.pools[pool_key]
+        for token in (pool.token_a, pool.token_b):
+            if token not in self.signed_token_pool_positions:
+                continue
+            positions = self.signed_token_pool_positions[token]
+            if pool_key not in positions:
+                continue
+
+            index = positions[pool_key]
+            last_pool_key = self.signed_token_to_pools[token].pop()
+            if last_pool_key != pool_key:
+                self.signed_token_to_pools[token][index] = last_pool_key
+                positions[last_pool_key] = index
+            del positions[pool_key]
+
+            if len(self.signed_token_to_pools[token]) == 0:
+                del self.signed_token_to_pools[token]
+                del self.signed_token_pool_positions[token]
+
+        # Fall back to the lowest fee HTR pool still signed for the other token
+        if pool.token_a == HATHOR_TOKEN_UID or pool.token_b == HATHOR_TOKEN_UID:
+            other_token = pool.token_b if pool.token_a == HATHOR_TOKEN_UID else pool.token_a
+            if other_token not in self.signed_htr_pools:
+                return
+            remaining = [key for key in self.signed_htr_pools[other_token] if key != pool_key]
+            if remaining:
+                self.signed_htr_pools[other_token] = remaining
+            else:
+                del self.signed_htr_pools[other_token]
+
+            if self.htr_token_map.get(other_token) != pool_key:
+                return
+            del self.htr_token_map[other_token]
+            for key in remaining:
+                candidate = self.pools[key]
+                current_pool_key = self.htr_token_map.get(other_token)
+                if current_pool_key is None or candidate.fee_numerator < self.pools[current_pool_key].fee_numerator:
+                    self.htr_token_map[other_token] = key
+
     @public
     def set_htr_usd_pool(
         self, ctx: Context, token_a: TokenUid, token_b: TokenUid, fee: Amount
@@ -3680,6 +4543,7 @@ class DozerPoolManager(Blueprint):
             raise InvalidTokens("HTR-USD pool must contain HTR as one of the tokens")
 
         self.htr_usd_pool_key = pool_key
+        self._recompute_usd_prices()
 
         self.log.info('htr usd pool set',
                       pool_key=pool_key,
@@ -3727,6 +4591,33 @@ class DozerPoolManager(Blueprint):
         self.log.info('contract unpaused',
                       caller=str(ctx.caller_id))
 
+    @public
+    def set_lazy_profit_tracking(self, ctx: Context, enabled: bool) -> None:
+        """Select how liquidity actions record the data behind get_user_profit_info.
+
+        When enabled, liquidity actions only store the position's token amounts and
+        get_user_profit_info values them at current USD prices, so the reported
+        profit is the position's value against holding those tokens. When disabled,
+        every liquidity action values the position in USD. Contracts upgraded from
+        a version without the flag get it disabled by post_upgrade_init.
+
+        Only the owner can change the mode.
+
+        Args:
+            ctx: The transaction context
+            enabled: Whether to use lazy profit tracking
+
+        Raises:
+            Unauthorized: If the caller is not the owner
+        """
+        if ctx.caller_id != self.owner:
+            raise Unauthorized("Only the owner can change the profit tracking mode")
+        self.lazy_profit_tracking = enabled
+
+        self.log.info('profit tracking mode changed',
+                      lazy=enabled,
+                      caller=str(ctx.caller_id))
+
     @view
     def is_paused(self) -> bool:
         """Check if the contract is currently paused.
@@ -3778,15 +4669,31 @@ class DozerPoolManager(Blueprint):
         Args:
             address: The address to check
 
+        Positions in pools created before an upgrade may still be held by the
+        legacy per-user containers; until the address is backfilled (see
+        backfill_user_pools), those pools are scanned for it.
+
         Returns:
-            A list of pool keys where the user has liquidity
+            A list of pool keys where the user has liquidity, in pool creation order
         """
-        user_pools = []
-        for pool_key in self.all_pools:
-            user_liquidity = self.pool_user_liquidity[pool_key].get(address, 0)
-            if user_liquidity > 0:
-                user_pools.append(pool_key)
-        return user_pools
+        pool_ids = []
+        if address in self.user_pools:
+            pool_ids = list(self.user_pools[address])
+        if address not in self.user_pools_backfilled:
+            for pool_id in range(self.legacy_pool_count):
+                if self._get_legacy_user_liquidity(self.all_pools[pool_id], address) > 0:
+                    pool_ids.append(pool_id)
+
+        result = []
+        for pool_id in sorted(pool_ids):
+            result.append(self.all_pools[pool_id])
+        return result
+
+    def _get_legacy_user_liquidity(self, pool_key: PoolKey, user_address: CallerId) -> Amount:
+        """Get a user's liquidity still held by the legacy per-user containers, 0 if none."""
+        if pool_key not in self.pool_user_liquidity:
+            return Amount(0)
+        return Amount(self.pool_user_liquidity[pool_key].get(user_address, 0))
 
     @view
     def get_user_positions(self, address: CallerId) -> dict[str, UserPosition]:
@@ -3799,29 +4706,30 @@ class DozerPoolManager(Blueprint):
             A dictionary mapping pool keys to UserPosition information
         """
         positions = {}
-        for pool_key in self.all_pools:
-            user_liquidity = self.pool_user_liquidity[pool_key].get(address, 0)
-            if user_liquidity > 0:
-                # Get detailed information about this position
-                user_info = self.user_info(address, pool_key)
-
-                # Create UserPosition with additional fee information
-                positions[pool_key] = UserPosition(
-                    liquidity=user_info.liquidity,
-                    token0Amount=user_info.token0Amount,
-                    token1Amount=user_info.token1Amount,
-                    share=user_info.share,
-                    balance_a=user_info.balance_a,
-                    balance_b=user_info.balance_b,
-                    token_a=user_info.token_a,
-                    token_b=user_info.token_b,
-                )
+        for pool_key in self.get_user_pools(address):
+            # Get detailed information about this position
+            user_info = self.user_info(address, pool_key)
+
+            # Create UserPosition with additional fee information
+            positions[pool_key] = UserPosition(
+                liquidity=user_info.liquidity,
+                token0Amount=user_info.token0Amount,
+                token1Amount=user_info.token1Amount,
+                share=user_info.share,
+                balance_a=user_info.balance_a,
+                balance_b=user_info.balance_b,
+                token_a=user_info.token_a,
+                token_b=user_info.token_b,
+            )
         return positions
 
     @view
     def get_token_price_in_htr(self, token: TokenUid) -> Amount:
         """Get the price of a token in HTR based on USD price and HTR-USD rate.
 
+        Tokens with a signed HTR pool are priced from the reserves of their lowest fee
+        HTR pool (htr_token_map) instead, without going through USD.
+
         Args:
             token: The token to get the price for
 
@@ -3832,6 +4740,10 @@ class DozerPoolManager(Blueprint):
         if token == HATHOR_TOKEN_UID:
             return Amount(100_000000)  # 1 with 8 decimal places
 
+        # Tokens paired with HTR are priced directly from their HTR pool
+        if token in self.htr_token_map:
+            return self._calculate_htr_pair_price(token, self.htr_token_map[token])
+
         # Get token price in USD
         token_usd_price = self.get_token_price_in_usd(token)
         if token_usd_price == 0:
@@ -3850,98 +4762,205 @@ class DozerPoolManager(Blueprint):
     def get_all_token_prices_in_htr(self) -> dict[str, Amount]:
         """Get the prices of all tokens in HTR based on USD prices and HTR-USD rate.
 
+        Each value equals get_token_price_in_htr(): tokens with a signed HTR pool are
+        priced from that pool's reserves, every other token through USD.
+
         Returns:
             A dictionary mapping token UIDs (hex) to their prices in HTR with 8 decimal places
         """
         result = {}
         result[HATHOR_TOKEN_UID.hex()] = Amount(100_000000)  # HTR itself has a price of 1 in HTR
-        
-        # Get all unique tokens from all pools
-        unique_tokens = set()
-        for pool_key in self.all_pools:
+
+        # Tokens paired with HTR, straight from their HTR pool
+        for pool_key in self.signed_token_to_pools.get(HATHOR_TOKEN_UID, []):
             pool = self.pools[pool_key]
-            token_a = pool.token_a
-            token_b = pool.token_b
-            unique_tokens.add(token_a)
-            unique_tokens.add(token_b)
-        
-        # Calculate price for each token (except HTR)
-        for token in unique_tokens:
-            if token != HATHOR_TOKEN_UID:
-                price = self.get_token_price_in_htr(token)
+            token = pool.token_b if pool.token_a == HATHOR_TOKEN_UID else pool.token_a
+            if self.htr_token_map.get(token) != pool_key:
+                continue
+            price = self._calculate_htr_pair_price(token, pool_key)
+            if price > 0:
+                result[token.hex()] = price
+
+        htr_usd_price = self.get_token_price_in_usd(HATHOR_TOKEN_UID)
+        if htr_usd_price == 0:
+            return result
+
+        # Calculate price for every other token from the stored USD prices
+        for token in self.usd_price_tokens:
+            if token != HATHOR_TOKEN_UID and token not in self.htr_token_map:
+                price = (self._get_stored_usd_price(token) * 100_000000) // htr_usd_price
                 if price > 0:
                     result[token.hex()] = Amount(price)
 
         return result
 
+    def _calculate_htr_pair_price(self, token: TokenUid, pool_key: str) -> Amount:
+        """Price of token in HTR from the reserves of an HTR pool, with 8 decimal places."""
+        pool = self.pools[pool_key]
+        if pool.token_a == HATHOR_TOKEN_UID:
+            reserve_htr, reserve_token = pool.reserve_a, pool.reserve_b
+        else:
+            reserve_htr, reserve_token = pool.reserve_b, pool.reserve_a
+
+        if reserve_token == 0:
+            return Amount(0)
+        return Amount((reserve_htr * 100_000000) // reserve_token)
+
     @view
     def get_token_price_in_usd(self, token: TokenUid) -> Amount:
         """Get the price of a token in USD using reserve ratio method.
 
+        Prices are read from the stored price oracle: each token is priced along
+        its best route from the USD token of the HTR-USD pool (see
+        _recompute_usd_prices). The first hop out of USD is applied from the live
+        reserves, and the rest of the route is re-derived whenever one of its pools
+        changes its reserves.
+
         Args:
             token: The token to get the price for
 
         Returns:
             The price of the token in USD with 8 decimal places, or 0 if not available
         """
-        # First, check if we have a HTR-USD pool set
-        if not self.htr_usd_pool_key:
+        return self._get_stored_usd_price(token)
+
+    def _get_stored_usd_price(self, token: TokenUid) -> Amount:
+        """Complete a stored price with the first hop of its route, or 0 if the token has no price."""
+        if token not in self.usd_price_routes:
             return Amount(0)
-        
-        # Get the USD token from the HTR-USD pool
-        pool_key = self.htr_usd_pool_key
-        pool = self.pools[pool_key]
-        if pool.token_a == HATHOR_TOKEN_UID:
-            usd_token = pool.token_b
-        else:
-            usd_token = pool.token_a
-        
-        # USD token price is always 1.00
-        if token == usd_token:
-            return Amount(100_000000)  # 8 decimal places to match contract storage
-        
-        # Find the best path from USD to target token using pathfinding
-        # This gives us the path USD → TOKEN_A (but we'll calculate in reverse)
-        ref_amount = Amount(100_00)  # Reference amount to get the path
-        swap_info = self.find_best_swap_path(ref_amount, usd_token, token, 3)
-        
-        if not swap_info.path or swap_info.amount_out == 0:
+
+        price = self.usd_prices[token]
+        route = self.usd_price_routes[token]
+        if not route:
+            # The USD token itself
+            return price
+
+        usd_token = self._get_usd_token()
+        if usd_token is None:
             return Amount(0)
-        
-        # Parse the path to get pool keys
-        pool_keys = swap_info.path.split(",")
-        
+
+        # Last hop of the token → USD chain, as in _calculate_path_price_in_usd
+        pool = self.pools[route.split(",")[0]]
+        reserve_usd, reserve_other, _ = self._resolve_token_direction(pool, usd_token)
+        if reserve_other == 0:
+            return Amount(0)
+        return Amount((price * reserve_usd) // reserve_other)
+
+    def _get_usd_token(self) -> TokenUid | None:
+        """Return the USD token of the HTR-USD reference pool, or None if it is not set."""
+        if not self.htr_usd_pool_key:
+            return None
+
+        pool = self.pools[self.htr_usd_pool_key]
+        if pool.token_a == HATHOR_TOKEN_UID:
+            return pool.token_b
+        return pool.token_a
+
+    def _calculate_path_price_in_usd(self, token: TokenUid, pool_keys: list[str]) -> Amount:
+        """Chain spot reserve ratios from token back to the first token of a path ending at token.
+
+        Args:
+            token: The token being priced (last token of the path)
+            pool_keys: Pool keys of the path, e.g. a USD → token route
+
+        Returns:
+            The price of the token in the path's first token with 8 decimal places,
+            or 0 if the path is invalid
+        """
         # Calculate cumulative price using reserve ratios with integer precision
         # We want TOKEN_A price in USD, so we calculate in reverse direction
         # Start with 1
         final_price = 1_00000000  # 1 with 8 decimal places
         current_token = token  # Start from TOKEN_A
-        
+
         # Iterate through pools in reverse order (TOKEN_A → USD direction)
-        for i, pool_key_iter in enumerate(reversed(pool_keys)):
-            pool_iter = self.pools[pool_key_iter]
+        for pool_key in reversed(pool_keys):
+            pool = self.pools[pool_key]
             # Determine which token is the input and output for this hop
-            swap_info = self._try_resolve_token_direction(pool_iter, current_token)
+            swap_info = self._try_resolve_token_direction(pool, current_token)
             if swap_info is None:
                 # Invalid path - token not found in pool
                 return Amount(0)
             reserve_in, reserve_out, next_token = swap_info
-            
+
             # Check for zero reserves (avoid division by zero)
             if reserve_in == 0:
                 return Amount(0)
-            
+
             # Calculate spot price for this hop: reserve_out / reserve_in
             # This gives us "how much of next_token per current_token"
-            # hop_price = reserve_out / reserve_in
             final_price = (final_price * reserve_out) // reserve_in
-            
+
             # Move to next token in the path
             current_token = next_token
-        
-        result = Amount(final_price)
-        return result
-    
+
+        return Amount(final_price)
+
+    def _recompute_usd_prices(self) -> None:
+        """Re-derive every stored USD price, and the route it comes from, from scratch.
+
+        Runs one bounded (3 hops) route search from the USD token over the signed
+        pool index and stores, for each reached token, its best path and the spot
+        price along it. Called whenever the signed pools or the HTR-USD pool change,
+        since those are what decide the best routes.
+        """
+        # Drop the previous table key by key
+        while len(self.usd_price_tokens) > 0:
+            token = self.usd_price_tokens.pop()
+            for pool_key in self.usd_price_routes[token].split(",")[1:]:
+                pool_id = self._get_pool_id(pool_key)
+                if pool_id in self.pool_usd_price_dependents:
+                    del self.pool_usd_price_dependents[pool_id]
+            del self.usd_prices[token]
+            del self.usd_price_routes[token]
+
+        usd_token = self._get_usd_token()
+        if usd_token is None:
+            return
+
+        self._store_usd_price(usd_token, [])
+        if usd_token not in self.signed_token_to_pools:
+            return
+
+        # Reference amount used to rank the routes from USD
+        ref_amount = Amount(100_00)
+        labels = self._search_routes(usd_token, ref_amount, 3, False)
+
+        # Each reached token once, in the order the search first labelled it
+        for token in dict.fromkeys(token for token, _hops in labels):
+            hops = self._select_best_route(labels, token, 3, False)
+            if hops == 0:
+                continue
+            pool_keys, _amounts = self._reconstruct_route(labels, token, hops)
+            self._store_usd_price(token, pool_keys)
+
+    def _store_usd_price(self, token: TokenUid, pool_keys: list[str]) -> None:
+        """Store a token's route and its price along every hop but the first.
+
+        The first hop leaves USD through a pool such as HTR-USD that most routes
+        share, so it is applied on read (see _get_stored_usd_price) and swaps in
+        those pools re-derive nothing. The token is indexed under every other pool.
+        """
+        self.usd_prices[token] = self._calculate_path_price_in_usd(token, pool_keys[1:])
+        self.usd_price_routes[token] = ",".join(pool_keys)
+        self.usd_price_tokens.append(token)
+        for pool_key in pool_keys[1:]:
+            pool_id = self._get_pool_id(pool_key)
+            if pool_id in self.pool_usd_price_dependents:
+                self.pool_usd_price_dependents[pool_id].append(token)
+            else:
+                self.pool_usd_price_dependents[pool_id] = [token]
+
+    def _refresh_usd_prices_for_pool(self, pool_key: str) -> None:
+        """Re-derive the stored USD prices of the tokens whose route passes through pool_key.
+
+        Only the prices are updated; the routes themselves are kept until the next
+        _recompute_usd_prices.
+        """
+        for token in self.pool_usd_price_dependents[self._get_pool_id(pool_key)]:
+            pool_keys = self.usd_price_routes[token].split(",")
+            self.usd_prices[token] = self._calculate_path_price_in_usd(token, pool_keys[1:])
+
     @view
     def get_pool_twap_timestamp(
         self,
@@ -3977,7 +4996,123 @@ class DozerPoolManager(Blueprint):
         if pool.reserve_a == 0 or pool.reserve_b == 0:
             raise NCFail("Pool has no liquidity")
 
-        # Calculate time elapsed since last TWAP update
+        twap_price_a, twap_price_b = self._get_pool_twap_prices(pool, current_timestamp)
+
+        if token_a == pool.token_a:
+            # We want token_a/token_b = reserve_a/reserve_b = price_b
+            twap_price = twap_price_b
+        else:
+            # We want token_b/token_a = reserve_b/reserve_a = price_a
+            twap_price = twap_price_a
+
+        return twap_price
+
+    @view
+    def consult(
+        self, pool_key: str, seconds_ago_list: list[int], current_timestamp: int
+    ) -> list[tuple[Amount, Amount]]:
+        """Get the average prices of a pool over several windows ending at current_timestamp.
+
+        Averages come from the pool's TWAP observation ring buffer. Windows ending
+        between two kept observations are interpolated linearly, so they are exact
+        to within TWAP_OBSERVATION_INTERVAL.
+
+        Args:
+            pool_key: The pool key to check
+            seconds_ago_list: Window lengths in seconds, 0 for the current spot prices
+            current_timestamp: The current timestamp
+
+        Returns:
+            One (price_a, price_b) tuple per window with PRICE_PRECISION, where price_a
+            is token_b per token_a and price_b is token_a per token_b
+
+        Raises:
+            PoolNotFound: If the pool does not exist
+            InvalidAction: If a window length is negative
+            InvalidState: If the pool has no observations or they do not cover a window
+        """
+        self._validate_pool_exists(pool_key)
+        pool = self.pools[pool_key]
+
+        if pool.reserve_a == 0 or pool.reserve_b == 0:
+            raise NCFail("Pool has no liquidity")
+        if self._get_pool_id(pool_key) not in self.pool_twap_observation_cursor:
+            raise InvalidState("Pool has no TWAP observations")
+
+        price_a_now = Amount((pool.reserve_b * PRICE_PRECISION) // pool.reserve_a)
+        price_b_now = Amount((pool.reserve_a * PRICE_PRECISION) // pool.reserve_b)
+        cumulative_a_now, cumulative_b_now = self._get_twap_cumulatives(
+            pool_key, current_timestamp, price_a_now, price_b_now
+        )
+
+        result: list[tuple[Amount, Amount]] = []
+        for seconds_ago in seconds_ago_list:
+            if seconds_ago < 0:
+                raise InvalidAction("Window length must not be negative")
+            if seconds_ago == 0:
+                result.append((price_a_now, price_b_now))
+                continue
+            cumulative_a, cumulative_b = self._get_twap_cumulatives(
+                pool_key, current_timestamp - seconds_ago, price_a_now, price_b_now
+            )
+            result.append((
+                Amount((cumulative_a_now - cumulative_a) // seconds_ago),
+                Amount((cumulative_b_now - cumulative_b) // seconds_ago),
+            ))
+        return result
+
+    def _get_twap_cumulatives(
+        self, pool_key: str, target_timestamp: int, price_a_now: Amount, price_b_now: Amount
+    ) -> tuple[int, int]:
+        """Get the cumulative prices of a pool at target_timestamp.
+
+        Past the newest observation the current spot prices are accumulated. Otherwise
+        the observations around target_timestamp are found by binary search over the
+        ring buffer, in chronological order, and interpolated.
+        """
+        pool_id = self._get_pool_id(pool_key)
+        observations = self.pool_twap_observations[pool_id]
+        slot, count = self.pool_twap_observation_cursor[pool_id]
+        newest = observations[slot]
+
+        if target_timestamp >= newest.timestamp:
+            time_elapsed = target_timestamp - newest.timestamp
+            return (
+                newest.price_a_cumulative + price_a_now * time_elapsed,
+                newest.price_b_cumulative + price_b_now * time_elapsed,
+            )
+
+        oldest_slot = 0 if count < TWAP_OBSERVATION_CARDINALITY else (slot + 1) % TWAP_OBSERVATION_CARDINALITY
+        if target_timestamp < observations[oldest_slot].timestamp:
+            raise InvalidState("TWAP observations do not cover the requested window")
+
+        # Invariant: the observation at position low is at or before the target, the one at high after it
+        low = 0
+        high = count - 1
+        while high - low > 1:
+            mid = (low + high) // 2
+            if observations[(oldest_slot + mid) % TWAP_OBSERVATION_CARDINALITY].timestamp <= target_timestamp:
+                low = mid
+            else:
+                high = mid
+
+        before = observations[(oldest_slot + low) % TWAP_OBSERVATION_CARDINALITY]
+        after = observations[(oldest_slot + high) % TWAP_OBSERVATION_CARDINALITY]
+        offset = target_timestamp - before.timestamp
+        span = after.timestamp - before.timestamp
+        return (
+            before.price_a_cumulative + (after.price_a_cumulative - before.price_a_cumulative) * offset // span,
+            before.price_b_cumulative + (after.price_b_cumulative - before.price_b_cumulative) * offset // span,
+        )
+
+    def _get_pool_twap_prices(self, pool: PoolState, current_timestamp: int) -> tuple[Amount, Amount]:
+        """Get the windowed TWAP prices of a pool with liquidity, as of current_timestamp.
+
+        Returns:
+            A tuple (price_a, price_b) with PRICE_PRECISION, where price_a is token_b
+            per token_a and price_b is token_a per token_b
+        """
+        # Calculate time elapsed since last TWAP update
         time_elapsed = current_timestamp - pool.block_timestamp_last
 
         # Calculate current spot prices
@@ -3989,54 +5124,103 @@ class DozerPoolManager(Blueprint):
             pool, time_elapsed, price_a_now, price_b_now
         )
 
-        if token_a == pool.token_a:
-            # We want token_a/token_b = reserve_a/reserve_b = price_b
-            twap_price = Amount(current_window_sum_b // pool.twap_window)
-        else:
-            # We want token_b/token_a = reserve_b/reserve_a = price_a
-            twap_price = Amount(current_window_sum_a // pool.twap_window)
+        return (
+            Amount(current_window_sum_a // pool.twap_window),
+            Amount(current_window_sum_b // pool.twap_window),
+        )
+
+    @view
+    def get_token_twap_price_in_usd(self, token: TokenUid, current_timestamp: int) -> Amount:
+        """Get the price of a token in USD chaining TWAP prices along its pricing route.
+
+        The route is the one get_token_price_in_usd() prices the token along, with each
+        hop's spot reserve ratio replaced by the pool's windowed TWAP price, so a short
+        lived reserve manipulation on any hop is diluted over the pool's TWAP window.
+
+        Args:
+            token: The token to get the price for
+            current_timestamp: Timestamp the TWAP windows are brought up to
+
+        Returns:
+            The TWAP price of the token in USD with 8 decimal places, or 0 if not available
+        """
+        return self._get_token_twap_price_in_usd(token, current_timestamp, {})
+
+    @view
+    def get_all_token_twap_prices_in_usd(self, current_timestamp: int) -> dict[str, Amount]:
+        """Get the TWAP prices of all tokens in USD in one pass over the stored routes.
+
+        Every pool's TWAP is computed once and shared by all routes through it. Each
+        value equals get_token_twap_price_in_usd() for that token.
+
+        Args:
+            current_timestamp: Timestamp the TWAP windows are brought up to
+
+        Returns:
+            A dictionary mapping token UIDs (hex) to their TWAP prices in USD with 8 decimal places
+        """
+        pool_twap_prices: dict[str, tuple[Amount, Amount]] = {}
+        result = {}
+        for token in self.usd_price_tokens:
+            price = self._get_token_twap_price_in_usd(token, current_timestamp, pool_twap_prices)
+            if price > 0:
+                result[token.hex()] = price
+        return result
+
+    def _get_token_twap_price_in_usd(
+        self,
+        token: TokenUid,
+        current_timestamp: int,
+        pool_twap_prices: dict[str, tuple[Amount, Amount]],
+    ) -> Amount:
+        """Chain TWAP prices from token back to USD along the token's stored route.
+
+        Walks the route like _calculate_path_price_in_usd. pool_twap_prices memoizes
+        the (price_a, price_b) of each pool for the duration of the calling view.
+        """
+        if token not in self.usd_price_routes:
+            return Amount(0)
+
+        route = self.usd_price_routes[token]
+        if not route:
+            # The USD token itself
+            return Amount(100_000000)
+
+        final_price = 1_00000000  # 1 with 8 decimal places
+        current_token = token
+        for pool_key in reversed(route.split(",")):
+            pool = self.pools[pool_key]
+            if pool.reserve_a == 0 or pool.reserve_b == 0:
+                return Amount(0)
+
+            if pool_key not in pool_twap_prices:
+                pool_twap_prices[pool_key] = self._get_pool_twap_prices(pool, current_timestamp)
+            twap_price_a, twap_price_b = pool_twap_prices[pool_key]
+
+            # TWAP of "how much of the next token per current_token"
+            if current_token == pool.token_a:
+                final_price = (final_price * twap_price_a) // PRICE_PRECISION
+                current_token = pool.token_b
+            else:
+                final_price = (final_price * twap_price_b) // PRICE_PRECISION
+                current_token = pool.token_a
+
+        return Amount(final_price)
 
-        return twap_price
     @view
     def get_all_token_prices_in_usd(self) -> dict[str, Amount]:
         """Get the prices of all tokens in USD using reserve ratio method.
 
+        All prices are read from the stored price oracle (see _recompute_usd_prices).
+
         Returns:
             A dictionary mapping token UIDs (hex) to their prices in USD with 8 decimal places
         """
-        # First, check if we have a HTR-USD pool set
-        if not self.htr_usd_pool_key:
-            return {}
-        
         result = {}
-        
-        # Get the USD token from the HTR-USD pool
-        pool_key = self.htr_usd_pool_key
-        pool = self.pools[pool_key]
-        if pool.token_a == HATHOR_TOKEN_UID:
-            usd_token = pool.token_b
-        else:
-            usd_token = pool.token_a
-        
-        # Get all unique tokens from all pools
-        unique_tokens = set()
-        for pool_key_iter in self.all_pools:
-            pool_iter = self.pools[pool_key_iter]
-            token_a = pool_iter.token_a
-            token_b = pool_iter.token_b
-            unique_tokens.add(token_a)
-            unique_tokens.add(token_b)
-        
-        # Calculate USD price for each token
-        for token in unique_tokens:
-            # USD token is always 1.00 (100_000000 with 8 decimal places)
-            if token == usd_token:
-                result[token.hex()] = Amount(100_000000)
-            else:
-                price = self.get_token_price_in_usd(token)
-                if price > 0:
-                    result[token.hex()] = Amount(price)
-
+        for token in self.usd_price_tokens:
+            price = self._get_stored_usd_price(token)
+            if price > 0:
+                result[token.hex()] = price
         return result
 
     @public
@@ -4065,6 +5249,9 @@ class DozerPoolManager(Blueprint):
     def upgrade_contract(self, ctx: Context, new_blueprint_id: BlueprintId, new_version: str) -> None:
         """Upgrade the contract to a new blueprint version.
 
+        If the new blueprint adds scalar fields, the owner must call its
+        post_upgrade_init right after the upgrade.
+
         Args:
             ctx: Transaction context
             new_blueprint_id: The blueprint ID to upgrade to
@@ -4094,6 +5281,39 @@ class DozerPoolManager(Blueprint):
         # Perform the upgrade
         self.syscall.change_blueprint(new_blueprint_id)
 
+    @public
+    def post_upgrade_init(self, ctx: Context) -> None:
+        """Set the scalar fields added to the storage layout since the upgraded version.
+
+        upgrade_contract only swaps the blueprint: the new blueprint's container
+        fields start empty, but its new scalar fields stay unset and every method
+        reading them fails. The owner must call this right after upgrading a
+        contract created with an older layout, ideally while it is paused. Fields
+        get the value matching the old behavior: lazy_profit_tracking is disabled,
+        and every existing pool counts as a legacy pool for get_user_pools (see
+        backfill_user_pools). Contracts created with this layout already have them set.
+
+        Args:
+            ctx: The transaction context
+
+        Raises:
+            Unauthorized: If the caller is not the owner
+            InvalidState: If the scalar fields of this layout are already set
+        """
+        if ctx.caller_id != self.owner:
+            raise Unauthorized("Only the owner can initialize an upgraded contract")
+        if STORAGE_LAYOUT in self.initialized_layouts:
+            raise InvalidState("Contract storage is already initialized")
+
+        self.lazy_profit_tracking = False
+        self.legacy_pool_count = len(self.all_pools)
+        self.initialized_layouts.add(STORAGE_LAYOUT)
+
+        self.log.info('upgraded contract initialized',
+                      layout=STORAGE_LAYOUT,
+                      version=self.contract_version,
+                      caller=str(ctx.caller_id))
+
     def _is_version_higher(self, new_version: str, current_version: str) -> bool:
         """Compare semantic versions (e.g., "1.2.3").
 
@@ -4179,6 +5399,87 @@ class DozerPoolManager(Blueprint):
             result.append(pool_key)
         return result
 
+    @view
+    def get_pool_id(self, pool_key: str) -> int:
+        """Get the compact sequential id of a pool.
+
+        Args:
+            pool_key: The pool key to look up
+
+        Returns:
+            The pool id, its position in get_all_pools
+
+        Raises:
+            PoolNotFound: If the pool does not exist
+        """
+        self._validate_pool_exists(pool_key)
+        return self._get_pool_id(pool_key)
+
+    @view
+    def get_pool_key_by_id(self, pool_id: int) -> str:
+        """Get the pool key of a pool id.
+
+        Args:
+            pool_id: The pool id to look up
+
+        Returns:
+            The pool key
+
+        Raises:
+            PoolNotFound: If no pool has this id
+        """
+        if pool_id < 0 or pool_id >= len(self.all_pools):
+            raise PoolNotFound(f"Pool does not exist: {pool_id}")
+        return self.all_pools[pool_id]
+
+    @view
+    def get_pools_page(self, cursor: int, limit: int, signed_only: bool) -> PoolsPage:
+        """Get a page of pools together with their PoolInfo and PoolApiInfo records.
+
+        Pools are listed in creation order. Each call examines at most MAX_POOLS_PAGE_SCAN
+        pool keys, so a signed_only page may hold fewer than limit pools while next_cursor
+        is still set; keep paging until next_cursor is None.
+
+        Args:
+            cursor: 0 for the first page, otherwise the next_cursor of the previous page
+            limit: Maximum number of pools to return (1-50, enforced by hard limit)
+            signed_only: Whether to list only pools signed for the Dozer dApp
+
+        Returns:
+            A PoolsPage with the pools of this page and the cursor of the next one
+
+        Raises:
+            InvalidAction: If the cursor or limit is invalid
+        """
+        if cursor < 0 or cursor > len(self.all_pools):
+            raise InvalidAction("Invalid cursor")
+        if limit <= 0:
+            raise InvalidAction("Invalid limit")
+        if limit > MAX_POOLS_PAGE_SIZE:
+            limit = MAX_POOLS_PAGE_SIZE
+
+        pool_keys: list[str] = []
+        pools: list[PoolInfo] = []
+        api_pools: list[PoolApiInfo] = []
+        end = min(len(self.all_pools), cursor + MAX_POOLS_PAGE_SCAN)
+        position = cursor
+        while position < end and len(pool_keys) < limit:
+            pool_key = self.all_pools[position]
+            position += 1
+            if signed_only and pool_key not in self.pool_signers:
+                continue
+            pool_keys.append(pool_key)
+            pools.append(self._get_pool_info(pool_key))
+            api_pools.append(self._get_pool_api_info(pool_key))
+
+        next_cursor = position if position < len(self.all_pools) else None
+        return PoolsPage(
+            pool_keys=pool_keys,
+            pools=pools,
+            api_pools=api_pools,
+            next_cursor=next_cursor,
+        )
+
     @view
     def get_pools_for_token(self, token: TokenUid) -> list[str]:
         """Get all pools that contain a specific token.
@@ -4219,7 +5520,7 @@ class DozerPoolManager(Blueprint):
         """
         self._validate_pool_exists(pool_key)
 
-        return Amount(self.pool_user_liquidity[pool_key].get(address, 0))
+        return self._get_pool_user_state(pool_key, address).liquidity
 
     @view
     def change_of(
@@ -4241,9 +5542,9 @@ class DozerPoolManager(Blueprint):
         """
         self._validate_pool_exists(pool_key)
 
-        change_a, change_b = self.pool_change[pool_key].get(address, (Amount(0), Amount(0)))
+        state = self._get_pool_user_state(pool_key, address)
 
-        return (change_a, change_b)
+        return (state.balance_a, state.balance_b)
 
     @view
     def front_end_api_pool(
@@ -4261,17 +5562,14 @@ class DozerPoolManager(Blueprint):
         Raises:
             PoolNotFound: If the pool does not exist
         """
-
-        token_a, token_b, fee = pool_key.split("/")
-        token_a = TokenUid(bytes.fromhex(token_a))
-        token_b = TokenUid(bytes.fromhex(token_b))
-        fee = Amount(int(fee))
-        # Ensure tokens are ordered
-        token_a, token_b = self._order_tokens(token_a, token_b)
-
         self._validate_pool_exists(pool_key)
+        return self._get_pool_api_info(pool_key)
 
+    def _get_pool_api_info(self, pool_key: str) -> PoolApiInfo:
+        """Build the frontend PoolApiInfo of an existing pool."""
         pool = self.pools[pool_key]
+        token_a = pool.token_a
+        token_b = pool.token_b
 
         is_signed = pool_key in self.pool_signers
         signer_address = self.pool_signers.get(pool_key, None)
@@ -4295,6 +5593,63 @@ class DozerPoolManager(Blueprint):
         )
 
 
+    @view
+    def get_pool_stats(self, pool_key: str, window_seconds: int, current_timestamp: int) -> PoolStats:
+        """Get a pool's swap volume, fees and transaction count over a recent window.
+
+        Statistics are kept in hourly buckets, so the window is widened to start at
+        the beginning of its first hour (see window_start). Windows of up to 7 days
+        are supported, e.g. 86400 for 24h figures. The internal swaps of single
+        token liquidity actions are counted as swaps.
+
+        Args:
+            pool_key: The pool key to check
+            window_seconds: Length of the window ending at current_timestamp
+            current_timestamp: The current timestamp
+
+        Returns:
+            A PoolStats NamedTuple with the totals over the window
+
+        Raises:
+            PoolNotFound: If the pool does not exist
+            InvalidAction: If the window is not positive or longer than 7 days
+        """
+        self._validate_pool_exists(pool_key)
+        if window_seconds <= 0 or window_seconds > POOL_STATS_BUCKETS * POOL_STATS_BUCKET_SECONDS:
+            raise InvalidAction("Invalid stats window")
+
+        last_period = current_timestamp // POOL_STATS_BUCKET_SECONDS
+        first_period = (current_timestamp - window_seconds + 1) // POOL_STATS_BUCKET_SECONDS
+        if last_period - first_period >= POOL_STATS_BUCKETS:
+            first_period = last_period - POOL_STATS_BUCKETS + 1
+
+        volume_a = 0
+        volume_b = 0
+        fee_a = 0
+        fee_b = 0
+        transactions = 0
+        pool_id = self._get_pool_id(pool_key)
+        if pool_id in self.pool_stats_buckets:
+            buckets = self.pool_stats_buckets[pool_id]
+            for period in range(first_period, last_period + 1):
+                bucket = buckets.get(period % POOL_STATS_BUCKETS)
+                if bucket is None or bucket.period != period:
+                    continue
+                volume_a += bucket.volume_a
+                volume_b += bucket.volume_b
+                fee_a += bucket.fee_a
+                fee_b += bucket.fee_b
+                transactions += bucket.transactions
+
+        return PoolStats(
+            volume_a=Amount(volume_a),
+            volume_b=Amount(volume_b),
+            fee_a=Amount(fee_a),
+            fee_b=Amount(fee_b),
+            transactions=Amount(transactions),
+            window_start=first_period * POOL_STATS_BUCKET_SECONDS,
+        )
+
     @view
     def pool_info(
         self,
@@ -4312,6 +5667,10 @@ class DozerPoolManager(Blueprint):
             PoolNotFound: If the pool does not exist
         """
         self._validate_pool_exists(pool_key)
+        return self._get_pool_info(pool_key)
+
+    def _get_pool_info(self, pool_key: str) -> PoolInfo:
+        """Build the PoolInfo of an existing pool."""
         pool = self.pools[pool_key]
 
         is_signed = pool_key in self.pool_signers
@@ -4360,8 +5719,10 @@ class DozerPoolManager(Blueprint):
         pool = self.pools[pool_key]
 
         # Get user-specific data
-        liquidity = self.pool_user_liquidity[pool_key].get(address, 0)
-        balance_a, balance_b = self.pool_change[pool_key].get(address, (Amount(0), Amount(0)))
+        state = self._get_pool_user_state(pool_key, address)
+        liquidity = state.liquidity
+        balance_a = state.balance_a
+        balance_b = state.balance_b
 
         # Calculate share
         share = 0
@@ -4389,6 +5750,73 @@ class DozerPoolManager(Blueprint):
             token_b=pool.token_b.hex(),
         )
 
+    @view
+    def get_liquidity_snapshot(
+        self,
+        address: CallerId,
+        pool_key: str,
+        token_in: TokenUid,
+        amount_in: Amount,
+        current_timestamp: int,
+    ) -> LiquiditySnapshot:
+        """Get everything a contract providing liquidity needs about a pool in one call.
+
+        Combines user_info, get_twap_price, get_token_price_in_usd(HTR) and
+        front_quote_add_liquidity_in, so integrating contracts such as Oasis pay for
+        a single cross-contract view call per operation.
+
+        Args:
+            address: The address whose position is read
+            pool_key: The pool key to check
+            token_in: The token amount_in is given in
+            amount_in: Amount to quote the add-liquidity counterpart for, 0 to skip the quote
+            current_timestamp: The current timestamp, used for the TWAP prices
+
+        Returns:
+            A LiquiditySnapshot NamedTuple
+
+        Raises:
+            PoolNotFound: If the pool does not exist
+            InvalidTokens: If token_in is not part of the pool
+        """
+        self._validate_pool_exists(pool_key)
+        pool = self.pools[pool_key]
+        if token_in != pool.token_a and token_in != pool.token_b:
+            raise InvalidTokens(f"Token {token_in.hex()} is not part of pool {pool_key}")
+
+        state = self._get_pool_user_state(pool_key, address)
+        token_a_amount = 0
+        token_b_amount = 0
+        if pool.total_liquidity > 0:
+            token_a_amount = pool.reserve_a * state.liquidity // pool.total_liquidity
+            token_b_amount = pool.reserve_b * state.liquidity // pool.total_liquidity
+
+        twap_price_a = Amount(0)
+        twap_price_b = Amount(0)
+        quote_amount = Amount(0)
+        if pool.reserve_a > 0 and pool.reserve_b > 0:
+            twap_price_a, twap_price_b = self._get_pool_twap_prices(pool, current_timestamp)
+            if amount_in > 0:
+                if token_in == pool.token_a:
+                    quote_amount = self.quote(amount_in, pool.reserve_a, pool.reserve_b)
+                else:
+                    quote_amount = self.quote(amount_in, pool.reserve_b, pool.reserve_a)
+
+        return LiquiditySnapshot(
+            token_a=pool.token_a.hex(),
+            token_b=pool.token_b.hex(),
+            reserve_a=pool.reserve_a,
+            reserve_b=pool.reserve_b,
+            total_liquidity=pool.total_liquidity,
+            liquidity=Amount(state.liquidity),
+            token0Amount=Amount(token_a_amount),
+            token1Amount=Amount(token_b_amount),
+            twap_price_a=twap_price_a,
+            twap_price_b=twap_price_b,
+            htr_price_usd=self._get_stored_usd_price(TokenUid(HATHOR_TOKEN_UID)),
+            quote_amount=quote_amount,
+        )
+
     @view
     def get_user_profit_info(
         self,
@@ -4397,6 +5825,15 @@ class DozerPoolManager(Blueprint):
     ) -> UserProfitInfo:
         """Get profit/loss information for a user's position in a pool.
 
+        The meaning of the profit depends on the mode the position was last recorded
+        in (see set_lazy_profit_tracking). Without lazy_profit_tracking,
+        initial_value_usd is the USD value of the position at the last liquidity
+        action, so the profit includes the USD price moves of both tokens since then.
+        With it, initial_value_usd is the token amounts of the position at the last
+        liquidity action valued at current USD prices. The profit is then the
+        position against holding those tokens (fees minus impermanent loss), and
+        token price moves alone show no profit.
+
         Args:
             address: The address to check
             pool_key: The pool key to check
@@ -4410,8 +5847,8 @@ class DozerPoolManager(Blueprint):
         self._validate_pool_exists(pool_key)
 
         # Check if user has liquidity in this pool
-        user_liquidity = self.pool_user_liquidity[pool_key].get(address, 0)
-        if user_liquidity == 0:
+        state = self._get_pool_user_state(pool_key, address)
+        if state.liquidity == 0:
             return UserProfitInfo(
                 current_value_usd=Amount(0),
                 initial_value_usd=Amount(0),
@@ -4421,22 +5858,19 @@ class DozerPoolManager(Blueprint):
             )
 
         # Get current USD value of position
-        current_value_usd = self._calculate_user_position_usd_value(address, pool_key)
-
-        # Get stored initial USD value
-        initial_value_usd = self.pool_user_deposit_price_usd[pool_key].get(address, 0)
+        current_value_usd = self._calculate_position_usd_value(pool_key, state.liquidity)
 
-        # Get last action timestamp
-        last_action_timestamp = self.pool_user_last_action_timestamp[pool_key].get(address, 0)
+        # Get the initial USD value, converting a lazily recorded cost basis at current prices
+        if state.cost_basis_a > 0 or state.cost_basis_b > 0:
+            initial_value_usd = self._calculate_token_amounts_usd_value(
+                pool_key, state.cost_basis_a, state.cost_basis_b
+            )
+        else:
+            initial_value_usd = state.deposit_value_usd
+        last_action_timestamp = state.last_action_timestamp
 
         # Calculate profit/loss
-        if initial_value_usd == 0:
-            profit_amount_usd = Amount(0)
-            profit_percentage = Amount(0)
-        else:
-            profit_amount_usd = (current_value_usd - initial_value_usd)
-            # Calculate percentage with 2 decimal places (e.g., 341 = 3.41%)
-            profit_percentage = ((profit_amount_usd * 10000) // initial_value_usd)
+        profit_amount_usd, profit_percentage = self._calculate_profit(current_value_usd, initial_value_usd)
 
         return UserProfitInfo(
             current_value_usd=current_value_usd,
@@ -4446,15 +5880,104 @@ class DozerPoolManager(Blueprint):
             last_action_timestamp=last_action_timestamp,
         )
 
+    def _calculate_profit(self, current_value_usd: int, initial_value_usd: int) -> tuple[int, int]:
+        """Return (profit_amount_usd, profit_percentage), both 0 without an initial value."""
+        if initial_value_usd == 0:
+            return 0, 0
+        profit_amount_usd = current_value_usd - initial_value_usd
+        # Calculate percentage with 2 decimal places (e.g., 341 = 3.41%)
+        return profit_amount_usd, (profit_amount_usd * 10000) // initial_value_usd
+
+    @view
+    def get_user_portfolio(self, address: CallerId) -> UserPortfolio:
+        """Get all of a user's liquidity positions with their USD values and profit/loss.
+
+        Each token is priced once for the whole portfolio. Per position the values
+        match get_user_profit_info.
+
+        Args:
+            address: The address to check
+
+        Returns:
+            A UserPortfolio with one PortfolioPosition per pool where the user has
+            liquidity, in pool creation order, and the portfolio totals
+        """
+        prices: dict[TokenUid, Amount] = {}
+        positions: list[PortfolioPosition] = []
+        total_value_usd = 0
+        total_cashback_value_usd = 0
+        total_initial_value_usd = 0
+        total_profit_amount_usd = 0
+
+        for pool_key in self.get_user_pools(address):
+            pool = self.pools[pool_key]
+            state = self._get_pool_user_state(pool_key, address)
+            if pool.token_a not in prices:
+                prices[pool.token_a] = self.get_token_price_in_usd(pool.token_a)
+            if pool.token_b not in prices:
+                prices[pool.token_b] = self.get_token_price_in_usd(pool.token_b)
+            price_a = prices[pool.token_a]
+            price_b = prices[pool.token_b]
+
+            amount_a, amount_b = self._calculate_position_token_amounts(pool_key, state.liquidity)
+            value_usd = (amount_a * price_a) // 100_000000 + (amount_b * price_b) // 100_000000
+            cashback_value_usd = (
+                (state.balance_a * price_a) // 100_000000 + (state.balance_b * price_b) // 100_000000
+            )
+            if state.cost_basis_a > 0 or state.cost_basis_b > 0:
+                initial_value_usd = (
+                    (state.cost_basis_a * price_a) // 100_000000
+                    + (state.cost_basis_b * price_b) // 100_000000
+                )
+            else:
+                initial_value_usd = state.deposit_value_usd
+            profit_amount_usd, profit_percentage = self._calculate_profit(value_usd, initial_value_usd)
+
+            positions.append(PortfolioPosition(
+                pool_key=pool_key,
+                token_a=pool.token_a.hex(),
+                token_b=pool.token_b.hex(),
+                liquidity=state.liquidity,
+                amount_a=amount_a,
+                amount_b=amount_b,
+                balance_a=state.balance_a,
+                balance_b=state.balance_b,
+                value_usd=Amount(value_usd),
+                cashback_value_usd=Amount(cashback_value_usd),
+                initial_value_usd=Amount(initial_value_usd),
+                profit_amount_usd=profit_amount_usd,
+                profit_percentage=profit_percentage,
+                last_action_timestamp=state.last_action_timestamp,
+            ))
+            total_value_usd += value_usd
+            total_cashback_value_usd += cashback_value_usd
+            # Positions without a cost basis have no profit and add nothing here
+            total_initial_value_usd += initial_value_usd
+            total_profit_amount_usd += profit_amount_usd
+
+        total_profit_percentage = 0
+        if total_initial_value_usd > 0:
+            total_profit_percentage = (total_profit_amount_usd * 10000) // total_initial_value_usd
+
+        return UserPortfolio(
+            positions=positions,
+            total_value_usd=Amount(total_value_usd),
+            total_cashback_value_usd=Amount(total_cashback_value_usd),
+            total_initial_value_usd=Amount(total_initial_value_usd),
+            total_profit_amount_usd=total_profit_amount_usd,
+            total_profit_percentage=total_profit_percentage,
+        )
+
 
     @view
     def find_best_swap_path(
         self, amount_in: Amount, token_in: TokenUid, token_out: TokenUid, max_hops: int
     ) -> SwapPathInfo:
-        """Find the best path for swapping between two tokens using Dijkstra's algorithm.
+        """Find the best path for swapping between two tokens.
 
         This method calculates the optimal path for swapping from token_in to token_out,
-        using Dijkstra's algorithm to guarantee the best possible output amount.
+        using the hop-indexed route search to guarantee the best possible output amount
+        among all simple paths of up to max_hops signed pools.
 
         Args:
             amount_in: The amount of input tokens
@@ -4473,10 +5996,7 @@ class DozerPoolManager(Blueprint):
         if max_hops > 3:
             max_hops = 3
 
-        # Build graph of all possible token pairs and their exchange rates
-        graph = self._build_token_graph(amount_in)
-
-        if token_in not in graph:
+        if token_in not in self.signed_token_to_pools:
             return SwapPathInfo(
                 path="",
                 amounts=[amount_in],
@@ -4484,12 +6004,65 @@ class DozerPoolManager(Blueprint):
                 price_impact=Amount(0),
             )
 
-        # Run Dijkstra's algorithm to find optimal path
-        path_info = self._dijkstra_shortest_path(
-            graph, token_in, token_out, amount_in, max_hops
-        )
+        labels = self._search_routes(token_in, amount_in, max_hops, False)
+        return self._get_swap_path_info(labels, amount_in, token_in, token_out, max_hops)
+
+    @view
+    def find_best_swap_paths_batch(
+        self, requests: list[tuple[Amount, TokenUid, TokenUid]], max_hops: int
+    ) -> list[SwapPathInfo]:
+        """Find the best swap paths for many (amount_in, token_in, token_out) requests.
+
+        Requests sharing the same input token and amount are answered from a single
+        route search, since one search prices every reachable output token. Each
+        result is identical to calling find_best_swap_path() for that request.
+
+        Args:
+            requests: List of (amount_in, token_in, token_out) quote requests
+            max_hops: Maximum number of hops for every request (1-3, enforced by hard limit)
+
+        Returns:
+            A list of SwapPathInfo, in the same order as requests
+
+        Raises:
+            InvalidAction: If more than MAX_PATH_BATCH_SIZE requests are given
+        """
+        if len(requests) > MAX_PATH_BATCH_SIZE:
+            raise InvalidAction("Too many requests to quote")
+
+        # Limit max_hops to reasonable number for gas efficiency
+        if max_hops > 3:
+            max_hops = 3
+
+        searches: dict[tuple[TokenUid, Amount], dict[tuple[TokenUid, int], list[RouteLabel]]] = {}
+        results: list[SwapPathInfo] = []
+
+        for amount_in, token_in, token_out in requests:
+            search_key = (token_in, amount_in)
+            if search_key not in searches:
+                if token_in in self.signed_token_to_pools:
+                    searches[search_key] = self._search_routes(token_in, amount_in, max_hops, False)
+                else:
+                    searches[search_key] = {}
+
+            results.append(
+                self._get_swap_path_info(searches[search_key], amount_in, token_in, token_out, max_hops)
+            )
+
+        return results
+
+    def _get_swap_path_info(
+        self,
+        labels: dict[tuple[TokenUid, int], list[RouteLabel]],
+        amount_in: Amount,
+        token_in: TokenUid,
+        token_out: TokenUid,
+        max_hops: int,
+    ) -> SwapPathInfo:
+        """Build the SwapPathInfo of the best route to token_out from a forward route search."""
+        hops = self._select_best_route(labels, token_out, max_hops, False)
 
-        if not path_info["path"]:
+        if hops == 0:
             return SwapPathInfo(
                 path="",
                 amounts=[amount_in],
@@ -4497,214 +6070,446 @@ class DozerPoolManager(Blueprint):
                 price_impact=Amount(0),
             )
 
+        pool_keys, amounts = self._reconstruct_route(labels, token_out, hops)
+        path = ",".join(pool_keys)
+        amount_out = amounts[-1]
+
         # Calculate price impact for the optimal path
         price_impact = self._calculate_price_impact(
-            amount_in, path_info["amount_out"], path_info["path"], token_in, token_out
+            amount_in, amount_out, path, token_in, token_out
         )
 
         return SwapPathInfo(
-            path=path_info["path"],
-            amounts=path_info["amounts"],
-            amount_out=path_info["amount_out"],
+            path=path,
+            amounts=amounts,
+            amount_out=amount_out,
             price_impact=price_impact,
         )
 
     @view
-    def _build_token_graph(
-        self, reference_amount: Amount
-    ) -> dict[TokenUid, dict[TokenUid, tuple[Amount, str, Amount]]]:
-        """Build a graph of tokens with edge weights as (output_amount, pool_key, fee).
+    def find_best_split_swap(
+        self,
+        amount_in: Amount,
+        token_in: TokenUid,
+        token_out: TokenUid,
+        max_routes: int,
+        max_hops: int,
+    ) -> SplitSwapInfo:
+        """Find the best division of an exact input swap across pool-disjoint routes.
+
+        Candidate routes are found greedily: the best route for the whole amount,
+        then the best route avoiding every pool already chosen, up to max_routes.
+        Since no two routes share a pool, each one behaves as an independent curve
+        and the amount is divided so their marginal prices are equal. Routes whose
+        marginal price at zero is below that level get nothing.
+
+        The result never quotes less than find_best_swap_path() for the same input,
+        and can be executed with swap_exact_tokens_for_tokens_split().
 
         Args:
-            reference_amount: Reference amount to calculate exchange rates
+            amount_in: The amount of input tokens
+            token_in: The input token
+            token_out: The output token
+            max_routes: Maximum number of routes (1-4, enforced by hard limit)
+            max_hops: Maximum number of hops per route (1-3, enforced by hard limit)
 
         Returns:
-            Graph structure: token -> {neighbor_token: (output_amount, pool_key, fee)}
-
-        Note:
-            Only includes signed pools to prevent routing through untrusted liquidity.
-            Limited to pools in pool_signers to prevent DoS attacks when called
-            indirectly by public methods like swap operations.
+            A SplitSwapInfo with only the routes that receive a non-zero amount
         """
-        graph = {}
-        count = 0
-
-        for pool_key in self.all_pools:
-            # Only include signed pools
-            if pool_key not in self.pool_signers:
+        # Limit max_hops and max_routes to reasonable numbers for gas efficiency
+        if max_hops > 3:
+            max_hops = 3
+        if max_routes > MAX_SPLIT_ROUTES:
+            max_routes = MAX_SPLIT_ROUTES
+
+        routes: list[list[str]] = []
+        best_single_out = Amount(0)
+        excluded_pools: set[str] = set()
+        if token_in in self.signed_token_to_pools:
+            while len(routes) < max_routes:
+                labels = self._search_routes(token_in, amount_in, max_hops, False, excluded_pools)
+                hops = self._select_best_route(labels, token_out, max_hops, False)
+                if hops == 0:
+                    break
+                pool_keys, amounts = self._reconstruct_route(labels, token_out, hops)
+                if not routes:
+                    best_single_out = amounts[-1]
+                routes.append(pool_keys)
+                excluded_pools.update(pool_keys)
+
+        if not routes:
+            return SplitSwapInfo(paths=[], amounts_in=[], amounts_out=[], amount_out=Amount(0))
+
+        allocation = self._allocate_split_amounts(routes, token_in, amount_in)
+        amounts_out = [
+            self._calculate_route_output(routes[index], token_in, allocation[index])
+            for index in range(len(routes))
+        ]
+
+        # Integer rounding can make a split quote below the best single route
+        if sum(amounts_out) <= best_single_out:
+            routes = routes[:1]
+            allocation = [amount_in]
+            amounts_out = [best_single_out]
+
+        paths: list[str] = []
+        amounts_in: list[Amount] = []
+        route_amounts_out: list[Amount] = []
+        for index in range(len(routes)):
+            if allocation[index] == 0:
                 continue
-            if count >= MAX_POOLS_TO_ITERATE:
-                break
-            count += 1
+            paths.append(",".join(routes[index]))
+            amounts_in.append(allocation[index])
+            route_amounts_out.append(amounts_out[index])
+
+        return SplitSwapInfo(
+            paths=paths,
+            amounts_in=amounts_in,
+            amounts_out=route_amounts_out,
+            amount_out=Amount(sum(route_amounts_out)),
+        )
+
+    def _get_route_curve(self, pool_keys: list[str], token_in: TokenUid) -> tuple[int, int, int]:
+        """Return (P, Q, R) such that the route outputs P * x / (Q + R * x) for an input x.
+
+        A single pool outputs reserve_out * a * x / (reserve_in * b + a * x), and
+        composing two curves of this form gives another one, so a whole route is
+        described by three integers (ignoring the rounding at each hop).
+        """
+        p, q, r = 1, 1, 0
+        current_token = token_in
+        for pool_key in pool_keys:
             pool = self.pools[pool_key]
-            token_a = pool.token_a
-            token_b = pool.token_b
-            fee = pool.fee_numerator
-            fee_denominator = pool.fee_denominator
+            reserve_in, reserve_out, current_token = self._resolve_token_direction(pool, current_token)
+            a = pool.fee_denominator - pool.fee_numerator
+            b = pool.fee_denominator
+            hop_p = reserve_out * a
+            hop_q = reserve_in * b
+            p, q, r = p * hop_p, q * hop_q, r * hop_q + a * p
+        return p, q, r
+
+    def _allocate_split_amounts(
+        self, routes: list[list[str]], token_in: TokenUid, amount_in: Amount
+    ) -> list[Amount]:
+        """Divide amount_in across independent routes so their marginal prices are equal.
+
+        A route with curve P * x / (Q + R * x) has marginal price P * Q / (Q + R * x)^2.
+        Setting it to a common level for every active route gives
+        x_i = (s_i * t - Q_i) / R_i with s_i = sqrt(P_i * Q_i), and the amounts summing
+        to amount_in fixes t. While some x_i is not positive, the route with the lowest
+        marginal price at zero (P / Q) is dropped and t is solved again.
 
-            # Check if pool has valid reserves for A->B calculation
-            reserve_a = pool.reserve_a
-            reserve_b = pool.reserve_b
-            
-            if reserve_a > 0 and reserve_b > 0 and fee_denominator > 0:
-                # Calculate A->B exchange rate
-                a = fee_denominator - fee
-                b = fee_denominator
-                denominator = reserve_a * b + reference_amount * a
-                
-                if denominator > 0:
-                    output_b = (reserve_b * reference_amount * a) // denominator
-                    if output_b <= reserve_b:  # Ensure output doesn't exceed reserves
-                        if token_a not in graph:
-                            graph[token_a] = {}
-
-                        # Only add edge if it's better than existing edge or no edge exists
-                        if (
-                            token_b not in graph[token_a]
-                            or output_b > graph[token_a][token_b][0]
-                        ):
-                            graph[token_a][token_b] = (output_b, pool_key, fee)
-
-            # Check if pool has valid reserves for B->A calculation
-            if reserve_a > 0 and reserve_b > 0 and fee_denominator > 0:
-                # Calculate B->A exchange rate
-                a = fee_denominator - fee
-                b = fee_denominator
-                denominator = reserve_b * b + reference_amount * a
-                
-                if denominator > 0:
-                    output_a = (reserve_a * reference_amount * a) // denominator
-                    if output_a <= reserve_a:  # Ensure output doesn't exceed reserves
-                        if token_b not in graph:
-                            graph[token_b] = {}
+        Returns:
+            The amount for each route, in the same order, summing to amount_in
+        """
+        curves = [self._get_route_curve(pool_keys, token_in) for pool_keys in routes]
+
+        # Order routes by marginal price at zero, best first
+        order: list[int] = []
+        for index in range(len(curves)):
+            position = len(order)
+            while position > 0 and (
+                curves[index][0] * curves[order[position - 1]][1]
+                > curves[order[position - 1]][0] * curves[index][1]
+            ):
+                position -= 1
+            order.insert(position, index)
+
+        allocation = [Amount(0)] * len(routes)
+        active = len(order)
+        while active > 1:
+            denominator_product = 1
+            for index in order[:active]:
+                denominator_product *= curves[index][2]
+
+            t_numerator = amount_in * denominator_product
+            t_denominator = 0
+            roots: list[int] = []
+            for index in order[:active]:
+                p, q, r = curves[index]
+                root = self._isqrt(p * q)
+                roots.append(root)
+                t_numerator += q * (denominator_product // r)
+                t_denominator += root * (denominator_product // r)
+
+            amounts = [
+                (roots[position] * t_numerator - curves[index][1] * t_denominator)
+                // (curves[index][2] * t_denominator)
+                for position, index in enumerate(order[:active])
+            ]
+            if min(amounts) > 0:
+                for position, index in enumerate(order[:active]):
+                    allocation[index] = Amount(amounts[position])
+                break
+            active -= 1
 
-                        # Only add edge if it's better than existing edge or no edge exists
-                        if (
-                            token_a not in graph[token_b]
-                            or output_a > graph[token_b][token_a][0]
-                        ):
-                            graph[token_b][token_a] = (output_a, pool_key, fee)
+        # Rounding leftovers (or the whole amount with a single route) go to the best route
+        allocation[order[0]] = Amount(allocation[order[0]] + amount_in - sum(allocation))
+        return allocation
 
-        return graph
+    def _calculate_route_output(self, pool_keys: list[str], token_in: TokenUid, amount_in: Amount) -> Amount:
+        """Output of sending amount_in through pool_keys, hop by hop as _swap computes it."""
+        amount = amount_in
+        current_token = token_in
+        for pool_key in pool_keys:
+            if amount == 0:
+                return Amount(0)
+            next_amount = self._calculate_route_edge_amount(pool_key, current_token, amount, False)
+            if next_amount is None:
+                return Amount(0)
+            amount = next_amount
+            current_token = self._get_other_token(self.pools[pool_key], current_token)
+        return Amount(amount)
 
-    @view
-    def _dijkstra_shortest_path(
+    def _search_routes(
         self,
-        graph: dict[TokenUid, dict[TokenUid, tuple[Amount, str, Amount]]],
-        start: TokenUid,
-        end: TokenUid,
-        amount_in: Amount,
+        source: TokenUid,
+        amount: Amount,
         max_hops: int,
-    ) -> dict[str, str | list[Amount] | int]:
-        """Find the optimal path using Dijkstra's algorithm.
+        exact_output: bool,
+        excluded_pools: set[str] | None = None,
+    ) -> dict[tuple[TokenUid, int], list[RouteLabel]]:
+        """Run the hop-indexed route search from source.
+
+        Labels are stored per (token, hops), up to MAX_ROUTE_LABELS each, best first
+        and with distinct predecessor tokens. The frontier is a heap ordered by
+        (hops, token), so every label with h hops is final before any of them is
+        expanded into h + 1 hops. A node is expanded with its best label whose path
+        does not already contain the neighbor, which keeps every route a simple path
+        (no token, and therefore no pool, is visited twice).
+
+        With max_hops <= 3 the result is optimal over all simple paths: a 3-hop route
+        s → u → w → v only conflicts with the label of w when u == v, and then the
+        second label of w (a different predecessor) is the best valid one. Outputs are
+        monotonic in the input amount, so extending the best valid label is optimal.
+
+        Runs in O(E * H * log V) for E pool edges, H hops and V tokens. At most
+        MAX_ROUTE_EDGES pool edges are examined; past that the search stops and the
+        routes found so far are returned.
 
         Args:
-            graph: Token graph with exchange rates
-            start: Starting token
-            end: Target token
-            amount_in: Input amount
+            source: Token the search starts from
+            amount: Input amount of source (forward) or wanted output of source (reverse)
             max_hops: Maximum number of hops allowed
+            exact_output: False to maximize output amounts walking pools forward,
+                True to minimize input amounts walking pools backwards
+            excluded_pools: Pools the search must not use
 
         Returns:
-            Dictionary with path information
+            Labels by (token, hops), each sorted best first
         """
-        # Initialize distances (we want to maximize output, so we use negative distances)
-        # distances[token] = (max_output_amount, hops_count)
-        distances = {}
-        previous = {}
-        unvisited = set()
-
-        # Initialize all tokens
-        for token in graph.keys():
-            distances[token] = (0, 0)  # (amount, hops)
-            unvisited.add(token)
-
-        # Set start token distance to input amount
-        distances[start] = (amount_in, 0)
-
-        while unvisited:
-            # Find unvisited token with maximum output amount
-            current = None
-            max_amount = 0
-
-            for token in unvisited:
-                amount, hops = distances[token]
-                if amount > max_amount:
-                    max_amount = amount
-                    current = token
-
-            if current is None or max_amount == 0:
-                break  # No reachable tokens
-
-            if current == end:
-                break  # Found target
-
-            current_amount, current_hops = distances[current]
-
-            # Skip if we've exceeded max hops
-            if current_hops >= max_hops:
-                unvisited.remove(current)
-                continue
-
-            unvisited.remove(current)
+        labels: dict[tuple[TokenUid, int], list[RouteLabel]] = {
+            (source, 0): [RouteLabel(amount=amount, prev_token=source, pool_key="", prev_rank=-1)]
+        }
+        frontier: list[tuple[int, TokenUid]] = [(0, source)]
+        edges = 0
 
-            # Check all neighbors
-            if current not in graph:
+        while frontier:
+            hops, token = self._heap_pop(frontier)
+            if hops >= max_hops or token not in self.signed_token_to_pools:
                 continue
-            for neighbor, (reference_output, pool_key, fee) in graph[current].items():
+
+            node_labels = labels[(token, hops)]
+            label_tokens = [
+                self._get_route_tokens(labels, token, hops, rank) for rank in range(len(node_labels))
+            ]
+            for pool_key in self.signed_token_to_pools[token]:
+                if edges >= MAX_ROUTE_EDGES:
+                    return labels
+                edges += 1
+                if excluded_pools is not None and pool_key in excluded_pools:
+                    continue
                 pool = self.pools[pool_key]
-                if neighbor not in unvisited:
+                neighbor = pool.token_b if pool.token_a == token else pool.token_a
+                # Routes never return to the source token
+                if neighbor == source:
                     continue
 
-                # Calculate actual output for current amount
-                # Get current reserves for this pool
-                swap_info = self._try_resolve_token_direction(pool, current)
-                if swap_info is None:
+                # Best label whose path does not already visit the neighbor
+                rank = 0
+                while rank < len(node_labels) and neighbor in label_tokens[rank]:
+                    rank += 1
+                if rank == len(node_labels):
                     continue
-                reserve_in, reserve_out, _ = swap_info
-
-                # Check if calculation is valid
-                if reserve_in > 0 and reserve_out > 0:
-                    fee_denominator = pool.fee_denominator
-                    if fee_denominator > 0:
-                        a = fee_denominator - fee
-                        b = fee_denominator
-                        denominator = reserve_in * b + current_amount * a
-                        
-                        if denominator > 0:
-                            actual_output = (reserve_out * current_amount * a) // denominator
-                            if actual_output <= reserve_out:  # Ensure output doesn't exceed reserves
-                                neighbor_amount, neighbor_hops = distances[neighbor]
-                                new_hops = current_hops + 1
-
-                                # Update if we found a better path
-                                if actual_output > neighbor_amount:
-                                    distances[neighbor] = (actual_output, new_hops)
-                                    previous[neighbor] = (current, pool_key)
-
-        # Reconstruct path
-        if end not in previous and end != start:
-            return {"path": "", "amounts": [amount_in], "amount_out": 0}
-
-        path_pools = []
-        amounts = []
-        current = end
-
-        # Build path backwards
-        while current in previous:
-            prev_token, pool_key = previous[current]
-            path_pools.insert(0, pool_key)
-            amounts.insert(0, distances[current][0])
-            current = prev_token
-
-        amounts.insert(0, amount_in)
-        final_amount = distances[end][0] if end in distances else 0
-
-        return {
-            "path": ",".join(path_pools),
-            "amounts": amounts,
-            "amount_out": final_amount,
-        }
+
+                next_amount = self._calculate_route_edge_amount(
+                    pool_key, token, node_labels[rank].amount, exact_output
+                )
+                if next_amount is None:
+                    continue
+
+                key = (neighbor, hops + 1)
+                if key not in labels:
+                    labels[key] = []
+                    self._heap_push(frontier, (hops + 1, neighbor))
+                self._insert_route_label(
+                    labels[key],
+                    RouteLabel(amount=next_amount, prev_token=token, pool_key=pool_key, prev_rank=rank),
+                    exact_output,
+                )
+
+        return labels
+
+    def _calculate_route_edge_amount(
+        self, pool_key: str, token: TokenUid, amount: Amount, exact_output: bool
+    ) -> Amount | None:
+        """Compute the amount on the other side of a pool for one route hop.
+
+        Forward, amount of token goes in and the output of the other token is returned.
+        Reverse, amount of token must come out and the required input of the other
+        token is returned. Amounts are computed from the live reserves of the pool.
+
+        Returns:
+            The amount, or None if the pool cannot serve the hop
+        """
+        pool = self.pools[pool_key]
+        if pool.reserve_a == 0 or pool.reserve_b == 0:
+            return None
+
+        fee_denominator = pool.fee_denominator
+        a = fee_denominator - pool.fee_numerator
+        b = fee_denominator
+        if a <= 0:
+            return None
+
+        if not exact_output:
+            reserve_in, reserve_out, _ = self._resolve_token_direction(pool, token)
+            amount_out = (reserve_out * amount * a) // (reserve_in * b + amount * a)
+            if amount_out == 0:
+                return None
+            return Amount(amount_out)
+
+        # Reverse hop: `token` is the output side of this pool
+        reserve_out, reserve_in, _ = self._resolve_token_direction(pool, token)
+        if amount >= reserve_out:
+            return None
+        return Amount((reserve_in * amount * b) // ((reserve_out - amount) * a))
+
+    def _get_route_tokens(
+        self,
+        labels: dict[tuple[TokenUid, int], list[RouteLabel]],
+        token: TokenUid,
+        hops: int,
+        rank: int,
+    ) -> list[TokenUid]:
+        """Return the tokens visited by a label's route, from token back to the source."""
+        tokens = [token]
+        while hops > 0:
+            label = labels[(token, hops)][rank]
+            token = label.prev_token
+            rank = label.prev_rank
+            hops -= 1
+            tokens.append(token)
+        return tokens
+
+    def _insert_route_label(
+        self, node_labels: list[RouteLabel], label: RouteLabel, exact_output: bool
+    ) -> None:
+        """Insert label keeping the best MAX_ROUTE_LABELS with distinct predecessor tokens.
+
+        Ties keep the label found first, so results are deterministic.
+        """
+        for index in range(len(node_labels)):
+            if node_labels[index].prev_token == label.prev_token:
+                if not self._is_better_route_amount(label.amount, node_labels[index].amount, exact_output):
+                    return
+                node_labels.pop(index)
+                break
+
+        position = len(node_labels)
+        while position > 0 and self._is_better_route_amount(
+            label.amount, node_labels[position - 1].amount, exact_output
+        ):
+            position -= 1
+
+        if position < MAX_ROUTE_LABELS:
+            node_labels.insert(position, label)
+            del node_labels[MAX_ROUTE_LABELS:]
+
+    def _is_better_route_amount(self, amount: Amount, current: Amount, exact_output: bool) -> bool:
+        """Larger outputs are better forward, smaller inputs are better in reverse."""
+        if exact_output:
+            return amount < current
+        return amount > current
+
+    def _select_best_route(
+        self,
+        labels: dict[tuple[TokenUid, int], list[RouteLabel]],
+        token: TokenUid,
+        max_hops: int,
+        exact_output: bool,
+    ) -> int:
+        """Return the hop count of the best route to token, preferring fewer hops on ties, or 0."""
+        best_hops = 0
+        best_amount = Amount(0)
+        for hops in range(1, max_hops + 1):
+            key = (token, hops)
+            if key not in labels:
+                continue
+            amount = labels[key][0].amount
+            if best_hops == 0 or self._is_better_route_amount(amount, best_amount, exact_output):
+                best_hops = hops
+                best_amount = amount
+        return best_hops
+
+    def _reconstruct_route(
+        self,
+        labels: dict[tuple[TokenUid, int], list[RouteLabel]],
+        token: TokenUid,
+        hops: int,
+    ) -> tuple[list[str], list[Amount]]:
+        """Walk the best label of (token, hops) back to the source.
+
+        Returns:
+            A tuple (pool_keys, amounts) ordered from the source, where amounts
+            starts with the source amount and has one entry per pool after it
+        """
+        pool_keys: list[str] = []
+        amounts: list[Amount] = []
+        rank = 0
+        while hops > 0:
+            label = labels[(token, hops)][rank]
+            pool_keys.insert(0, label.pool_key)
+            amounts.insert(0, label.amount)
+            token = label.prev_token
+            rank = label.prev_rank
+            hops -= 1
+        amounts.insert(0, labels[(token, 0)][0].amount)
+        return pool_keys, amounts
+
+    def _heap_push(self, heap: list[tuple[int, TokenUid]], item: tuple[int, TokenUid]) -> None:
+        """Push item onto a binary min-heap stored in a list."""
+        heap.append(item)
+        index = len(heap) - 1
+        while index > 0:
+            parent = (index - 1) // 2
+            if heap[parent] <= item:
+                break
+            heap[index] = heap[parent]
+            index = parent
+        heap[index] = item
+
+    def _heap_pop(self, heap: list[tuple[int, TokenUid]]) -> tuple[int, TokenUid]:
+        """Pop the smallest item from a binary min-heap stored in a list."""
+        last = heap.pop()
+        if not heap:
+            return last
+
+        smallest = heap[0]
+        size = len(heap)
+        index = 0
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if last <= heap[child]:
+                break
+            heap[index] = heap[child]
+            index = child
+        heap[index] = last
+        return smallest
 
     @view
     def _calculate_price_impact(
@@ -4850,6 +6655,115 @@ class DozerPoolManager(Blueprint):
 
 
 
+    @view
+    def get_depth_curve(
+        self, pool_key: str, token_in: TokenUid, amounts: list[Amount]
+    ) -> list[DepthCurvePoint]:
+        """Sample a pool's output, marginal price and price impact for many input sizes.
+
+        The pool is read once and every amount is evaluated against that snapshot.
+        Each amount_out equals get_amount_out() on the pool's reserves and each price
+        impact equals the one find_best_swap_path() reports for a direct swap.
+
+        Args:
+            pool_key: The pool to sample
+            token_in: The input token
+            amounts: Input amounts to sample
+
+        Returns:
+            One DepthCurvePoint per amount, in the same order
+
+        Raises:
+            InvalidAction: If more than MAX_QUOTE_BATCH_SIZE amounts are given
+            PoolNotFound: If the pool does not exist
+            InvalidTokens: If token_in is not in the pool
+        """
+        if len(amounts) > MAX_QUOTE_BATCH_SIZE:
+            raise InvalidAction("Too many amounts to quote")
+        self._validate_pool_exists(pool_key)
+        return self._calculate_depth_curve([pool_key], token_in, amounts)
+
+    @view
+    def get_path_depth_curve(
+        self, path_str: str, token_in: TokenUid, amounts: list[Amount]
+    ) -> list[DepthCurvePoint]:
+        """Sample a multi-hop path's output, marginal price and price impact for many input sizes.
+
+        Args:
+            path_str: Comma-separated pool keys, as accepted by swap_exact_tokens_for_tokens_through_path
+            token_in: The input token of the first pool
+            amounts: Input amounts to sample
+
+        Returns:
+            One DepthCurvePoint per amount, in the same order
+
+        Raises:
+            InvalidAction: If more than MAX_QUOTE_BATCH_SIZE amounts are given
+            InvalidPath: If the path is empty or longer than 3 pools
+            PoolNotFound: If any pool in the path does not exist
+            InvalidTokens: If the path does not connect starting from token_in
+        """
+        if len(amounts) > MAX_QUOTE_BATCH_SIZE:
+            raise InvalidAction("Too many amounts to quote")
+        if not path_str:
+            raise InvalidPath("Empty path")
+
+        pool_keys = path_str.split(",")
+        if len(pool_keys) > 3:
+            raise InvalidPath("Invalid path length")
+
+        for pool_key in pool_keys:
+            self._validate_pool_exists(pool_key)
+
+        return self._calculate_depth_curve(pool_keys, token_in, amounts)
+
+    def _calculate_depth_curve(
+        self, pool_keys: list[str], token_in: TokenUid, amounts: list[Amount]
+    ) -> list[DepthCurvePoint]:
+        """Evaluate a depth curve over a snapshot of the reserves and fees along pool_keys.
+
+        The marginal price is the derivative of the output with respect to the input
+        at each size. With several hops it is the product of each hop's derivative at
+        the amount flowing into that hop. Price impact comes from _calculate_price_impact.
+        """
+        # Snapshot (reserve_in, reserve_out, fee_numerator, fee_denominator) for every hop
+        hops: list[tuple[Amount, Amount, Amount, Amount]] = []
+        current_token = token_in
+        for pool_key in pool_keys:
+            pool = self.pools[pool_key]
+            reserve_in, reserve_out, current_token = self._resolve_token_direction(pool, current_token)
+            hops.append((reserve_in, reserve_out, pool.fee_numerator, pool.fee_denominator))
+        path = ",".join(pool_keys)
+
+        points: list[DepthCurvePoint] = []
+        for amount_in in amounts:
+            amount = amount_in
+            price_numerator = PRICE_PRECISION
+            price_denominator = 1
+            for reserve_in, reserve_out, fee_numerator, fee_denominator in hops:
+                a = fee_denominator - fee_numerator
+                b = fee_denominator
+                denominator = reserve_in * b + amount * a
+                if denominator == 0:
+                    amount = 0
+                    price_numerator = 0
+                    break
+                # d(amount_out)/d(amount_in) = reserve_in * reserve_out * a * b / denominator^2
+                price_numerator *= reserve_in * reserve_out * a * b
+                price_denominator *= denominator * denominator
+                amount = (reserve_out * amount * a) // denominator
+
+            points.append(DepthCurvePoint(
+                amount_in=amount_in,
+                amount_out=Amount(amount),
+                marginal_price=Amount(price_numerator // price_denominator),
+                price_impact=self._calculate_price_impact(
+                    amount_in, Amount(amount), path, token_in, current_token
+                ),
+            ))
+
+        return points
+
     @view
     def find_best_swap_path_exact_output(
         self, amount_out: Amount, token_in: TokenUid, token_out: TokenUid, max_hops: int
@@ -4857,7 +6771,8 @@ class DozerPoolManager(Blueprint):
         """Find the best path for swapping to get exact output amount using reverse pathfinding.
 
         This method calculates the optimal path for swapping from token_in to token_out,
-        using reverse Dijkstra's algorithm to guarantee the minimum input amount needed.
+        running the hop-indexed route search backwards from token_out to guarantee the
+        minimum input amount needed.
 
         Args:
             amount_out: The desired output amount
@@ -4867,7 +6782,7 @@ class DozerPoolManager(Blueprint):
 
         Returns:
             A SwapPathExactOutputInfo NamedTuple containing:
-            - path: Comma-separated string of pool keys to traverse
+            - path: Comma-separated string of pool keys to traverse (reverse order)
             - amounts: Expected amounts at each step (reverse order)
             - amount_in: Required input amount
             - price_impact: Overall price impact
@@ -4876,10 +6791,7 @@ class DozerPoolManager(Blueprint):
         if max_hops > 3:
             max_hops = 3
 
-        # Build reverse graph of all possible token pairs and their exchange rates
-        graph = self._build_reverse_token_graph(amount_out)
-
-        if token_out not in graph:
+        if token_out not in self.signed_token_to_pools:
             return SwapPathExactOutputInfo(
                 path="",
                 amounts=[amount_out],
@@ -4887,12 +6799,10 @@ class DozerPoolManager(Blueprint):
                 price_impact=Amount(0),
             )
 
-        # Run reverse Dijkstra's algorithm to find optimal path
-        path_info = self._dijkstra_reverse_shortest_path(
-            graph, token_out, token_in, amount_out, max_hops
-        )
+        labels = self._search_routes(token_out, amount_out, max_hops, True)
+        hops = self._select_best_route(labels, token_in, max_hops, True)
 
-        if not path_info["path"]:
+        if hops == 0:
             return SwapPathExactOutputInfo(
                 path="",
                 amounts=[amount_out],
@@ -4900,214 +6810,19 @@ class DozerPoolManager(Blueprint):
                 price_impact=Amount(0),
             )
 
+        # Routes are rooted at token_out, so pool keys and amounts come out in reverse order
+        pool_keys, amounts = self._reconstruct_route(labels, token_in, hops)
+        path = ",".join(pool_keys)
+        amount_in = amounts[-1]
+
         # Calculate price impact for the optimal path
         price_impact = self._calculate_price_impact(
-            path_info["amount_in"], amount_out, path_info["path"], token_in, token_out
+            amount_in, amount_out, path, token_in, token_out
         )
 
         return SwapPathExactOutputInfo(
-            path=path_info["path"],
-            amounts=path_info["amounts"],
-            amount_in=path_info["amount_in"],
+            path=path,
+            amounts=amounts,
+            amount_in=amount_in,
             price_impact=price_impact,
         )
-
-    @view
-    def _build_reverse_token_graph(
-        self, reference_amount: Amount
-    ) -> dict[TokenUid, dict[TokenUid, tuple[Amount, str, Amount]]]:
-        """Build a reverse graph of tokens with edge weights as (input_amount, pool_key, fee).
-
-        Args:
-            reference_amount: Reference amount to calculate exchange rates
-
-        Returns:
-            Graph structure: token -> {neighbor_token: (input_amount, pool_key, fee)}
-
-        Note:
-            Only includes signed pools to prevent routing through untrusted liquidity.
-            Limited to pools in pool_signers to prevent DoS attacks when called
-            indirectly by public methods like swap operations.
-        """
-        graph = {}
-        count = 0
-
-        for pool_key in self.all_pools:
-            # Only include signed pools
-            if pool_key not in self.pool_signers:
-                continue
-            if count >= MAX_POOLS_TO_ITERATE:
-                break
-            count += 1
-            pool = self.pools[pool_key]
-            token_a = pool.token_a
-            token_b = pool.token_b
-            fee = pool.fee_numerator
-            fee_denominator = pool.fee_denominator
-
-            # Check if pool has valid reserves for A->B calculation (reverse: how much A needed for reference_amount B)
-            reserve_a = pool.reserve_a
-            reserve_b = pool.reserve_b
-            
-            if reserve_a > 0 and reserve_b > 0 and fee_denominator > 0 and reference_amount < reserve_b:
-                a = fee_denominator - fee
-                b = fee_denominator
-                denominator = (reserve_b - reference_amount) * a
-                
-                if denominator > 0:
-                    input_a = (reserve_a * reference_amount * b) // denominator
-
-                    if token_b not in graph:
-                        graph[token_b] = {}
-
-                    # Only add edge if it's better than existing edge or no edge exists
-                    if (
-                        token_a not in graph[token_b]
-                        or graph[token_b][token_a][0] > input_a
-                    ):
-                        graph[token_b][token_a] = (input_a, pool_key, fee)
-
-            # Check if pool has valid reserves for B->A calculation (reverse: how much B needed for reference_amount A)
-            if reserve_a > 0 and reserve_b > 0 and fee_denominator > 0 and reference_amount < reserve_a:
-                a = fee_denominator - fee
-                b = fee_denominator
-                denominator = (reserve_a - reference_amount) * a
-                
-                if denominator > 0:
-                    input_b = (reserve_b * reference_amount * b) // denominator
-
-                    if token_a not in graph:
-                        graph[token_a] = {}
-
-                    # Only add edge if it's better than existing edge or no edge exists
-                    if (
-                        token_b not in graph[token_a]
-                        or graph[token_a][token_b][0] > input_b
-                    ):
-                        graph[token_a][token_b] = (input_b, pool_key, fee)
-
-        return graph
-
-    @view
-    def _dijkstra_reverse_shortest_path(
-        self,
-        graph: dict[TokenUid, dict[TokenUid, tuple[Amount, str, Amount]]],
-        start_token: TokenUid,
-        end_token: TokenUid,
-        amount_out: Amount,
-        max_hops: int,
-    ) -> dict[str, str | list[Amount] | int]:
-        """Use Dijkstra's algorithm to find the path that minimizes input amount for exact output.
-
-        Args:
-            graph: The token graph with reverse edge weights
-            start_token: Starting token (output token)
-            end_token: Ending token (input token)
-            amount_out: Desired output amount
-            max_hops: Maximum number of hops
-
-        Returns:
-            Dictionary with path, amounts, and required input amount
-        """
-        # distances[token] = (min_amount_of_token_needed, hops)
-        distances = {}
-        previous = {}
-        unvisited = set()
-
-        # Initialize all tokens with a very large number for infinity
-        for token in graph.keys():
-            distances[token] = (Amount(2**256 - 1), 0)
-            unvisited.add(token)
-
-        # We want to obtain `amount_out` of `start_token`.
-        distances[start_token] = (amount_out, 0)
-
-        while unvisited:
-            # Find unvisited token with minimum required amount.
-            current = None
-            min_amount = Amount(2**256 - 1)
-
-            for token in unvisited:
-                amount, _ = distances[token]
-                if token in unvisited and amount < min_amount:
-                    min_amount = amount
-                    current = token
-
-            if current is None or min_amount == Amount(2**256 - 1):
-                break  # No reachable tokens
-
-            if current == end_token:
-                break  # Found target
-
-            current_amount, current_hops = distances[current]
-
-            if current_hops >= max_hops:
-                unvisited.remove(current)
-                continue
-
-            unvisited.remove(current)
-
-            # Explore neighbors. In the reverse graph, neighbors are tokens that can produce the current token.
-            if current not in graph:
-                continue
-
-            for neighbor, (
-                reference_input,
-                pool_key,
-                fee,
-            ) in graph[current].items():
-                if neighbor not in unvisited:
-                    continue
-                
-                pool = self.pools[pool_key]
-
-                # We need `current_amount` of `current` token. How much `neighbor` token is needed?
-                # We are swapping from `neighbor` (in) to `current` (out).
-                info = self._try_resolve_token_direction(pool, neighbor)
-                if info is None:
-                    continue
-                reserve_in, reserve_out, _ = info
-
-                # Check if calculation is valid
-                if reserve_in > 0 and reserve_out > 0:
-                    fee_denominator = pool.fee_denominator
-                    if fee_denominator > 0 and current_amount < reserve_out:
-                        a = fee_denominator - fee
-                        b = fee_denominator
-                        denominator = (reserve_out - current_amount) * a
-                        
-                        if denominator > 0:
-                            required_input_for_neighbor = (reserve_in * current_amount * b) // denominator
-
-                            neighbor_amount, _ = distances[neighbor]
-                            new_hops = current_hops + 1
-
-                            if required_input_for_neighbor < neighbor_amount:
-                                distances[neighbor] = (required_input_for_neighbor, new_hops)
-                                previous[neighbor] = (current, pool_key)
-
-        # Reconstruct path
-        final_input_amount = distances.get(end_token, (Amount(2**256 - 1), 0))[0]
-
-        if final_input_amount == Amount(2**256 - 1):
-            return {"path": "", "amounts": [amount_out], "amount_in": 0}
-
-        path_pools = []
-        amounts = []
-        current = end_token
-
-        # Build path backwards from `end_token` to `start_token`.
-        while current in previous:
-            prev_token, pool_key = previous[current]
-            path_pools.insert(0, pool_key)
-            amounts.insert(0, distances[current][0])
-            current = prev_token
-
-        amounts.insert(0, distances[start_token][0])
-
-        return {
-            "path": ",".join(path_pools),
-            "amounts": amounts,
-            "amount_in": final_input_amount,
-        }
-
@@ -27,6 +27,13 @@ PRECISION = 10**20
 PRICE_PRECISION = 10**8  # For decimal price handling (8 decimal places)
 MONTHS_IN_SECONDS = 60*60*24*30
 MIN_TIMELOCK_AFTER_DEPOSIT = 4 * MONTHS_IN_SECONDS  # 4 months minimum lock after any deposit
+MAX_USERS_INFO_BATCH = 100  # Maximum number of addresses per users_info call
+MAX_POSITIONS_PAGE_SIZE = 50  # Maximum positions returned by a single list_positions call
+MAX_POSITIONS_PAGE_SCAN = 200  # Maximum depositors examined by a single list_positions call
+VALID_TIMELOCKS = (6, 9, 12)  # Lock periods in months accepted by user_deposit
+MAX_UNLOCK_SCHEDULE_MONTHS = 60  # Maximum months covered by a single unlock_schedule call
+DEFAULT_VAULT_ID = 0  # Vault of the token_b and pool_fee given to initialize, used by the single-vault methods
+MAX_VAULTS_INFO_BATCH = 50  # Maximum number of vaults per vaults_info call
 
 class UserPositionEntry(NamedTuple):
     """Initial position entry data for a user deposit."""
@@ -37,6 +44,63 @@ class UserPositionEntry(NamedTuple):
 
 EMPTY_USER_POSITION = UserPositionEntry(Amount(0), Amount(0), 0)
 
+EMPTY_LOCKED_B = (Amount(0), Amount(0), Amount(0))
+
+class VaultState(NamedTuple):
+    """A (token_b, pool_fee) vault and the running aggregates over its positions."""
+
+    token_b: TokenUid
+    pool_fee: Amount
+    pool_key: str  # HTR/token_b pool key in the pool manager, resolved once at creation
+    total_liquidity: Amount  # Total liquidity shares of the vault
+    open_positions: int  # Positions not closed yet
+    total_locked_b: Amount  # Token_b deposited into open positions
+    total_bonus_paid: Amount  # HTR bonus credited to depositors
+    total_closed_b: Amount  # Token_b of closed positions awaiting withdrawal
+    total_closed_htr: Amount  # HTR of closed positions awaiting withdrawal
+    locked_b_by_timelock: tuple[Amount, Amount, Amount]  # total_locked_b split by VALID_TIMELOCKS
+    legacy_locked_b: Amount  # Part of total_locked_b migrated from the single-vault layout, whose timelock is not stored
+
+class VaultUserState(NamedTuple):
+    """A user's state in a vault, stored as a single (vault, user) entry."""
+
+    deposit_b: Amount  # Token_b deposited (after fees), kept until everything is withdrawn
+    liquidity: Amount  # Share of the vault liquidity, 0 once closed
+    balance_htr: Amount  # HTR from bonuses and cashback
+    balance_b: Amount  # Token_b from cashback (and protocol fees for the dev)
+    position_closed: bool
+    closed_balance_htr: Amount  # HTR available for withdrawal after position closed
+    closed_balance_b: Amount  # Token_b available for withdrawal after position closed
+    htr_price_in_deposit: Amount  # HTR price at the time of deposit (for IL calculation)
+    token_price_in_htr_in_deposit: Amount  # Token_b price in HTR at deposit (for IL calculation)
+    withdrawal_time: int  # Unlock timestamp, 0 without an open position
+    paired_htr: Amount  # HTR Oasis paired with the open position's deposits
+    locked_b_by_timelock: tuple[Amount, Amount, Amount]  # deposit_b of the open position split by VALID_TIMELOCKS
+
+EMPTY_VAULT_USER_STATE = VaultUserState(
+    deposit_b=Amount(0),
+    liquidity=Amount(0),
+    balance_htr=Amount(0),
+    balance_b=Amount(0),
+    position_closed=False,
+    closed_balance_htr=Amount(0),
+    closed_balance_b=Amount(0),
+    htr_price_in_deposit=Amount(0),
+    token_price_in_htr_in_deposit=Amount(0),
+    withdrawal_time=0,
+    paired_htr=Amount(0),
+    locked_b_by_timelock=EMPTY_LOCKED_B,
+)
+
+class UnlockBucket(NamedTuple):
+    """Open positions unlocking within one month (MONTHS_IN_SECONDS) period."""
+
+    amount_b: Amount  # Token_b deposited into the positions
+    amount_htr: Amount  # HTR Oasis paired with those deposits in the pool
+    positions: int
+
+EMPTY_UNLOCK_BUCKET = UnlockBucket(Amount(0), Amount(0), 0)
+
 class OasisUserInfo(NamedTuple):
     """Detailed information about a user's position in the Oasis contract."""
 
@@ -68,6 +132,59 @@ class OasisInfo(NamedTuple):
     dev_deposit_amount: Amount  # Amount of HTR deposited by dev/owner
 
 
+class OasisPosition(NamedTuple):
+    """A depositor's position as listed by list_positions."""
+
+    address: Address
+    user_deposit_b: Amount  # Token_b deposited into the position (after fees)
+    user_liquidity: Amount  # Share of the Oasis liquidity, 0 once closed
+    withdrawal_time: int  # Unlock timestamp, 0 once closed
+    position_closed: bool
+    closed_balance_a: Amount  # HTR awaiting withdrawal after close
+    closed_balance_b: Amount  # Token_b awaiting withdrawal after close
+
+
+class OasisPositionsPage(NamedTuple):
+    """A page of positions returned by list_positions."""
+
+    positions: list[OasisPosition]
+    next_cursor: int | None  # Cursor of the next page, None when the registry is exhausted
+
+
+class OasisPositionsStats(NamedTuple):
+    """Running aggregates over every Oasis position."""
+
+    depositors: int  # Addresses ever registered as depositors
+    open_positions: int  # Positions not closed yet
+    total_locked_b: Amount  # Token_b deposited into open positions
+    total_bonus_paid: Amount  # HTR bonus credited to depositors
+    total_closed_b: Amount  # Token_b of closed positions awaiting withdrawal
+    total_closed_htr: Amount  # HTR of closed positions awaiting withdrawal
+    locked_b_by_timelock: dict[int, Amount]  # total_locked_b split by the timelock chosen at deposit
+    legacy_locked_b: Amount  # Part of total_locked_b opened before vaults, whose timelock is not stored
+    unmigrated_liquidity: Amount  # Liquidity of positions opened before vaults and not migrated yet, see migrate_to_vaults
+
+
+class OasisVaultInfo(NamedTuple):
+    """A vault and its running aggregates, as returned by vaults_info."""
+
+    vault_id: int
+    token_b: str  # Token UID of the vault's token (hex encoded)
+    pool_fee: Amount
+    pool_key: str  # HTR/token_b pool key in the pool manager
+    total_liquidity: Amount  # Total liquidity shares of the vault
+    stats: OasisPositionsStats
+
+
+class UnlockScheduleEntry(NamedTuple):
+    """Open positions unlocking in one month, as returned by unlock_schedule."""
+
+    month_start: int  # First timestamp of the month period
+    amount_b: Amount  # Token_b deposited into the positions
+    amount_htr: Amount  # HTR Oasis paired with those deposits in the pool
+    positions: int
+
+
 class OasisQuoteInfo(NamedTuple):
     """Quote information for adding liquidity to Oasis."""
 
@@ -91,41 +208,64 @@ class OasisRemoveLiquidityQuote(NamedTuple):
     position_closed: bool
 
 
-class PoolLiquidityInfo(NamedTuple):
-    """Liquidity information from the pool manager for Oasis contract."""
+class PoolSnapshot(NamedTuple):
+    """HTR/token_b pool state from the pool manager, read once per operation."""
 
-    max_withdraw_a: Amount  # HTR amount in the pool
-    user_lp_b: Amount  # Token_b amount in the pool
+    reserve_htr: Amount  # HTR reserve of the pool
+    reserve_b: Amount  # Token_b reserve of the pool
+    oasis_lp_htr: Amount  # HTR amount of the Oasis position in the pool
+    oasis_lp_b: Amount  # Token_b amount of the Oasis position in the pool
+    token_b_price_in_htr: Amount  # TWAP price of token_b in HTR (with PRICE_PRECISION)
+    htr_price_usd: Amount  # HTR price in USD from the pool manager
+    htr_quote: Amount  # HTR to pair with the quoted token_b amount when adding liquidity
 
 
 @export
 class Oasis(Blueprint):
-    """Oasis contract that interacts with Dozer Pool Manager contract."""
+    """Oasis contract that interacts with Dozer Pool Manager contract.
+
+    A single contract manages many (token_b, pool_fee) vaults that share one HTR
+    treasury (oasis_htr_balance). Vault 0 (DEFAULT_VAULT_ID) is created by
+    initialize and is the one the single-vault methods act on.
+    """
 
     # Version control
     contract_version: str
 
     dozer_pool_manager: ContractId
-    pool_fee: Amount
+    pool_fee: Amount  # Pool fee of the default vault
     protocol_fee: Amount
 
     owner_address: CallerId
     dev_address: CallerId
+    # HTR treasury shared by every vault
     oasis_htr_balance: Amount
     dev_deposit_amount: Amount
+    token_b: TokenUid  # Token of the default vault
+    # Emergency pause state
+    paused: bool
+    # Vaults by id, and the id of each vault's pool key
+    vault_count: int
+    vaults: dict[int, VaultState]
+    vault_ids: dict[str, int]
+    # Per vault: user states, depositor registry in first deposit order and each
+    # depositor's position in it, and open positions by unlock month
+    # (withdrawal_time // MONTHS_IN_SECONDS), see unlock_schedule
+    vault_user_states: dict[int, dict[CallerId, VaultUserState]]
+    vault_depositors: dict[int, list[CallerId]]
+    vault_depositor_ids: dict[int, dict[CallerId, int]]
+    vault_unlock_buckets: dict[int, dict[int, UnlockBucket]]
+
+    # Single-vault layout of contracts deployed before vaults (see OASIS_MIGRATION.md).
+    # Positions are read from it until their first write moves them to the default
+    # vault, and total_liquidity holds the liquidity of those not moved yet.
     user_deposit_b: dict[CallerId, Amount]
     user_liquidity: dict[CallerId, Amount]
     total_liquidity: Amount
     user_balances: dict[CallerId, dict[TokenUid, Amount]]
-    token_b: TokenUid
-    # Track if a user's position has been closed and is ready for withdrawal
     user_position_closed: dict[CallerId, bool]
-    # Track withdrawn balances separately from cashback/rewards
     closed_position_balances: dict[CallerId, dict[TokenUid, Amount]]
-    # Track user position entry (price at deposit, withdrawal time)
     user_position_entry: dict[CallerId, UserPositionEntry]
-    # Emergency pause state
-    paused: bool
 
     @public(allow_deposit=True)
     def initialize(
@@ -163,6 +303,14 @@ class Oasis(Blueprint):
         self.closed_position_balances = {}
         self.user_position_entry = {}
         self.paused = False
+        self.vault_count = 0
+        self.vaults = {}
+        self.vault_ids = {}
+        self.vault_user_states = {}
+        self.vault_depositors = {}
+        self.vault_depositor_ids = {}
+        self.vault_unlock_buckets = {}
+        self._create_vault(token_b, pool_fee)
 
         self.log.info("Oasis initialized",
                      token_b=token_b.hex(),
@@ -170,20 +318,226 @@ class Oasis(Blueprint):
                      protocol_fee=protocol_fee,
                      dev_deposit=action.amount)
 
-    def _get_pool_key(self) -> str:
+    def _get_pool_key(self, token_b: TokenUid, pool_fee: Amount) -> str:
         """Generate the pool key for the HTR/token_b pair.
 
         Token ordering must match DozerPoolManager's convention: tokens are sorted
         lexicographically by their UID bytes to ensure consistent pool identification.
         """
         token_a = TokenUid(HATHOR_TOKEN_UID)
-        token_b = self.token_b
 
         # Ensure tokens are ordered lexicographically (smaller UID first)
         if token_a > token_b:
             token_a, token_b = token_b, token_a
 
-        return f"{token_a.hex()}/{token_b.hex()}/{self.pool_fee}"
+        return f"{token_a.hex()}/{token_b.hex()}/{pool_fee}"
+
+    def _new_vault_state(self, token_b: TokenUid, pool_fee: Amount) -> VaultState:
+        """Build the state of an empty vault for the HTR/token_b pool with pool_fee."""
+        return VaultState(
+            token_b=token_b,
+            pool_fee=pool_fee,
+            pool_key=self._get_pool_key(token_b, pool_fee),
+            total_liquidity=Amount(0),
+            open_positions=0,
+            total_locked_b=Amount(0),
+            total_bonus_paid=Amount(0),
+            total_closed_b=Amount(0),
+            total_closed_htr=Amount(0),
+            locked_b_by_timelock=EMPTY_LOCKED_B,
+            legacy_locked_b=Amount(0),
+        )
+
+    def _create_vault(self, token_b: TokenUid, pool_fee: Amount) -> int:
+        """Create an empty vault for the HTR/token_b pool with pool_fee and return its id."""
+        vault = self._new_vault_state(token_b, pool_fee)
+        if vault.pool_key in self.vault_ids:
+            raise NCFail("Vault already exists")
+
+        vault_id = self.vault_count
+        self.vaults[vault_id] = vault
+        self.vault_ids[vault.pool_key] = vault_id
+        self.vault_user_states[vault_id] = {}
+        self.vault_depositors[vault_id] = []
+        self.vault_depositor_ids[vault_id] = {}
+        self.vault_unlock_buckets[vault_id] = {}
+        self.vault_count = vault_id + 1
+        return vault_id
+
+    @public
+    def create_vault(self, ctx: Context, token_b: TokenUid, pool_fee: Amount) -> int:
+        """Create a vault for the HTR/token_b pool with pool_fee.
+
+        The vault pairs its deposits with HTR from the shared treasury. The pool
+        must already exist in the pool manager.
+
+        Args:
+            ctx: Execution context
+            token_b: Token deposited into the vault
+            pool_fee: Fee of the HTR/token_b pool
+
+        Returns:
+            The id of the new vault
+
+        Raises:
+            NCFail: If caller is not dev, token_b is HTR, the vault already exists or the pool does not
+        """
+        if Address(ctx.caller_id) != self.dev_address:
+            raise NCFail("Only dev can create vaults")
+        if token_b == TokenUid(HATHOR_TOKEN_UID):
+            raise NCFail("Vault token must not be HTR")
+
+        # Raises if the pool does not exist
+        self._get_pool_manager().view().get_reserves(TokenUid(HATHOR_TOKEN_UID), token_b, pool_fee)
+
+        self._ensure_default_vault()
+        vault_id = self._create_vault(token_b, pool_fee)
+
+        self.log.info("Vault created",
+                     vault_id=vault_id,
+                     token_b=token_b.hex(),
+                     pool_fee=pool_fee)
+        return vault_id
+
+    def _get_vault(self, vault_id: int) -> VaultState:
+        """Get a vault, raising NCFail if it does not exist."""
+        if vault_id in self.vaults:
+            return self.vaults[vault_id]
+        if vault_id == DEFAULT_VAULT_ID:
+            # Upgraded from the single-vault layout and not written since, see _ensure_default_vault
+            return self._new_vault_state(self.token_b, self.pool_fee)._replace(total_liquidity=self.total_liquidity)
+        raise NCFail("Vault not found")
+
+    def _ensure_default_vault(self) -> None:
+        """Create the default vault of a contract upgraded from the single-vault layout.
+
+        Called before every write, since an upgraded contract has no vaults (and no
+        vault_count) until then. The vault starts with the legacy total_liquidity,
+        which keeps counting the liquidity of positions not migrated yet.
+        """
+        if DEFAULT_VAULT_ID in self.vaults:
+            return
+        self.vault_count = 0
+        self._create_vault(self.token_b, self.pool_fee)
+        self._update_vault(DEFAULT_VAULT_ID, total_liquidity=self.total_liquidity)
+
+    def _update_vault(self, vault_id: int, **kwargs) -> VaultState:
+        """Update vault state with specified fields using _replace().
+
+        Returns the updated vault.
+        """
+        vault = self.vaults[vault_id]._replace(**kwargs)
+        self.vaults[vault_id] = vault
+        return vault
+
+    def _get_vault_user_state(self, vault_id: int, address: CallerId) -> VaultUserState:
+        """Get a user's state in a vault, empty if the user never interacted with it.
+
+        Default vault positions not migrated yet are read from the single-vault layout.
+        """
+        if vault_id in self.vaults and address in self.vault_user_states[vault_id]:
+            return self.vault_user_states[vault_id][address]
+        if vault_id == DEFAULT_VAULT_ID:
+            legacy_state = self._get_legacy_user_state(address)
+            if legacy_state is not None:
+                return legacy_state
+        return EMPTY_VAULT_USER_STATE
+
+    def _get_legacy_user_state(self, address: CallerId) -> VaultUserState | None:
+        """Build a user's default vault state from the single-vault layout, None without legacy state.
+
+        The layout does not store the HTR paired with a position, so paired_htr is
+        rebuilt from the deposit and its entry price in HTR, the amount the bonus was
+        computed on. Nor does it store timelocks, so locked_b_by_timelock stays empty.
+        """
+        if address not in self.user_deposit_b and address not in self.user_balances:
+            return None
+
+        balances = self.user_balances.get(address, {})
+        closed_balances = self.closed_position_balances.get(address, {})
+        entry = self.user_position_entry.get(address, EMPTY_USER_POSITION)
+        deposit_b = Amount(self.user_deposit_b.get(address, 0))
+        position_closed = self.user_position_closed.get(address, False)
+        paired_htr = Amount(0)
+        if deposit_b > 0 and not position_closed:
+            paired_htr = Amount(deposit_b * entry.token_price_in_htr_in_deposit // PRICE_PRECISION)
+
+        return VaultUserState(
+            deposit_b=deposit_b,
+            liquidity=Amount(self.user_liquidity.get(address, 0)),
+            balance_htr=Amount(balances.get(TokenUid(HATHOR_TOKEN_UID), 0)),
+            balance_b=Amount(balances.get(self.token_b, 0)),
+            position_closed=position_closed,
+            closed_balance_htr=Amount(closed_balances.get(TokenUid(HATHOR_TOKEN_UID), 0)),
+            closed_balance_b=Amount(closed_balances.get(self.token_b, 0)),
+            htr_price_in_deposit=entry.htr_price_in_deposit,
+            token_price_in_htr_in_deposit=entry.token_price_in_htr_in_deposit,
+            withdrawal_time=entry.withdrawal_time,
+            paired_htr=paired_htr,
+            locked_b_by_timelock=EMPTY_LOCKED_B,
+        )
+
+    def _migrate_legacy_user(self, vault_id: int, address: CallerId) -> None:
+        """Move a user's state from the single-vault layout to the default vault before writing it.
+
+        Registers the position and adds it to the vault's aggregates and unlock
+        buckets. The bonus still credited to an open position is added to
+        total_bonus_paid, and its token_b to legacy_locked_b rather than to
+        locked_b_by_timelock.
+        """
+        if vault_id != DEFAULT_VAULT_ID:
+            return
+        self._ensure_default_vault()
+        if address in self.vault_user_states[DEFAULT_VAULT_ID]:
+            return
+        state = self._get_legacy_user_state(address)
+        if state is None:
+            return
+
+        self.vault_user_states[DEFAULT_VAULT_ID][address] = state
+        self.total_liquidity = Amount(self.total_liquidity - state.liquidity)
+        if state.deposit_b > 0:
+            self._register_depositor(DEFAULT_VAULT_ID, address)
+            vault = self.vaults[DEFAULT_VAULT_ID]
+            if state.position_closed:
+                self._update_vault(
+                    DEFAULT_VAULT_ID,
+                    total_closed_b=Amount(vault.total_closed_b + state.closed_balance_b),
+                    total_closed_htr=Amount(vault.total_closed_htr + state.closed_balance_htr),
+                )
+            else:
+                self._update_vault(
+                    DEFAULT_VAULT_ID,
+                    open_positions=vault.open_positions + 1,
+                    total_locked_b=Amount(vault.total_locked_b + state.deposit_b),
+                    total_bonus_paid=Amount(vault.total_bonus_paid + state.balance_htr),
+                    legacy_locked_b=Amount(vault.legacy_locked_b + state.deposit_b),
+                )
+                self._add_to_unlock_bucket(
+                    DEFAULT_VAULT_ID, state.withdrawal_time, state.deposit_b, state.paired_htr
+                )
+
+        if address in self.user_deposit_b:
+            del self.user_deposit_b[address]
+        if address in self.user_liquidity:
+            del self.user_liquidity[address]
+        if address in self.user_balances:
+            del self.user_balances[address]
+        if address in self.user_position_closed:
+            del self.user_position_closed[address]
+        if address in self.closed_position_balances:
+            del self.closed_position_balances[address]
+        if address in self.user_position_entry:
+            del self.user_position_entry[address]
+
+    def _update_vault_user_state(self, vault_id: int, address: CallerId, **kwargs) -> VaultUserState:
+        """Update a user's state in a vault with specified fields using _replace().
+
+        Returns the updated state.
+        """
+        state = self._get_vault_user_state(vault_id, address)._replace(**kwargs)
+        self.vault_user_states[vault_id][address] = state
+        return state
 
     @public(allow_deposit=True)
     def owner_deposit(self, ctx: Context) -> None:
@@ -211,30 +565,53 @@ class Oasis(Blueprint):
         Raises:
             NCFail: If deposit requirements not met or invalid timelock
         """
+        self._user_deposit(ctx, DEFAULT_VAULT_ID, timelock)
+
+    @public(allow_deposit=True)
+    def vault_user_deposit(self, ctx: Context, vault_id: int, timelock: int) -> None:
+        """Deposits the vault's token B with a timelock period for bonus rewards.
+
+        Args:
+            ctx: Execution context
+            vault_id: Vault to deposit into
+            timelock: Lock period in months (6, 9, or 12)
+
+        Raises:
+            NCFail: If the vault does not exist, deposit requirements not met or invalid timelock
+        """
+        self._user_deposit(ctx, vault_id, timelock)
+
+    def _user_deposit(self, ctx: Context, vault_id: int, timelock: int) -> None:
         caller = Address(ctx.caller_id)
         self._check_not_paused(ctx)
+        self._migrate_legacy_user(vault_id, caller)
+        self._migrate_legacy_user(vault_id, Address(self.dev_address))
+        vault = self._get_vault(vault_id)
 
         action = self._get_single_token_action(
-            ctx, NCActionType.DEPOSIT, self.token_b, auth=False
+            ctx, NCActionType.DEPOSIT, vault.token_b, auth=False
         )
 
         # Multiple deposits are allowed before closing. However, once a position is closed,
         # new deposits are blocked to prevent the complexity of mixing closed withdrawal
         # balances with new active liquidity. Users must fully withdraw before depositing again.
-        if self.user_position_closed.get(caller, False):
+        if self._get_vault_user_state(vault_id, caller).position_closed:
             raise NCFail("Need to withdraw before making a new deposit")
 
-        # Get HTR price in USD from the DozerPoolManager
-        htr_price = self._get_pool_manager().view().get_token_price_in_usd(HATHOR_TOKEN_UID)
-
-        if htr_price == 0:
-            raise NCFail("HTR price not available from pool manager")
-
         # Calculate and deduct protocol fee
         amount = action.amount
         fee_amount = self._ceil_div(Amount(amount * self.protocol_fee), Amount(1000))
         deposit_amount = Amount(amount - fee_amount)
 
+        # Read prices, the add liquidity quote and the Oasis position in one pool manager call
+        snapshot = self._get_pool_snapshot(vault, deposit_amount, int(ctx.block.timestamp))
+
+        # Get HTR price in USD from the DozerPoolManager
+        htr_price = snapshot.htr_price_usd
+
+        if htr_price == 0:
+            raise NCFail("HTR price not available from pool manager")
+
         self.log.debug("Fee and bonus calculation",
                        original_amount=amount,
                        fee_amount=fee_amount,
@@ -242,26 +619,17 @@ class Oasis(Blueprint):
                        htr_price=htr_price)
 
         # Add fee to dev balances
-        self._add_user_balance(Address(self.dev_address), self.token_b, Amount(fee_amount))
+        self._add_user_balance(vault_id, Address(self.dev_address), vault.token_b, Amount(fee_amount))
 
         assert deposit_amount > 0, "Deposit amount must be greater than 0"
 
-        htr_amount = self._quote_add_liquidity_in(deposit_amount)
+        htr_amount = snapshot.htr_quote
         assert htr_amount > 0, "htr_amount must be greater than 0"
 
         # Use TWAP price from DozerPoolManager instead of spot price FOR BONUS CALCULATION
         # This prevents price manipulation attacks where attackers swap to manipulate
         # the pool price, deposit for inflated bonuses, then undo the swap
-        token_price_in_htr = (
-            self._get_pool_manager()
-            .view()
-            .get_twap_price(
-                HATHOR_TOKEN_UID,
-                self.token_b,
-                self.pool_fee,
-                current_timestamp=int(ctx.block.timestamp),
-            )
-        )
+        token_price_in_htr = snapshot.token_b_price_in_htr
 
         # Calculate HTR amount using TWAP for bonus calculation
         # get_twap_price returns "price of token_b in terms of HTR"
@@ -275,42 +643,39 @@ class Oasis(Blueprint):
         if htr_amount + bonus > self.oasis_htr_balance:
             raise NCFail("Not enough balance")
 
-        if self.total_liquidity == 0:
+        if vault.total_liquidity == 0:
             liquidity_increase = Amount(deposit_amount * PRECISION)
         else:
-            oasis_lp_amount_b = self._get_oasis_lp_amount_b()
+            oasis_lp_amount_b = snapshot.oasis_lp_b
             assert oasis_lp_amount_b > 0, "Oasis has no token_b liquidity on pool"
 
             liquidity_increase = Amount(
-                self.total_liquidity * deposit_amount // oasis_lp_amount_b
+                vault.total_liquidity * deposit_amount // oasis_lp_amount_b
             )
 
-        self.user_liquidity[caller] = Amount(
-            self.user_liquidity.get(caller, 0) + liquidity_increase
-        )
-        self.total_liquidity = Amount(self.total_liquidity + liquidity_increase)
+        # Read after booking the fee, the caller may be the dev
+        state = self._get_vault_user_state(vault_id, caller)
+        has_position = state.withdrawal_time > 0
 
         # Calculate withdrawal time using helper
         withdrawal_time = self._calculate_new_withdrawal_time(
-            caller, Timestamp(now), timelock, deposit_amount
+            state, Timestamp(now), timelock, deposit_amount
         )
 
         # Update position entry prices with weighted average if existing position
-        if caller in self.user_position_entry:
-            old_deposit = self.user_deposit_b[caller]
-
+        if has_position:
             new_htr_price = Amount(
                 self._calculate_weighted_average(
-                    self.user_position_entry[caller].htr_price_in_deposit,
-                    old_deposit,
+                    state.htr_price_in_deposit,
+                    state.deposit_b,
                     htr_price,
                     deposit_amount
                 )
             )
             new_token_price = Amount(
                 self._calculate_weighted_average(
-                    self.user_position_entry[caller].token_price_in_htr_in_deposit,
-                    old_deposit,
+                    state.token_price_in_htr_in_deposit,
+                    state.deposit_b,
                     token_price_in_htr,
                     deposit_amount
                 )
@@ -319,20 +684,32 @@ class Oasis(Blueprint):
             new_htr_price = htr_price
             new_token_price = Amount(token_price_in_htr)
 
-        # Store as NamedTuple
-        self.user_position_entry[caller] = UserPositionEntry(
+        self._record_position_deposit(
+            vault_id, vault, caller, timelock, deposit_amount, bonus, liquidity_increase, not has_position
+        )
+        paired_htr = self._record_unlock_deposit(vault_id, state, withdrawal_time, deposit_amount, htr_amount)
+
+        locked_b_by_timelock = list(state.locked_b_by_timelock)
+        index = VALID_TIMELOCKS.index(timelock)
+        locked_b_by_timelock[index] = Amount(locked_b_by_timelock[index] + deposit_amount)
+
+        self._update_vault_user_state(
+            vault_id,
+            caller,
+            deposit_b=Amount(state.deposit_b + deposit_amount),
+            liquidity=Amount(state.liquidity + liquidity_increase),
+            balance_htr=Amount(state.balance_htr + bonus),
             htr_price_in_deposit=new_htr_price,
             token_price_in_htr_in_deposit=new_token_price,
-            withdrawal_time=withdrawal_time
+            withdrawal_time=withdrawal_time,
+            paired_htr=paired_htr,
+            locked_b_by_timelock=tuple(locked_b_by_timelock),
         )
 
         self.oasis_htr_balance = Amount(self.oasis_htr_balance - bonus - htr_amount)
-        self._add_user_balance(caller, TokenUid(HATHOR_TOKEN_UID), bonus)
-        self.user_deposit_b[caller] = Amount(
-            self.user_deposit_b.get(caller, 0) + deposit_amount
-        )
 
         self.log.info("User deposit completed",
+                     vault_id=vault_id,
                      deposit_amount=deposit_amount,
                      htr_amount=htr_amount,
                      bonus=bonus,
@@ -340,25 +717,25 @@ class Oasis(Blueprint):
                      liquidity_increase=liquidity_increase)
 
         actions:list[NCAction] = [
-            NCDepositAction(amount=deposit_amount, token_uid=self.token_b),
+            NCDepositAction(amount=deposit_amount, token_uid=vault.token_b),
             NCDepositAction(amount=htr_amount, token_uid=TokenUid(HATHOR_TOKEN_UID))
         ]
 
         # Returns tuple: (token_uid: TokenUid, cashback_amount: Amount)
-        token_uid, cashback_amount = self._get_pool_manager().public(*actions).add_liquidity(self.pool_fee)
+        token_uid, cashback_amount = self._get_pool_manager().public(*actions).add_liquidity(vault.pool_fee)
 
         if cashback_amount > 0:  # If there's cashback amount
             self.log.debug("Cashback received",
                           token=token_uid.hex(),
                           amount=cashback_amount)
 
-            assert token_uid == self.token_b, "Withdrawal token must be token_b"
+            assert token_uid == vault.token_b, "Withdrawal token must be token_b"
             adjust_actions:list[NCAction] = [
                     NCWithdrawalAction(amount=0, token_uid=TokenUid(HATHOR_TOKEN_UID)),
-                    NCWithdrawalAction(amount=cashback_amount, token_uid=self.token_b),
+                    NCWithdrawalAction(amount=cashback_amount, token_uid=vault.token_b),
                 ]
-            self._get_pool_manager().public(*adjust_actions).withdraw_cashback(self._get_pool_key())
-            self._add_user_balance(caller, token_uid, cashback_amount)
+            self._get_pool_manager().public(*adjust_actions).withdraw_cashback(vault.pool_key)
+            self._add_user_balance(vault_id, caller, token_uid, cashback_amount)
 
     @public
     def close_position(self, ctx: Context) -> None:
@@ -370,20 +747,38 @@ class Oasis(Blueprint):
         Raises:
             NCFail: If position is still locked or already closed
         """
+        self._close_position(ctx, DEFAULT_VAULT_ID)
+
+    @public
+    def vault_close_position(self, ctx: Context, vault_id: int) -> None:
+        """Close a user's position in a vault, see close_position.
+
+        Args:
+            ctx: Execution context
+            vault_id: Vault of the position
+
+        Raises:
+            NCFail: If the vault does not exist, position is still locked or already closed
+        """
+        self._close_position(ctx, vault_id)
+
+    def _close_position(self, ctx: Context, vault_id: int) -> None:
         caller = Address(ctx.caller_id)
         self._check_not_paused(ctx)
+        self._migrate_legacy_user(vault_id, caller)
+        vault = self._get_vault(vault_id)
+        state = self._get_vault_user_state(vault_id, caller)
         # Verify position can be closed
-        withdrawal_time = self.user_position_entry.get(caller, EMPTY_USER_POSITION).withdrawal_time
-        if ctx.block.timestamp < withdrawal_time:
+        if ctx.block.timestamp < state.withdrawal_time:
             raise NCFail("Position is still locked")
 
-        if self.user_position_closed.get(caller, False):
+        if state.position_closed:
             raise NCFail("Position already closed")
 
-        if self.user_liquidity.get(caller, 0) == 0:
+        if state.liquidity == 0:
             raise NCFail("No position to close")
 
-        oasis_quote = self._calculate_position_closure(caller, int(ctx.block.timestamp))
+        oasis_quote = self._calculate_position_closure(vault, state, int(ctx.block.timestamp))
         user_lp_htr = oasis_quote.user_lp_htr
         user_lp_b = oasis_quote.user_lp_b
         loss_htr = oasis_quote.loss_htr
@@ -391,12 +786,12 @@ class Oasis(Blueprint):
         # Create actions to remove liquidity
         actions:list[NCAction] = [
             NCWithdrawalAction(amount=user_lp_htr, token_uid=TokenUid(HATHOR_TOKEN_UID)),
-            NCWithdrawalAction(amount=user_lp_b, token_uid=self.token_b),
+            NCWithdrawalAction(amount=user_lp_b, token_uid=vault.token_b),
         ]
 
         # Call dozer pool manager to remove liquidity
         # Returns tuple: (token_uid: TokenUid, change: Amount)
-        token_uid, change = self._get_pool_manager().public(*actions).remove_liquidity(self.pool_fee)
+        token_uid, change = self._get_pool_manager().public(*actions).remove_liquidity(vault.pool_fee)
 
         if change > 0:
             self.log.debug("Change received from remove_liquidity",
@@ -404,58 +799,56 @@ class Oasis(Blueprint):
                           change=change)
 
             # Withdraw change from pool manager
-            if token_uid == self.token_b:
+            if token_uid == vault.token_b:
                 adjust_actions = [
                     NCWithdrawalAction(amount=0, token_uid=TokenUid(HATHOR_TOKEN_UID)),
-                    NCWithdrawalAction(amount=change, token_uid=self.token_b),
+                    NCWithdrawalAction(amount=change, token_uid=vault.token_b),
                 ]
             else:
                 # Should not happen given we only remove liquidity for token B change
                 adjust_actions = [
                     NCWithdrawalAction(amount=change, token_uid=TokenUid(HATHOR_TOKEN_UID)),
-                    NCWithdrawalAction(amount=0, token_uid=self.token_b),
+                    NCWithdrawalAction(amount=0, token_uid=vault.token_b),
                 ]
 
-            self._get_pool_manager().public(*adjust_actions).withdraw_cashback(self._get_pool_key())
+            self._get_pool_manager().public(*adjust_actions).withdraw_cashback(vault.pool_key)
 
             # Add change to user balance
-            self._add_user_balance(caller, token_uid, change)
-
-        # Get existing cashback balances
-        user_current_balance = self.user_balances.get(caller, {})
-        user_htr_current_balance = Amount(user_current_balance.get(TokenUid(HATHOR_TOKEN_UID), 0))
+            state = self._add_user_balance(vault_id, caller, token_uid, change)
 
         # First, return the user_lp_htr back to oasis_htr_balance
         self.oasis_htr_balance = Amount(self.oasis_htr_balance + user_lp_htr - loss_htr)
 
-        # Then update closed balances without adding user_lp_htr again
-        closed_balances: dict[TokenUid, Amount] = {}
-        # We need to fetch the fresh balance again because it might have changed
-        user_token_b_balance = self.user_balances.get(caller, {}).get(
-            self.token_b, 0
-        )
-        closed_balances[self.token_b] = Amount(user_token_b_balance + user_lp_b)
-        closed_balances[TokenUid(HATHOR_TOKEN_UID)] = Amount(user_htr_current_balance + loss_htr)
-        self.closed_position_balances[caller] = closed_balances
-
-        # Clear user cashback balances after moving them
-        if user_token_b_balance > 0 or user_htr_current_balance > 0:
-            user_balance = self.user_balances.get(caller, {})
-            user_balance[TokenUid(HATHOR_TOKEN_UID)] = Amount(0)
-            user_balance[self.token_b] = Amount(0)
-            self.user_balances[caller] = user_balance
+        # Move cashback balances to the closed balances, adding the position's tokens
+        closed_balance_b = Amount(state.balance_b + user_lp_b)
+        closed_balance_htr = Amount(state.balance_htr + loss_htr)
 
-        # Mark position as closed
-        self.user_position_closed[caller] = True
+        self._record_position_close(vault_id, vault, state, closed_balance_b, closed_balance_htr)
+        self._remove_from_unlock_bucket(
+            vault_id, state.withdrawal_time, state.deposit_b, state.paired_htr
+        )
 
-        # Keep the deposit amounts for reference, but reset liquidity
-        self.total_liquidity = Amount(self.total_liquidity - self.user_liquidity[caller])
-        del self.user_liquidity[caller]
-        del self.user_position_entry[caller]
+        # Mark position as closed, keep the deposit amount for reference but reset liquidity
+        self._update_vault_user_state(
+            vault_id,
+            caller,
+            liquidity=Amount(0),
+            balance_htr=Amount(0),
+            balance_b=Amount(0),
+            position_closed=True,
+            closed_balance_htr=closed_balance_htr,
+            closed_balance_b=closed_balance_b,
+            htr_price_in_deposit=Amount(0),
+            token_price_in_htr_in_deposit=Amount(0),
+            withdrawal_time=0,
+            paired_htr=Amount(0),
+            locked_b_by_timelock=EMPTY_LOCKED_B,
+        )
 
         self.log.info("Position closed",
-                     available_token_b=closed_balances.get(self.token_b, 0),
-                     available_htr=closed_balances.get(TokenUid(HATHOR_TOKEN_UID), 0))
+                     vault_id=vault_id,
+                     available_token_b=closed_balance_b,
+                     available_htr=closed_balance_htr)
 
     @public(allow_withdrawal=True)
     def user_withdraw(self, ctx: Context) -> None:
@@ -467,89 +860,131 @@ class Oasis(Blueprint):
         Raises:
             NCFail: If position is not closed or insufficient funds
         """
+        self._user_withdraw(ctx, DEFAULT_VAULT_ID)
 
+    @public(allow_withdrawal=True)
+    def vault_user_withdraw(self, ctx: Context, vault_id: int) -> None:
+        """Withdraw funds from a vault after position is closed, see user_withdraw.
+
+        Args:
+            ctx: Execution context
+            vault_id: Vault of the position
+
+        Raises:
+            NCFail: If the vault does not exist, position is not closed or insufficient funds
+        """
+        self._user_withdraw(ctx, vault_id)
+
+    def _user_withdraw(self, ctx: Context, vault_id: int) -> None:
         self._check_not_paused(ctx)
+        caller = Address(ctx.caller_id)
+        self._migrate_legacy_user(vault_id, caller)
+        vault = self._get_vault(vault_id)
 
         # Handle 1 or 2 withdrawal actions (token_b required, HTR optional)
         if len(ctx.actions) == 1:
             action_token_b = self._get_single_token_action(
-                ctx, NCActionType.WITHDRAWAL, self.token_b
+                ctx, NCActionType.WITHDRAWAL, vault.token_b
             )
             action_htr = None
         elif len(ctx.actions) == 2:
             action_token_b, action_htr = self._get_two_token_actions(
-                ctx, NCActionType.WITHDRAWAL, self.token_b, TokenUid(HATHOR_TOKEN_UID)
+                ctx, NCActionType.WITHDRAWAL, vault.token_b, TokenUid(HATHOR_TOKEN_UID)
             )
         else:
             raise NCFail("Expected 1 or 2 withdrawal actions")
 
+        state = self._get_vault_user_state(vault_id, caller)
+
         # Check if the position is unlocked
-        withdrawal_time = self.user_position_entry.get(Address(ctx.caller_id), EMPTY_USER_POSITION).withdrawal_time
-        if ctx.block.timestamp < withdrawal_time:
+        if ctx.block.timestamp < state.withdrawal_time:
             raise NCFail("Withdrawal locked")
 
         # For positions that haven't been closed yet, automatically close them first
-        if self.user_liquidity.get(Address(ctx.caller_id), 0) > 0:
+        if state.liquidity > 0:
             raise NCFail("Position must be closed before withdrawal")
 
-        # Check token_b withdrawal amount from closed_position_balances
-        available_token_b = self.closed_position_balances.get(Address(ctx.caller_id), {}).get(
-            self.token_b, 0
-        )
+        # Check token_b withdrawal amount from the closed balances
+        available_token_b = state.closed_balance_b
         if action_token_b.amount > available_token_b:
             raise NCFail(
                 f"Not enough balance. Available: {available_token_b}, Requested: {action_token_b.amount}"
             )
-
-        # Update token_b balance in closed_position_balances
-        closed_balances = self.closed_position_balances.get(Address(ctx.caller_id), {})
-        closed_balances[self.token_b] = Amount(available_token_b - action_token_b.amount)
+        closed_balance_b = Amount(available_token_b - action_token_b.amount)
 
         # Check HTR withdrawal if requested
+        closed_balance_htr = state.closed_balance_htr
         if action_htr:
-            available_htr = self.closed_position_balances.get(Address(ctx.caller_id), {}).get(
-                TokenUid(HATHOR_TOKEN_UID), Amount(0)
-            )
+            available_htr = state.closed_balance_htr
             if action_htr.amount > available_htr:
                 raise NCFail(
                     f"Not enough HTR balance. Available: {available_htr}, Requested: {action_htr.amount}"
                 )
 
-            closed_balances[TokenUid(HATHOR_TOKEN_UID)] = Amount(available_htr - action_htr.amount)
-
-        # Update closed position balances
-        self.closed_position_balances[Address(ctx.caller_id)] = closed_balances
+            closed_balance_htr = Amount(available_htr - action_htr.amount)
 
         htr_withdrawn = action_htr.amount if action_htr else 0
+        self._update_vault(
+            vault_id,
+            total_closed_b=Amount(vault.total_closed_b - action_token_b.amount),
+            total_closed_htr=Amount(vault.total_closed_htr - htr_withdrawn),
+        )
         self.log.info("User withdrawal",
+                     vault_id=vault_id,
                      token_b_amount=action_token_b.amount,
                      htr_amount=htr_withdrawn,
-                     remaining_token_b=closed_balances.get(self.token_b, 0),
-                     remaining_htr=closed_balances.get(TokenUid(HATHOR_TOKEN_UID), 0))
+                     remaining_token_b=closed_balance_b,
+                     remaining_htr=closed_balance_htr)
 
         # If all funds withdrawn, clean up user data
-        if (
-            closed_balances.get(self.token_b, 0) == 0
-            and closed_balances.get(TokenUid(HATHOR_TOKEN_UID), 0) == 0
-        ):
-            del self.user_deposit_b[Address(ctx.caller_id)]
-            del self.user_position_entry[Address(ctx.caller_id)]
-            del self.user_position_closed[Address(ctx.caller_id)]
+        if closed_balance_b == 0 and closed_balance_htr == 0:
+            self._update_vault_user_state(
+                vault_id,
+                caller,
+                deposit_b=Amount(0),
+                position_closed=False,
+                closed_balance_htr=Amount(0),
+                closed_balance_b=Amount(0),
+            )
+        else:
+            self._update_vault_user_state(
+                vault_id,
+                caller,
+                closed_balance_htr=closed_balance_htr,
+                closed_balance_b=closed_balance_b,
+            )
 
     @public(allow_withdrawal=True)
     def user_withdraw_bonus(self, ctx: Context) -> None:
+        self._user_withdraw_bonus(ctx, DEFAULT_VAULT_ID)
+
+    @public(allow_withdrawal=True)
+    def vault_user_withdraw_bonus(self, ctx: Context, vault_id: int) -> None:
+        """Withdraw the HTR bonus and cashback credited by a vault.
+
+        Args:
+            ctx: Execution context
+            vault_id: Vault that credited the bonus
+
+        Raises:
+            NCFail: If the vault does not exist or the amount exceeds the HTR balance
+        """
+        self._user_withdraw_bonus(ctx, vault_id)
+
+    def _user_withdraw_bonus(self, ctx: Context, vault_id: int) -> None:
         self._check_not_paused(ctx)
+        self._migrate_legacy_user(vault_id, Address(ctx.caller_id))
+        self._get_vault(vault_id)
         action = self._get_single_token_action(ctx, NCActionType.WITHDRAWAL, TokenUid(HATHOR_TOKEN_UID), auth=False)
 
-        available_bonus = self.user_balances.get(Address(ctx.caller_id), {HATHOR_TOKEN_UID: 0}).get(
-            HATHOR_TOKEN_UID, 0
-        )
+        available_bonus = self._get_vault_user_state(vault_id, Address(ctx.caller_id)).balance_htr
         if action.amount > available_bonus:
             raise NCFail("Withdrawal amount too high")
 
-        self._add_user_balance(Address(ctx.caller_id), TokenUid(HATHOR_TOKEN_UID), Amount(-action.amount))
+        self._add_user_balance(vault_id, Address(ctx.caller_id), TokenUid(HATHOR_TOKEN_UID), Amount(-action.amount))
 
         self.log.info("Bonus withdrawal",
+                     vault_id=vault_id,
                      amount=action.amount,
                      remaining=available_bonus - action.amount)
 
@@ -582,31 +1017,45 @@ class Oasis(Blueprint):
             self.dozer_pool_manager, blueprint_id=None
         )
 
-    def _get_oasis_lp_amount_b(self) -> Amount:
-        # Get user info for this contract from the pool manager
-        pool_key = self._get_pool_key()
-        user_info = self._get_pool_manager().view().user_info(
-            self.syscall.get_contract_id(),
-            pool_key
-        )
-        return user_info.token1Amount  # token_b amount
+    def _get_pool_snapshot(self, vault: VaultState, amount_b: Amount, current_timestamp: int) -> PoolSnapshot:
+        """Read everything Oasis needs about a vault's pool from the pool manager in a single view call.
 
-    def _quote_add_liquidity_in(self, amount: Amount) -> Amount:
-        pool_key = self._get_pool_key()
-        return self._get_pool_manager().view().front_quote_add_liquidity_in(
-            amount, self.token_b, pool_key
-        )
+        Args:
+            vault: Vault whose HTR/token_b pool to read
+            amount_b: Token_b amount to quote the HTR counterpart for, 0 to skip the quote
+            current_timestamp: Current block timestamp for the TWAP price
 
-    def _quote_remove_liquidity_oasis(self) -> PoolLiquidityInfo:
-        # Get user info for this contract from the pool manager
-        pool_key = self._get_pool_key()
-        user_info = self._get_pool_manager().view().user_info(
+        Returns:
+            The pool state oriented as HTR/token_b
+        """
+        snapshot = self._get_pool_manager().view().get_liquidity_snapshot(
             self.syscall.get_contract_id(),
-            pool_key
+            vault.pool_key,
+            vault.token_b,
+            amount_b,
+            current_timestamp,
         )
-        return PoolLiquidityInfo(
-            max_withdraw_a=user_info.token0Amount,  # HTR amount
-            user_lp_b=user_info.token1Amount,       # token_b amount
+
+        # get_twap_price(HTR, token_b) is the pool's token_a per token_b price when
+        # HTR is token_a, and its token_b per token_a price otherwise
+        if snapshot.token_a == vault.token_b.hex():
+            return PoolSnapshot(
+                reserve_htr=snapshot.reserve_b,
+                reserve_b=snapshot.reserve_a,
+                oasis_lp_htr=snapshot.token1Amount,
+                oasis_lp_b=snapshot.token0Amount,
+                token_b_price_in_htr=snapshot.twap_price_a,
+                htr_price_usd=snapshot.htr_price_usd,
+                htr_quote=snapshot.quote_amount,
+            )
+        return PoolSnapshot(
+            reserve_htr=snapshot.reserve_a,
+            reserve_b=snapshot.reserve_b,
+            oasis_lp_htr=snapshot.token0Amount,
+            oasis_lp_b=snapshot.token1Amount,
+            token_b_price_in_htr=snapshot.twap_price_b,
+            htr_price_usd=snapshot.htr_price_usd,
+            htr_quote=snapshot.quote_amount,
         )
 
     def _calculate_weighted_average(
@@ -634,7 +1083,7 @@ class Oasis(Blueprint):
 
     def _calculate_new_withdrawal_time(
         self,
-        address: Address,
+        state: VaultUserState,
         now: Timestamp,
         timelock: int,
         deposit_amount: Amount
@@ -642,7 +1091,7 @@ class Oasis(Blueprint):
         """Calculate withdrawal time for a deposit considering existing position with minimum timelock floor.
 
         Args:
-            address: User address
+            state: User's state in the vault before the deposit
             now: Current timestamp
             timelock: New deposit timelock in months
             deposit_amount: Amount being deposited (after fees)
@@ -650,13 +1099,13 @@ class Oasis(Blueprint):
         Returns:
             Unix timestamp when withdrawal will be allowed
         """
-        if address in self.user_position_entry:
-            existing_withdrawal_time = self.user_position_entry[address].withdrawal_time
+        if state.withdrawal_time > 0:
+            existing_withdrawal_time = state.withdrawal_time
             delta = existing_withdrawal_time - now
 
             if delta > 0:
                 # Calculate weighted average withdrawal time
-                old_deposit = self.user_deposit_b[address]
+                old_deposit = state.deposit_b
                 new_timelock_seconds = timelock * MONTHS_IN_SECONDS
                 weighted_time = self._calculate_weighted_average(
                     delta, old_deposit, new_timelock_seconds, deposit_amount
@@ -682,7 +1131,7 @@ class Oasis(Blueprint):
 
     def _get_user_bonus(self, timelock: int, amount: Amount) -> Amount:
         """Calculates the bonus for a user based on the timelock and amount"""
-        if timelock not in [6, 9, 12]:  # Assuming these are the only valid values
+        if timelock not in VALID_TIMELOCKS:
             raise NCFail("Invalid timelock value")
         # Using integer calculations with basis points (10000 = 100%)
         # 6 months = 10% = 1000 basis points
@@ -693,29 +1142,20 @@ class Oasis(Blueprint):
         return Amount((amount * bonus_multiplier[timelock]) // 10000)
 
     def _calculate_impermanent_loss_compensation(
-        self, loss_in_token_b: int, user_lp_htr: int, current_timestamp: int
+        self, loss_in_token_b: int, user_lp_htr: int, token_b_price_in_htr: int
     ) -> int:
         """Calculate HTR compensation for impermanent loss in token_b.
 
         Args:
             loss_in_token_b: Amount of token_b loss
             user_lp_htr: User's HTR in liquidity pool (max compensation)
-            current_timestamp: Current block timestamp for TWAP calculation
+            token_b_price_in_htr: TWAP price of token_b in HTR from the pool snapshot
 
         Returns:
             HTR amount to compensate for loss (capped at user_lp_htr)
         """
-        pool_manager = self._get_pool_manager()
-
         # Use TWAP price instead of spot price for IL compensation
         # This prevents manipulation where user swaps to inflate IL, gets compensated, then undoes swap
-        token_b_price_in_htr = pool_manager.view().get_twap_price(
-            HATHOR_TOKEN_UID,
-            self.token_b,
-            self.pool_fee,
-            current_timestamp=current_timestamp,
-        )
-
         # Calculate HTR equivalent of token_b loss using TWAP price
         # price is token_b/HTR, so HTR = token_b * price / PRICE_PRECISION
         loss_htr = (loss_in_token_b * token_b_price_in_htr) // PRICE_PRECISION
@@ -730,33 +1170,177 @@ class Oasis(Blueprint):
 
         return loss_htr
 
-    def _quote_token_b_from_htr(self, user_lp_htr: int) -> int:
-        """Calculate token_b amount from HTR amount using pool reserves with correct token ordering"""
-        pool_manager = self._get_pool_manager().view()
-        reserves = pool_manager.get_reserves(HATHOR_TOKEN_UID, self.token_b, self.pool_fee)
-
-        return pool_manager.quote(user_lp_htr, reserves[0], reserves[1])
+    def _quote_token_b_from_htr(self, user_lp_htr: int, snapshot: PoolSnapshot) -> int:
+        """Calculate token_b amount from HTR amount using the snapshot's pool reserves"""
+        return (user_lp_htr * snapshot.reserve_b) // snapshot.reserve_htr
 
-    def _add_user_balance(self, address: Address, token_id: TokenUid, amount: Amount) -> Amount:
-        """Add amount to user's balance for a given token.
+    def _add_user_balance(
+        self, vault_id: int, address: Address, token_id: TokenUid, amount: Amount
+    ) -> VaultUserState:
+        """Add amount to user's balance in a vault for a given token.
 
         Args:
+            vault_id: Vault holding the balance
             address: User address
-            token_id: Token UID to update
+            token_id: Token UID to update, HTR or the vault's token_b
             amount: Amount to add (can be negative for subtraction)
 
         Returns:
-            The new balance after addition
+            The user's state after addition
         """
-        if address not in self.user_balances:
-            self.user_balances[address] = {token_id: amount}
-            return amount
-        else:
-            partial = self.user_balances[address]
-            new_value = Amount(partial.get(token_id, 0) + amount)
-            partial[token_id] = new_value
-            self.user_balances[address] = partial
-            return new_value
+        state = self._get_vault_user_state(vault_id, address)
+        if token_id == TokenUid(HATHOR_TOKEN_UID):
+            return self._update_vault_user_state(
+                vault_id, address, balance_htr=Amount(state.balance_htr + amount)
+            )
+        return self._update_vault_user_state(
+            vault_id, address, balance_b=Amount(state.balance_b + amount)
+        )
+
+    def _register_depositor(self, vault_id: int, address: Address) -> None:
+        """Append an address to the vault's depositor registry the first time it deposits."""
+        if address not in self.vault_depositor_ids[vault_id]:
+            self.vault_depositor_ids[vault_id][address] = len(self.vault_depositors[vault_id])
+            self.vault_depositors[vault_id].append(address)
+
+    def _record_position_deposit(
+        self,
+        vault_id: int,
+        vault: VaultState,
+        address: Address,
+        timelock: int,
+        deposit_amount: Amount,
+        bonus: Amount,
+        liquidity_increase: Amount,
+        new_position: bool,
+    ) -> None:
+        """Update the registry and the vault's running aggregates for a deposit."""
+        self._register_depositor(vault_id, address)
+
+        locked_b_by_timelock = list(vault.locked_b_by_timelock)
+        index = VALID_TIMELOCKS.index(timelock)
+        locked_b_by_timelock[index] = Amount(locked_b_by_timelock[index] + deposit_amount)
+
+        self._update_vault(
+            vault_id,
+            total_liquidity=Amount(vault.total_liquidity + liquidity_increase),
+            open_positions=vault.open_positions + 1 if new_position else vault.open_positions,
+            total_locked_b=Amount(vault.total_locked_b + deposit_amount),
+            total_bonus_paid=Amount(vault.total_bonus_paid + bonus),
+            locked_b_by_timelock=tuple(locked_b_by_timelock),
+        )
+
+    def _record_position_close(
+        self, vault_id: int, vault: VaultState, state: VaultUserState, closed_b: Amount, closed_htr: Amount
+    ) -> None:
+        """Move a closing position from the vault's locked aggregates to the awaiting-withdrawal ones."""
+        locked_b_by_timelock = tuple(
+            Amount(locked - user_locked)
+            for locked, user_locked in zip(vault.locked_b_by_timelock, state.locked_b_by_timelock)
+        )
+        # Deposits migrated from the single-vault layout have no timelock
+        legacy_locked_b = state.deposit_b - sum(state.locked_b_by_timelock)
+
+        self._update_vault(
+            vault_id,
+            total_liquidity=Amount(vault.total_liquidity - state.liquidity),
+            open_positions=vault.open_positions - 1,
+            total_locked_b=Amount(vault.total_locked_b - state.deposit_b),
+            total_closed_b=Amount(vault.total_closed_b + closed_b),
+            total_closed_htr=Amount(vault.total_closed_htr + closed_htr),
+            locked_b_by_timelock=locked_b_by_timelock,
+            legacy_locked_b=Amount(vault.legacy_locked_b - legacy_locked_b),
+        )
+
+    def _add_to_unlock_bucket(
+        self, vault_id: int, withdrawal_time: int, amount_b: Amount, amount_htr: Amount
+    ) -> None:
+        """Add one position to the vault's bucket of the month it unlocks in."""
+        month = withdrawal_time // MONTHS_IN_SECONDS
+        buckets = self.vault_unlock_buckets[vault_id]
+        bucket = buckets.get(month, EMPTY_UNLOCK_BUCKET)
+        buckets[month] = UnlockBucket(
+            amount_b=Amount(bucket.amount_b + amount_b),
+            amount_htr=Amount(bucket.amount_htr + amount_htr),
+            positions=bucket.positions + 1,
+        )
+
+    def _remove_from_unlock_bucket(
+        self, vault_id: int, withdrawal_time: int, amount_b: Amount, amount_htr: Amount
+    ) -> None:
+        """Remove one position from the vault's bucket of the month it unlocks in."""
+        month = withdrawal_time // MONTHS_IN_SECONDS
+        buckets = self.vault_unlock_buckets[vault_id]
+        bucket = buckets[month]
+        if bucket.positions == 1:
+            del buckets[month]
+            return
+        buckets[month] = UnlockBucket(
+            amount_b=Amount(bucket.amount_b - amount_b),
+            amount_htr=Amount(bucket.amount_htr - amount_htr),
+            positions=bucket.positions - 1,
+        )
+
+    def _record_unlock_deposit(
+        self,
+        vault_id: int,
+        state: VaultUserState,
+        withdrawal_time: int,
+        deposit_amount: Amount,
+        htr_amount: Amount,
+    ) -> Amount:
+        """Move a position to the bucket of its new withdrawal time, adding the new deposit.
+
+        Takes the user's state before the deposit, since a repeated deposit re-times the
+        whole position (see _calculate_new_withdrawal_time).
+
+        Returns:
+            The HTR paired with the position after the deposit
+        """
+        amount_b = deposit_amount
+        amount_htr = htr_amount
+        if state.withdrawal_time > 0:
+            self._remove_from_unlock_bucket(
+                vault_id, state.withdrawal_time, state.deposit_b, state.paired_htr
+            )
+            amount_b = Amount(amount_b + state.deposit_b)
+            amount_htr = Amount(amount_htr + state.paired_htr)
+
+        self._add_to_unlock_bucket(vault_id, withdrawal_time, amount_b, amount_htr)
+        return amount_htr
+
+    @public
+    def migrate_to_vaults(self, ctx: Context, addresses: list[Address]) -> None:
+        """Move positions opened before vaults to the default vault ahead of their first write.
+
+        A contract upgraded from the single-vault layout keeps reading those positions
+        from the legacy containers and moves each one on its owner's next deposit,
+        close or withdrawal. Until then it is left out of the default vault's
+        registry, aggregates and unlock buckets, and positions_stats reports its
+        liquidity as unmigrated_liquidity. This call moves positions eagerly, in
+        batches, so the aggregates can be completed without waiting for their owners.
+        Addresses already moved or without legacy state are skipped.
+
+        The legacy layout stores neither bonuses nor timelocks: total_bonus_paid only
+        gets the bonus still credited to a moved open position, and its token_b is
+        counted in legacy_locked_b instead of locked_b_by_timelock.
+
+        Args:
+            ctx: Execution context
+            addresses: Addresses to migrate
+
+        Raises:
+            NCFail: If caller is not dev
+        """
+        if Address(ctx.caller_id) != self.dev_address:
+            raise NCFail("Only dev can migrate to vaults")
+
+        for address in addresses:
+            self._migrate_legacy_user(DEFAULT_VAULT_ID, address)
+
+        self.log.info("Positions migrated to vaults",
+                     addresses=len(addresses),
+                     unmigrated_liquidity=self.total_liquidity)
 
     @public(allow_withdrawal=True)
     def owner_withdraw(self, ctx: Context) -> None:
@@ -790,18 +1374,34 @@ class Oasis(Blueprint):
         Raises:
             NCFail: If caller is not dev or withdraw amount exceeds available balance
         """
+        self._dev_withdraw_fee(ctx, DEFAULT_VAULT_ID)
+
+    @public(allow_withdrawal=True)
+    def vault_dev_withdraw_fee(self, ctx: Context, vault_id: int) -> None:
+        """Allows dev to withdraw the protocol fees collected by a vault.
+
+        Args:
+            ctx: Execution context
+            vault_id: Vault that collected the fees
+
+        Raises:
+            NCFail: If caller is not dev, the vault does not exist or withdraw amount exceeds available balance
+        """
+        self._dev_withdraw_fee(ctx, vault_id)
+
+    def _dev_withdraw_fee(self, ctx: Context, vault_id: int) -> None:
         if Address(ctx.caller_id) != self.dev_address:
             raise NCFail("Only dev can withdraw fees")
+        self._migrate_legacy_user(vault_id, Address(self.dev_address))
+        vault = self._get_vault(vault_id)
 
         token_b_action = self._get_single_token_action(
-            ctx, NCActionType.WITHDRAWAL, self.token_b
+            ctx, NCActionType.WITHDRAWAL, vault.token_b
         )
-        if token_b_action.amount > self.user_balances.get(self.dev_address, {}).get(
-            self.token_b, 0
-        ):
+        if token_b_action.amount > self._get_vault_user_state(vault_id, self.dev_address).balance_b:
             raise NCFail("Withdrawal amount too high")
 
-        self._add_user_balance(Address(self.dev_address), self.token_b, Amount(-token_b_action.amount))
+        self._add_user_balance(vault_id, Address(self.dev_address), vault.token_b, Amount(-token_b_action.amount))
 
     @public
     def update_owner_address(self, ctx: Context, new_owner: Address) -> None:
@@ -919,80 +1519,368 @@ class Oasis(Blueprint):
         address: Address,
         current_timestamp: int,
     ) -> OasisUserInfo:
-        remove_liquidity_oasis_quote = self.get_remove_liquidity_oasis_quote(
-            address, current_timestamp
+        vault = self._get_vault(DEFAULT_VAULT_ID)
+        state = self._get_vault_user_state(DEFAULT_VAULT_ID, address)
+        remove_liquidity_oasis_quote = self._calculate_position_closure(
+            vault, state, current_timestamp
         )
+        return self._get_user_info(vault, state, remove_liquidity_oasis_quote)
 
-        # Safely access nested dicts using 'in' check to avoid state changes
-        user_balance_a = 0
-        if address in self.user_balances:
-            user_balance_a = self.user_balances[address].get(HATHOR_TOKEN_UID, 0)
+    @view
+    def users_info(
+        self,
+        addresses: list[Address],
+        current_timestamp: int,
+    ) -> list[OasisUserInfo]:
+        """Get user_info for many addresses from one pool manager snapshot.
 
-        user_balance_b = 0
-        if address in self.user_balances:
-            user_balance_b = self.user_balances[address].get(self.token_b, 0)
+        The Oasis position, reserves and TWAP price are the same for every user in
+        a block, so they are read once and shared by all open positions.
 
-        closed_balance_a = 0
-        if address in self.closed_position_balances:
-            closed_balance_a = self.closed_position_balances[address].get(HATHOR_TOKEN_UID, 0)
+        Args:
+            addresses: Addresses to get info for (at most MAX_USERS_INFO_BATCH)
+            current_timestamp: Current block timestamp for the TWAP price
 
-        closed_balance_b = 0
-        if address in self.closed_position_balances:
-            closed_balance_b = self.closed_position_balances[address].get(self.token_b, 0)
+        Returns:
+            One OasisUserInfo per address, in the given order
+
+        Raises:
+            NCFail: If too many addresses are given
+        """
+        return self._users_info(DEFAULT_VAULT_ID, addresses, current_timestamp)
+
+    @view
+    def vault_users_info(
+        self,
+        vault_id: int,
+        addresses: list[Address],
+        current_timestamp: int,
+    ) -> list[OasisUserInfo]:
+        """Get user_info in a vault for many addresses, see users_info.
+
+        Raises:
+            NCFail: If the vault does not exist or too many addresses are given
+        """
+        return self._users_info(vault_id, addresses, current_timestamp)
+
+    def _users_info(
+        self,
+        vault_id: int,
+        addresses: list[Address],
+        current_timestamp: int,
+    ) -> list[OasisUserInfo]:
+        if len(addresses) > MAX_USERS_INFO_BATCH:
+            raise NCFail(f"Too many addresses: at most {MAX_USERS_INFO_BATCH} per call")
+        vault = self._get_vault(vault_id)
+
+        snapshot: PoolSnapshot | None = None
+        result: list[OasisUserInfo] = []
+        for address in addresses:
+            state = self._get_vault_user_state(vault_id, address)
+            # Closed positions are answered from Oasis storage alone
+            if snapshot is None and not state.position_closed:
+                snapshot = self._get_pool_snapshot(vault, Amount(0), current_timestamp)
+            quote = self._calculate_position_closure(vault, state, current_timestamp, snapshot)
+            result.append(self._get_user_info(vault, state, quote))
+        return result
 
-        # Get position entry data
-        position_entry = self.user_position_entry.get(address, EMPTY_USER_POSITION)
+    @view
+    def user_vaults_info(
+        self,
+        address: Address,
+        vault_ids: list[int],
+        current_timestamp: int,
+    ) -> list[OasisUserInfo]:
+        """Get an address' user_info in many vaults.
 
+        The pool manager is called once per vault where the position is not closed.
+
+        Args:
+            address: Address to get info for
+            vault_ids: Vaults to get info in (at most MAX_VAULTS_INFO_BATCH)
+            current_timestamp: Current block timestamp for the TWAP price
+
+        Returns:
+            One OasisUserInfo per vault, in the given order
+
+        Raises:
+            NCFail: If a vault does not exist or too many vaults are given
+        """
+        if len(vault_ids) > MAX_VAULTS_INFO_BATCH:
+            raise NCFail(f"Too many vaults: at most {MAX_VAULTS_INFO_BATCH} per call")
+
+        result: list[OasisUserInfo] = []
+        for vault_id in vault_ids:
+            vault = self._get_vault(vault_id)
+            state = self._get_vault_user_state(vault_id, address)
+            quote = self._calculate_position_closure(vault, state, current_timestamp)
+            result.append(self._get_user_info(vault, state, quote))
+        return result
+
+    def _get_user_info(
+        self, vault: VaultState, state: VaultUserState, remove_liquidity_oasis_quote: OasisRemoveLiquidityQuote
+    ) -> OasisUserInfo:
+        """Build a user's OasisUserInfo around their position closure quote."""
         return OasisUserInfo(
-            user_deposit_b=Amount(self.user_deposit_b.get(address, 0)),
-            user_liquidity=Amount(self.user_liquidity.get(address, 0)),
-            user_withdrawal_time=position_entry.withdrawal_time,
+            user_deposit_b=state.deposit_b,
+            user_liquidity=state.liquidity,
+            user_withdrawal_time=state.withdrawal_time,
             oasis_htr_balance=self.oasis_htr_balance,
-            total_liquidity=self.total_liquidity,
-            user_balance_a=Amount(user_balance_a),
-            user_balance_b=Amount(user_balance_b),
-            closed_balance_a=Amount(closed_balance_a),
-            closed_balance_b=Amount(closed_balance_b),
+            total_liquidity=vault.total_liquidity,
+            user_balance_a=state.balance_htr,
+            user_balance_b=state.balance_b,
+            closed_balance_a=state.closed_balance_htr,
+            closed_balance_b=state.closed_balance_b,
             user_lp_b=Amount(remove_liquidity_oasis_quote.user_lp_b),
             user_lp_htr=Amount(remove_liquidity_oasis_quote.user_lp_htr),
             max_withdraw_b=Amount(remove_liquidity_oasis_quote.max_withdraw_b),
             max_withdraw_htr=Amount(remove_liquidity_oasis_quote.max_withdraw_htr),
-            htr_price_in_deposit=position_entry.htr_price_in_deposit,
-            token_price_in_htr_in_deposit=position_entry.token_price_in_htr_in_deposit,
-            position_closed=self.user_position_closed.get(address, False),
+            htr_price_in_deposit=state.htr_price_in_deposit,
+            token_price_in_htr_in_deposit=state.token_price_in_htr_in_deposit,
+            position_closed=state.position_closed,
         )
 
     @view
     def oasis_info(self) -> OasisInfo:
         return OasisInfo(
-            total_liquidity=self.total_liquidity,
+            total_liquidity=self._get_vault(DEFAULT_VAULT_ID).total_liquidity,
             oasis_htr_balance=self.oasis_htr_balance,
             token_b=self.token_b.hex(),
             protocol_fee=self.protocol_fee,
             dev_deposit_amount=self.dev_deposit_amount,
         )
 
+    @view
+    def get_vault_count(self) -> int:
+        """Get the number of vaults, ids run from 0 to the count - 1."""
+        if DEFAULT_VAULT_ID not in self.vaults:
+            # The default vault of an upgraded contract is stored on its first write
+            return 1
+        return self.vault_count
+
+    @view
+    def get_vault_id(self, token_b: TokenUid, pool_fee: Amount) -> int:
+        """Get the id of the vault for the HTR/token_b pool with pool_fee.
+
+        Raises:
+            NCFail: If there is no such vault
+        """
+        pool_key = self._get_pool_key(token_b, pool_fee)
+        if pool_key in self.vault_ids:
+            return self.vault_ids[pool_key]
+        if pool_key == self._get_vault(DEFAULT_VAULT_ID).pool_key:
+            return DEFAULT_VAULT_ID
+        raise NCFail("Vault not found")
+
+    @view
+    def vaults_info(self, vault_ids: list[int]) -> list[OasisVaultInfo]:
+        """Get the definition and running aggregates of many vaults from Oasis storage alone.
+
+        Vault ids run from 0 to get_vault_count() - 1.
+
+        Args:
+            vault_ids: Vaults to get info for (at most MAX_VAULTS_INFO_BATCH)
+
+        Returns:
+            One OasisVaultInfo per vault, in the given order
+
+        Raises:
+            NCFail: If a vault does not exist or too many vaults are given
+        """
+        if len(vault_ids) > MAX_VAULTS_INFO_BATCH:
+            raise NCFail(f"Too many vaults: at most {MAX_VAULTS_INFO_BATCH} per call")
+
+        result: list[OasisVaultInfo] = []
+        for vault_id in vault_ids:
+            vault = self._get_vault(vault_id)
+            result.append(OasisVaultInfo(
+                vault_id=vault_id,
+                token_b=vault.token_b.hex(),
+                pool_fee=vault.pool_fee,
+                pool_key=vault.pool_key,
+                total_liquidity=vault.total_liquidity,
+                stats=self._get_positions_stats(vault_id, vault),
+            ))
+        return result
+
+    @view
+    def list_positions(self, cursor: int, limit: int) -> OasisPositionsPage:
+        """List depositors' positions in first deposit order.
+
+        Depositors that have withdrawn everything are skipped. Each call examines at
+        most MAX_POSITIONS_PAGE_SCAN depositors, so a page may hold fewer than limit
+        positions while next_cursor is still set; keep paging until it is None.
+
+        Args:
+            cursor: 0 for the first page, otherwise the next_cursor of the previous page
+            limit: Maximum number of positions to return (1-50, enforced by hard limit)
+
+        Returns:
+            An OasisPositionsPage with the positions of this page and the next cursor
+
+        Raises:
+            NCFail: If the cursor or limit is invalid
+        """
+        return self._list_positions(DEFAULT_VAULT_ID, cursor, limit)
+
+    @view
+    def vault_list_positions(self, vault_id: int, cursor: int, limit: int) -> OasisPositionsPage:
+        """List depositors' positions in a vault, see list_positions.
+
+        Raises:
+            NCFail: If the vault does not exist or the cursor or limit is invalid
+        """
+        return self._list_positions(vault_id, cursor, limit)
+
+    def _list_positions(self, vault_id: int, cursor: int, limit: int) -> OasisPositionsPage:
+        self._get_vault(vault_id)
+        # An upgraded contract registers nobody before its first write
+        depositors = self.vault_depositors[vault_id] if vault_id in self.vaults else []
+        if cursor < 0 or cursor > len(depositors):
+            raise NCFail("Invalid cursor")
+        if limit <= 0:
+            raise NCFail("Invalid limit")
+        if limit > MAX_POSITIONS_PAGE_SIZE:
+            limit = MAX_POSITIONS_PAGE_SIZE
+
+        positions: list[OasisPosition] = []
+        end = min(len(depositors), cursor + MAX_POSITIONS_PAGE_SCAN)
+        position = cursor
+        while position < end and len(positions) < limit:
+            address = Address(depositors[position])
+            position += 1
+            state = self._get_vault_user_state(vault_id, address)
+            if state.deposit_b == 0:
+                continue
+
+            positions.append(OasisPosition(
+                address=address,
+                user_deposit_b=state.deposit_b,
+                user_liquidity=state.liquidity,
+                withdrawal_time=state.withdrawal_time,
+                position_closed=state.position_closed,
+                closed_balance_a=state.closed_balance_htr,
+                closed_balance_b=state.closed_balance_b,
+            ))
+
+        next_cursor = position if position < len(depositors) else None
+        return OasisPositionsPage(positions=positions, next_cursor=next_cursor)
+
+    @view
+    def positions_stats(self) -> OasisPositionsStats:
+        """Get the running aggregates over every position, maintained on each deposit, close and withdrawal.
+
+        Positions opened before vaults count once migrated, see migrate_to_vaults.
+        """
+        return self._get_positions_stats(DEFAULT_VAULT_ID, self._get_vault(DEFAULT_VAULT_ID))
+
+    def _get_positions_stats(self, vault_id: int, vault: VaultState) -> OasisPositionsStats:
+        locked_b_by_timelock: dict[int, Amount] = {}
+        for timelock, locked in zip(VALID_TIMELOCKS, vault.locked_b_by_timelock):
+            locked_b_by_timelock[timelock] = locked
+
+        return OasisPositionsStats(
+            depositors=len(self.vault_depositors[vault_id]) if vault_id in self.vaults else 0,
+            open_positions=vault.open_positions,
+            total_locked_b=vault.total_locked_b,
+            total_bonus_paid=vault.total_bonus_paid,
+            total_closed_b=vault.total_closed_b,
+            total_closed_htr=vault.total_closed_htr,
+            locked_b_by_timelock=locked_b_by_timelock,
+            legacy_locked_b=vault.legacy_locked_b,
+            unmigrated_liquidity=self.total_liquidity if vault_id == DEFAULT_VAULT_ID else Amount(0),
+        )
+
+    @view
+    def unlock_schedule(self, from_ts: int, to_ts: int) -> list[UnlockScheduleEntry]:
+        """Get the token_b and HTR of open positions by the month they unlock in.
+
+        Months are MONTHS_IN_SECONDS periods counted from the epoch, so the first and
+        last entries may include positions unlocking just outside [from_ts, to_ts].
+        Positions that are unlocked but not closed yet stay in their unlock month.
+
+        Args:
+            from_ts: Timestamp in the first month to report
+            to_ts: Timestamp in the last month to report
+
+        Returns:
+            One entry per month with unlocking positions, in month order
+
+        Raises:
+            NCFail: If the range is invalid or spans more than MAX_UNLOCK_SCHEDULE_MONTHS
+        """
+        return self._unlock_schedule(DEFAULT_VAULT_ID, from_ts, to_ts)
+
+    @view
+    def vault_unlock_schedule(self, vault_id: int, from_ts: int, to_ts: int) -> list[UnlockScheduleEntry]:
+        """Get the unlock schedule of a vault's open positions, see unlock_schedule.
+
+        Raises:
+            NCFail: If the vault does not exist, the range is invalid or too long
+        """
+        return self._unlock_schedule(vault_id, from_ts, to_ts)
+
+    def _unlock_schedule(self, vault_id: int, from_ts: int, to_ts: int) -> list[UnlockScheduleEntry]:
+        self._get_vault(vault_id)
+        if from_ts < 0 or to_ts < from_ts:
+            raise NCFail("Invalid unlock schedule range")
+        first_month = from_ts // MONTHS_IN_SECONDS
+        last_month = to_ts // MONTHS_IN_SECONDS
+        if last_month - first_month >= MAX_UNLOCK_SCHEDULE_MONTHS:
+            raise NCFail(f"Unlock schedule range too long: at most {MAX_UNLOCK_SCHEDULE_MONTHS} months")
+
+        schedule: list[UnlockScheduleEntry] = []
+        if vault_id not in self.vaults:
+            # Nothing is bucketed before the first write after an upgrade
+            return schedule
+        buckets = self.vault_unlock_buckets[vault_id]
+        for month in range(first_month, last_month + 1):
+            if month not in buckets:
+                continue
+            bucket = buckets[month]
+            schedule.append(UnlockScheduleEntry(
+                month_start=month * MONTHS_IN_SECONDS,
+                amount_b=bucket.amount_b,
+                amount_htr=bucket.amount_htr,
+                positions=bucket.positions,
+            ))
+        return schedule
+
     @view
     def front_quote_add_liquidity_in(
         self, amount: int, timelock: int, now: Timestamp, address: Address
     ) -> OasisQuoteInfo:
         """Calculates the bonus for a user based on the timelock and amount"""
+        return self._front_quote_add_liquidity_in(DEFAULT_VAULT_ID, amount, timelock, now, address)
+
+    @view
+    def vault_front_quote_add_liquidity_in(
+        self, vault_id: int, amount: int, timelock: int, now: Timestamp, address: Address
+    ) -> OasisQuoteInfo:
+        """Calculates the bonus for a user depositing into a vault based on the timelock and amount"""
+        return self._front_quote_add_liquidity_in(vault_id, amount, timelock, now, address)
+
+    def _front_quote_add_liquidity_in(
+        self, vault_id: int, amount: int, timelock: int, now: Timestamp, address: Address
+    ) -> OasisQuoteInfo:
+        vault = self._get_vault(vault_id)
+        state = self._get_vault_user_state(vault_id, address)
         fee_amount = self._ceil_div(Amount(amount * self.protocol_fee), Amount(1000))
         deposit_amount = Amount(amount - fee_amount)
 
-        htr_amount = self._quote_add_liquidity_in(deposit_amount)
+        htr_amount = self._get_pool_snapshot(vault, deposit_amount, now).htr_quote
         bonus = self._get_user_bonus(timelock, htr_amount)
 
         # Calculate withdrawal time using helper
         withdrawal_time = self._calculate_new_withdrawal_time(
-            address, now, timelock, deposit_amount
+            state, now, timelock, deposit_amount
         )
 
         return OasisQuoteInfo(
             bonus=bonus,
             htr_amount=htr_amount,
             withdrawal_time=withdrawal_time,
-            has_position=address in self.user_position_entry,
+            has_position=state.withdrawal_time > 0,
             fee_amount=Amount(fee_amount),
             deposit_amount=deposit_amount,
             protocol_fee=self.protocol_fee,
@@ -1002,61 +1890,59 @@ class Oasis(Blueprint):
     def get_remove_liquidity_oasis_quote(
         self, address: Address, current_timestamp: int
     ) -> OasisRemoveLiquidityQuote:
-        return self._calculate_position_closure(address, current_timestamp)
+        return self._calculate_position_closure(
+            self._get_vault(DEFAULT_VAULT_ID),
+            self._get_vault_user_state(DEFAULT_VAULT_ID, address),
+            current_timestamp,
+        )
 
     def _calculate_position_closure(
-        self, address: Address, current_timestamp: int
+        self,
+        vault: VaultState,
+        state: VaultUserState,
+        current_timestamp: int,
+        snapshot: PoolSnapshot | None = None,
     ) -> OasisRemoveLiquidityQuote:
-        """Internal helper to calculate position closure values."""
-        # If position is already closed, return the available balances from closed_position_balances
-        if self.user_position_closed.get(address, False):
-            if address in self.closed_position_balances:
-                closed_balance_b = self.closed_position_balances[address].get(self.token_b, 0)
-                closed_balance_htr = self.closed_position_balances[address].get(HATHOR_TOKEN_UID, 0)
-            else:
-                closed_balance_b = 0
-                closed_balance_htr = 0
+        """Internal helper to calculate position closure values.
 
+        The pool snapshot is fetched when not given, so batch callers can share one.
+        """
+        # If position is already closed, return the available balances
+        if state.position_closed:
             return OasisRemoveLiquidityQuote(
                 user_lp_b=Amount(0),
                 user_lp_htr=Amount(0),
-                max_withdraw_b=Amount(closed_balance_b),
-                max_withdraw_htr=Amount(closed_balance_htr),
+                max_withdraw_b=state.closed_balance_b,
+                max_withdraw_htr=state.closed_balance_htr,
                 loss_htr=Amount(0),
                 position_closed=True,
             )
 
         # Otherwise calculate withdrawal amounts based on current pool state
-        oasis_quote = self._quote_remove_liquidity_oasis()
-        htr_oasis_amount = oasis_quote.max_withdraw_a
-        user_liquidity = self.user_liquidity.get(address, 0)
+        if snapshot is None:
+            snapshot = self._get_pool_snapshot(vault, Amount(0), current_timestamp)
+        htr_oasis_amount = snapshot.oasis_lp_htr
+        user_liquidity = state.liquidity
 
-        if self.total_liquidity > 0:
-            user_lp_htr = (user_liquidity) * htr_oasis_amount // (self.total_liquidity)
+        if vault.total_liquidity > 0:
+            user_lp_htr = (user_liquidity) * htr_oasis_amount // (vault.total_liquidity)
         else:
             user_lp_htr = 0
 
-        user_lp_b = self._quote_token_b_from_htr(user_lp_htr)
+        user_lp_b = self._quote_token_b_from_htr(user_lp_htr, snapshot)
 
         # Calculate total available amounts including existing balances
-        if address in self.user_balances:
-            user_balance_b = self.user_balances[address].get(self.token_b, 0)
-        else:
-            user_balance_b = 0
-
-        if address in self.user_balances:
-            user_balance_htr = self.user_balances[address].get(HATHOR_TOKEN_UID, 0)
-        else:
-            user_balance_htr = 0
+        user_balance_b = state.balance_b
+        user_balance_htr = state.balance_htr
 
         max_withdraw_b = user_lp_b + user_balance_b
 
         # Calculate impermanent loss compensation if needed
         loss_htr = 0
-        if self.user_deposit_b.get(address, 0) > max_withdraw_b:
-            loss = self.user_deposit_b.get(address, 0) - max_withdraw_b
+        if state.deposit_b > max_withdraw_b:
+            loss = state.deposit_b - max_withdraw_b
             loss_htr = self._calculate_impermanent_loss_compensation(
-                loss, user_lp_htr, current_timestamp
+                loss, user_lp_htr, snapshot.token_b_price_in_htr
             )
             max_withdraw_htr = user_balance_htr + loss_htr
         else:
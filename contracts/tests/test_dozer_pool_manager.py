@@ -1255,6 +1255,49 @@ class DozerPoolManagerBlueprintTestCase(BlueprintTestCase):
         self.assertIn(pool_key2, all_pools)
         self.assertIn(pool_key3, all_pools)
 
+    def test_get_pools_page(self):
+        """Test paging through pools with their details"""
+        pool_key1, _ = self._create_pool(self.token_a, self.token_b, fee=3)
+        pool_key2, _ = self._create_pool(self.token_a, self.token_c, fee=5)
+        pool_key3, _ = self._create_pool(self.token_b, self.token_c, fee=10)
+        all_pools = self.runner.call_view_method(self.nc_id, "get_all_pools")
+
+        # Walking every page yields all pools in order, with the same records as the single-pool views
+        pool_keys = []
+        cursor = 0
+        while cursor is not None:
+            page = self.runner.call_view_method(self.nc_id, "get_pools_page", cursor, 2, False)
+            self.assertLessEqual(len(page.pool_keys), 2)
+            for pool_key, info, api_info in zip(page.pool_keys, page.pools, page.api_pools):
+                self.assertEqual(info, self.runner.call_view_method(self.nc_id, "pool_info", pool_key))
+                self.assertEqual(
+                    api_info, self.runner.call_view_method(self.nc_id, "front_end_api_pool", pool_key)
+                )
+            pool_keys.extend(page.pool_keys)
+            cursor = page.next_cursor
+        self.assertEqual(pool_keys, all_pools)
+
+        # Only signed pools are listed with signed_only
+        tx = self._get_any_tx()
+        owner_context = self.create_context(
+            [], tx, Address(self.owner_address), timestamp=self.get_current_timestamp()
+        )
+        self.runner.call_public_method(
+            self.nc_id, "sign_pool", owner_context, self.token_a, self.token_c, 5
+        )
+        page = self.runner.call_view_method(self.nc_id, "get_pools_page", 0, 50, True)
+        self.assertEqual(page.pool_keys, [pool_key2])
+        self.assertTrue(page.pools[0].is_signed)
+        self.assertEqual(page.api_pools[0].is_signed, 1)
+        self.assertIsNone(page.next_cursor)
+        self.assertNotIn(pool_key1, page.pool_keys)
+        self.assertNotIn(pool_key3, page.pool_keys)
+
+        with self.assertRaises(InvalidAction):
+            self.runner.call_view_method(self.nc_id, "get_pools_page", len(all_pools) + 1, 2, False)
+        with self.assertRaises(InvalidAction):
+            self.runner.call_view_method(self.nc_id, "get_pools_page", 0, 0, False)
+
     def test_get_pools_for_token(self):
         """Test getting pools for a specific token"""
         # Create pools
@@ -1320,7 +1363,7 @@ class DozerPoolManagerBlueprintTestCase(BlueprintTestCase):
         assert isinstance(contract, DozerPoolManager)
 
         # Verify user has liquidity
-        user_liquidity = contract.pool_user_liquidity[pool_key].get(creator_address, 0)
+        user_liquidity = contract.pool_user_states[contract.pool_ids[pool_key]][creator_address].liquidity
         self.assertGreater(user_liquidity, 0)
 
         # Verify pool state
@@ -1493,7 +1536,8 @@ class DozerPoolManagerBlueprintTestCase(BlueprintTestCase):
 
         change_a = 0
         change_b = 0
-        change_a, change_b = contract.pool_change[pool_key].get(context.caller_id, (0, 0))
+        state = contract.pool_user_states[contract.pool_ids[pool_key]][context.caller_id]
+        change_a, change_b = state.balance_a, state.balance_b
 
         # Should have some change in token_b due to ratio mismatch
         self.assertGreater(change_b, 0, "Expected some change_b from liquidity addition")
@@ -1517,7 +1561,8 @@ class DozerPoolManagerBlueprintTestCase(BlueprintTestCase):
         updated_contract = self.get_readonly_contract(self.nc_id)
         assert isinstance(updated_contract, DozerPoolManager)
 
-        new_change_a, new_change_b = updated_contract.pool_change[pool_key].get(context.caller_id, (0, 0))
+        state = updated_contract.pool_user_states[updated_contract.pool_ids[pool_key]][context.caller_id]
+        new_change_a, new_change_b = state.balance_a, state.balance_b
 
         self.assertEqual(new_change_a, 0)
         self.assertEqual(new_change_b, 0)
@@ -1,19 +1,47 @@
+import random
+from unittest.mock import patch
+
 import pytest
 
-from hathor import Address, Amount, NCDepositAction, NCFail, NCWithdrawalAction, TokenUid
+from hathor import Address, Amount, CallerId, Context, NCDepositAction, NCFail, NCWithdrawalAction, TokenUid, public
+from hathor_tests.nanocontracts.blueprints.dozer_pool_manager_v1 import DozerPoolManager as DozerPoolManagerV1
 from hathor_tests.nanocontracts.blueprints.unittest import BlueprintTestCase
+from hathor.nanocontracts.blueprints import dozer_pool_manager
 from hathor.nanocontracts.blueprints.dozer_pool_manager import (
     DozerPoolManager,
     InvalidAction,
     InvalidFee,
     InvalidState,
     PoolExists,
+    PoolNotFound,
     PoolState,
     SwapResult,
     Unauthorized,
 )
 
 
+class LegacyLayoutDozerPoolManager(DozerPoolManager):
+    """DozerPoolManager that can move a pool back to the layout from before pool ids and pool_user_states."""
+
+    @public
+    def move_to_legacy_layout(self, ctx: Context, pool_key: str, addresses: list[CallerId]) -> None:
+        pool_id = self.pool_ids[pool_key]
+        self.pool_user_liquidity[pool_key] = {}
+        self.pool_change[pool_key] = {}
+        self.pool_user_deposit_price_usd[pool_key] = {}
+        self.pool_user_last_action_timestamp[pool_key] = {}
+        for address in addresses:
+            state = self.pool_user_states[pool_id][address]
+            self.pool_user_liquidity[pool_key][address] = state.liquidity
+            self.pool_change[pool_key][address] = (state.balance_a, state.balance_b)
+            self.pool_user_deposit_price_usd[pool_key][address] = state.deposit_value_usd
+            self.pool_user_last_action_timestamp[pool_key][address] = state.last_action_timestamp
+            self._remove_user_pool(address, pool_key)
+        del self.pool_user_states[pool_id]
+        del self.pool_ids[pool_key]
+        self.legacy_pool_count = len(self.all_pools)
+
+
 class TestDozerPoolManager(BlueprintTestCase):
     def setUp(self) -> None:
         super().setUp()
@@ -250,10 +278,10 @@ class TestDozerPoolManager(BlueprintTestCase):
         pool2 = self.get_pool_state(pool_key2)
 
         assert pool1.total_liquidity == 141400000000000001414000
-        assert contract.pool_user_liquidity[pool_key1][creator1] == 141400000000000000000000
+        assert contract.pool_user_states[contract.pool_ids[pool_key1]][creator1].liquidity == 141400000000000000000000
 
         assert pool2.total_liquidity == 28200000000000000282000
-        assert contract.pool_user_liquidity[pool_key2][creator2] == 28200000000000000000000
+        assert contract.pool_user_states[contract.pool_ids[pool_key2]][creator2].liquidity == 28200000000000000000000
 
         token_uid, amount, adder = self.add_liquidity(
             token_a=self.token_a, token_b=self.token_b, fee=fee2, amount_a=reserve_a1 - reserve_a2,
@@ -265,8 +293,9 @@ class TestDozerPoolManager(BlueprintTestCase):
         # Added liquidity to pool2 so it should be equivalent to pool1
         pool2 = self.get_pool_state(pool_key2)
         assert pool2.total_liquidity == 141000000000000001414000 - 4000  # TODO: Why -4000?
-        assert contract.pool_change[pool_key2][adder] == (0, 150)
-        assert contract.pool_user_liquidity[pool_key2][adder] == (
+        adder_state = contract.pool_user_states[contract.pool_ids[pool_key2]][adder]
+        assert (adder_state.balance_a, adder_state.balance_b) == (0, 150)
+        assert adder_state.liquidity == (
             141400000000000000000000 - 28200000000000000000000 - 399999999999998872000
         )  # TODO: Why -399999999999998872000?
 
@@ -280,8 +309,9 @@ class TestDozerPoolManager(BlueprintTestCase):
         # Removed liquidity from pool2 so it should be equivalent to the starting state
         pool2 = self.get_pool_state(pool_key2)
         assert pool2.total_liquidity == 28200000000000000282000
-        assert contract.pool_change[pool_key2][adder] == (0, 172)
-        assert contract.pool_user_liquidity[pool_key2][adder] == 0
+        adder_state = contract.pool_user_states[contract.pool_ids[pool_key2]][adder]
+        assert (adder_state.balance_a, adder_state.balance_b) == (0, 172)
+        assert adder_state.liquidity == 0
 
     def test_remove_liquidity_insufficient(self) -> None:
         pool_key, creator = self.create_pool(
@@ -459,3 +489,502 @@ class TestDozerPoolManager(BlueprintTestCase):
         assert state.reserve_b == 2000000 - 2000
         assert state.total_change_a == 497
         assert state.total_change_b == 0
+
+    def test_user_pools_index(self) -> None:
+        pool_key1, creator = self.create_pool(
+            token_a=self.token_a, token_b=self.token_b, fee=0, reserve_a=1000000, reserve_b=2000000
+        )
+        pool_key2, _ = self.create_pool(
+            token_a=self.token_a, token_b=self.token_b, fee=5, reserve_a=1000000, reserve_b=2000000
+        )
+        assert self.runner.call_view_method(self.contract_id, 'get_user_pools', creator) == [pool_key1]
+
+        _, _, adder = self.add_liquidity(
+            token_a=self.token_a, token_b=self.token_b, fee=5, amount_a=10000, amount_b=20000
+        )
+        assert self.runner.call_view_method(self.contract_id, 'get_user_pools', adder) == [pool_key2]
+        positions = self.runner.call_view_method(self.contract_id, 'get_user_positions', adder)
+        assert list(positions) == [pool_key2]
+        contract = self.get_contract()
+        assert positions[pool_key2].liquidity == contract.pool_user_states[contract.pool_ids[pool_key2]][adder].liquidity
+
+        # Removing the whole position drops the pool from the index
+        quote = self.runner.call_view_method(
+            self.contract_id, 'quote_remove_liquidity_single_token_percentage', user_address=adder,
+            pool_key=pool_key2, token_out=self.token_b, percentage=10000
+        )
+        ctx = self.create_context(
+            actions=[NCWithdrawalAction(token_uid=self.token_b, amount=quote.amount_out)], caller_id=adder, timestamp=10
+        )
+        self.runner.call_public_method(
+            self.contract_id, 'remove_liquidity_single_token', ctx, pool_key=pool_key2, percentage=10000,
+        )
+        contract = self.get_contract()
+        assert contract.pool_user_states[contract.pool_ids[pool_key2]][adder].liquidity == 0
+        assert self.runner.call_view_method(self.contract_id, 'get_user_pools', adder) == []
+        assert self.runner.call_view_method(self.contract_id, 'get_user_positions', adder) == {}
+
+        with pytest.raises(Unauthorized):
+            self.runner.call_public_method(
+                self.contract_id, 'migrate_user_states', self.create_context(), pool_key1, [creator, adder]
+            )
+
+        # Migrating addresses without legacy state leaves the index unchanged
+        owner_ctx = self.create_context(caller_id=self.owner)
+        self.runner.call_public_method(
+            self.contract_id, 'migrate_user_states', owner_ctx, pool_key1, [creator, adder]
+        )
+        assert self.runner.call_view_method(self.contract_id, 'get_user_pools', creator) == [pool_key1]
+        assert self.runner.call_view_method(self.contract_id, 'get_user_pools', adder) == []
+
+    def test_user_pools_index_remove_first_pool(self) -> None:
+        user = self.gen_random_address()
+        pool_keys = []
+        for fee in [0, 5, 10]:
+            pool_key, _ = self.create_pool(
+                token_a=self.token_a, token_b=self.token_b, fee=fee, reserve_a=1000000, reserve_b=2000000
+            )
+            pool_keys.append(pool_key)
+
+        def add(fee: int) -> None:
+            ctx = self.create_context(actions=[
+                NCDepositAction(token_uid=self.token_a, amount=10000),
+                NCDepositAction(token_uid=self.token_b, amount=20000),
+            ], caller_id=user, timestamp=10)
+            self.runner.call_public_method(self.contract_id, 'add_liquidity', ctx, fee)
+
+        for fee in [0, 5, 10]:
+            add(fee)
+        assert self.runner.call_view_method(self.contract_id, 'get_user_pools', user) == pool_keys
+
+        # The last pool id fills the slot of the removed one
+        quote = self.runner.call_view_method(
+            self.contract_id, 'quote_remove_liquidity_single_token_percentage', user_address=user,
+            pool_key=pool_keys[0], token_out=self.token_b, percentage=10000
+        )
+        ctx = self.create_context(
+            actions=[NCWithdrawalAction(token_uid=self.token_b, amount=quote.amount_out)], caller_id=user, timestamp=10
+        )
+        self.runner.call_public_method(
+            self.contract_id, 'remove_liquidity_single_token', ctx, pool_key=pool_keys[0], percentage=10000,
+        )
+        contract = self.get_contract()
+        pool_ids = [contract.pool_ids[pool_key] for pool_key in pool_keys]
+        assert list(contract.user_pools[user]) == [pool_ids[2], pool_ids[1]]
+        assert contract.user_pool_positions[user][pool_ids[2]] == 0
+        assert contract.user_pool_positions[user][pool_ids[1]] == 1
+        assert pool_ids[0] not in contract.user_pool_positions[user]
+        assert self.runner.call_view_method(self.contract_id, 'get_user_pools', user) == pool_keys[1:]
+
+        add(0)
+        assert self.runner.call_view_method(self.contract_id, 'get_user_pools', user) == pool_keys
+
+    def test_legacy_user_states_migrate_on_first_write(self) -> None:
+        blueprint_id = self._register_blueprint_class(LegacyLayoutDozerPoolManager)
+        self.contract_id = self.gen_random_contract_id()
+        self.runner.create_contract(self.contract_id, blueprint_id, self.create_context(caller_id=self.owner))
+
+        pool_key, creator = self.create_pool(
+            token_a=self.token_a, token_b=self.token_b, fee=3, reserve_a=1000000, reserve_b=2000000
+        )
+        adder = self.gen_random_address()
+        ctx = self.create_context(actions=[
+            NCDepositAction(token_uid=self.token_a, amount=10000),
+            NCDepositAction(token_uid=self.token_b, amount=20000),
+        ], caller_id=adder, timestamp=10)
+        self.runner.call_public_method(self.contract_id, 'add_liquidity', ctx, 3)
+        creator_liquidity = self.runner.call_view_method(self.contract_id, 'liquidity_of', creator, pool_key)
+        adder_liquidity = self.runner.call_view_method(self.contract_id, 'liquidity_of', adder, pool_key)
+        pool_id = self.runner.call_view_method(self.contract_id, 'get_pool_id', pool_key)
+
+        owner_ctx = self.create_context(caller_id=self.owner)
+        self.runner.call_public_method(
+            self.contract_id, 'move_to_legacy_layout', owner_ctx, pool_key, [creator, adder]
+        )
+        assert pool_id not in self.get_contract().pool_user_states
+        assert pool_key not in self.get_contract().pool_ids
+
+        # Until backfill_pool_ids runs, the pool id is its position in all_pools
+        assert self.runner.call_view_method(self.contract_id, 'get_pool_id', pool_key) == pool_id
+
+        # Legacy entries are read in place
+        assert self.runner.call_view_method(self.contract_id, 'liquidity_of', creator, pool_key) == creator_liquidity
+        assert self.runner.call_view_method(self.contract_id, 'liquidity_of', adder, pool_key) == adder_liquidity
+        assert self.runner.call_view_method(self.contract_id, 'get_user_pools', adder) == [pool_key]
+        positions = self.runner.call_view_method(self.contract_id, 'get_user_positions', creator)
+        assert list(positions) == [pool_key]
+        assert positions[pool_key].liquidity == creator_liquidity
+        assert self.get_contract().user_pools.get(adder) is None
+
+        # The first write moves the entry
+        ctx = self.create_context(actions=[
+            NCDepositAction(token_uid=self.token_a, amount=10000),
+            NCDepositAction(token_uid=self.token_b, amount=20000),
+        ], caller_id=adder, timestamp=20)
+        self.runner.call_public_method(self.contract_id, 'add_liquidity', ctx, 3)
+        contract = self.get_contract()
+        assert contract.pool_user_states[pool_id][adder].liquidity > adder_liquidity
+        assert adder not in contract.pool_user_liquidity[pool_key]
+        assert adder not in contract.pool_user_last_action_timestamp[pool_key]
+        assert self.runner.call_view_method(self.contract_id, 'get_user_pools', adder) == [pool_key]
+
+        # The owner can move the remaining entries ahead of time
+        with pytest.raises(InvalidAction):
+            self.runner.call_public_method(
+                self.contract_id, 'migrate_user_states', owner_ctx, pool_key,
+                [self.gen_random_address() for _ in range(101)]
+            )
+        self.runner.call_public_method(self.contract_id, 'migrate_user_states', owner_ctx, pool_key, [creator])
+        contract = self.get_contract()
+        assert contract.pool_user_states[pool_id][creator].liquidity == creator_liquidity
+        assert creator not in contract.pool_user_liquidity[pool_key]
+        assert self.runner.call_view_method(self.contract_id, 'get_user_pools', creator) == [pool_key]
+
+        self.runner.call_public_method(self.contract_id, 'backfill_pool_ids', owner_ctx, 0)
+        assert self.get_contract().pool_ids[pool_key] == pool_id
+
+    def test_pool_ids(self) -> None:
+        pool_key1, _ = self.create_pool(
+            token_a=self.token_a, token_b=self.token_b, fee=0, reserve_a=1000000, reserve_b=2000000
+        )
+        pool_key2, _ = self.create_pool(
+            token_a=self.token_a, token_b=self.token_b, fee=5, reserve_a=1000000, reserve_b=2000000
+        )
+        all_pools = self.runner.call_view_method(self.contract_id, 'get_all_pools')
+        for pool_key in (pool_key1, pool_key2):
+            pool_id = self.runner.call_view_method(self.contract_id, 'get_pool_id', pool_key)
+            assert all_pools[pool_id] == pool_key
+            assert self.runner.call_view_method(self.contract_id, 'get_pool_key_by_id', pool_id) == pool_key
+
+        with pytest.raises(PoolNotFound):
+            self.runner.call_view_method(self.contract_id, 'get_pool_id', 'missing')
+        with pytest.raises(PoolNotFound):
+            self.runner.call_view_method(self.contract_id, 'get_pool_key_by_id', len(all_pools))
+
+        with pytest.raises(Unauthorized):
+            self.runner.call_public_method(self.contract_id, 'backfill_pool_ids', self.create_context(), 0)
+
+        owner_ctx = self.create_context(caller_id=self.owner)
+        with pytest.raises(InvalidAction):
+            self.runner.call_public_method(self.contract_id, 'backfill_pool_ids', owner_ctx, len(all_pools) + 1)
+
+        # Backfilling reassigns the same ids, one pool per call here
+        with patch.object(dozer_pool_manager, 'MAX_POOLS_TO_ITERATE', 1):
+            cursor = self.runner.call_public_method(self.contract_id, 'backfill_pool_ids', owner_ctx, 0)
+            assert cursor == 1
+            cursor = self.runner.call_public_method(self.contract_id, 'backfill_pool_ids', owner_ctx, cursor)
+            assert cursor is None
+        for pool_id, pool_key in enumerate(all_pools):
+            assert self.get_contract().pool_ids[pool_key] == pool_id
+
+    def test_upgrade_from_v1(self) -> None:
+        v1_blueprint_id = self._register_blueprint_class(DozerPoolManagerV1)
+        self.contract_id = self.gen_random_contract_id()
+        self.runner.create_contract(self.contract_id, v1_blueprint_id, self.create_context(caller_id=self.owner))
+        owner_ctx = self.create_context(caller_id=self.owner, timestamp=5)
+
+        pool_key, creator = self.create_pool(
+            token_a=self.token_a, token_b=self.token_b, fee=3, reserve_a=1000000000, reserve_b=2000000000
+        )
+        _, _, adder = self.add_liquidity(
+            token_a=self.token_a, token_b=self.token_b, fee=3, amount_a=10000000, amount_b=20000000
+        )
+        self.runner.call_public_method(self.contract_id, 'sign_pool', owner_ctx, self.token_a, self.token_b, 3)
+        liquidities = {
+            address: self.runner.call_view_method(self.contract_id, 'liquidity_of', address, pool_key)
+            for address in (creator, adder)
+        }
+
+        self.runner.call_public_method(self.contract_id, 'upgrade_contract', owner_ctx, self.blueprint_id, "1.1.0")
+
+        # The scalar fields added since 1.0.0 are set once, by the owner
+        with pytest.raises(Unauthorized):
+            self.runner.call_public_method(self.contract_id, 'post_upgrade_init', self.create_context())
+        self.runner.call_public_method(self.contract_id, 'post_upgrade_init', owner_ctx)
+        with pytest.raises(InvalidState):
+            self.runner.call_public_method(self.contract_id, 'post_upgrade_init', owner_ctx)
+        assert self.get_contract().lazy_profit_tracking is False
+        assert self.runner.call_public_method(self.contract_id, 'rebuild_signed_pool_index', owner_ctx, 0) is None
+
+        # Pre-upgrade positions are read from the legacy containers
+        for address, liquidity in liquidities.items():
+            assert self.runner.call_view_method(self.contract_id, 'liquidity_of', address, pool_key) == liquidity
+        assert self.runner.call_view_method(self.contract_id, 'get_pool_id', pool_key) == 0
+        for address in liquidities:
+            assert self.runner.call_view_method(self.contract_id, 'get_user_pools', address) == [pool_key]
+
+        # Backfilling indexes the legacy positions without moving them
+        with pytest.raises(Unauthorized):
+            self.runner.call_public_method(
+                self.contract_id, 'backfill_user_pools', self.create_context(), [creator], 0
+            )
+        with pytest.raises(InvalidAction):
+            self.runner.call_public_method(self.contract_id, 'backfill_user_pools', owner_ctx, [creator], 2)
+        assert self.runner.call_public_method(
+            self.contract_id, 'backfill_user_pools', owner_ctx, [creator], 0
+        ) is None
+        contract = self.get_contract()
+        assert list(contract.user_pools[creator]) == [0]
+        assert creator in contract.user_pools_backfilled
+        assert creator in contract.pool_user_liquidity[pool_key]
+        assert self.runner.call_view_method(self.contract_id, 'get_user_pools', creator) == [pool_key]
+
+        # Every user-facing path works on the upgraded storage
+        ctx = self.create_context(caller_id=adder, timestamp=20, actions=[
+            NCDepositAction(token_uid=self.token_a, amount=10000000),
+            NCDepositAction(token_uid=self.token_b, amount=20000000),
+        ])
+        self.runner.call_public_method(self.contract_id, 'add_liquidity', ctx, 3)
+        assert self.runner.call_view_method(self.contract_id, 'liquidity_of', adder, pool_key) > liquidities[adder]
+        assert self.runner.call_view_method(self.contract_id, 'get_user_pools', adder) == [pool_key]
+
+        quote = self.runner.call_view_method(
+            self.contract_id, 'find_best_swap_path', 1000000, self.token_a, self.token_b, 3
+        )
+        assert quote.path == pool_key
+        ctx = self.create_context(timestamp=1000, actions=[
+            NCDepositAction(token_uid=self.token_a, amount=1000000),
+            NCWithdrawalAction(token_uid=self.token_b, amount=quote.amount_out),
+        ])
+        self.runner.call_public_method(self.contract_id, 'swap_exact_tokens_for_tokens', ctx, fee=3, deadline=1000)
+        stats = self.runner.call_view_method(self.contract_id, 'get_pool_stats', pool_key, 3600, 1000)
+        assert stats.transactions == 1
+        assert len(self.runner.call_view_method(self.contract_id, 'consult', pool_key, [100], 1000)) == 1
+
+        ctx = self.create_context(caller_id=creator, timestamp=1100, actions=[
+            NCWithdrawalAction(token_uid=self.token_a, amount=1000),
+            NCWithdrawalAction(token_uid=self.token_b, amount=1000),
+        ])
+        self.runner.call_public_method(self.contract_id, 'remove_liquidity', ctx, 3)
+        assert self.runner.call_view_method(self.contract_id, 'liquidity_of', creator, pool_key) < liquidities[creator]
+
+    def test_post_upgrade_init_on_new_contract(self) -> None:
+        with pytest.raises(InvalidState):
+            self.runner.call_public_method(
+                self.contract_id, 'post_upgrade_init', self.create_context(caller_id=self.owner)
+            )
+
+    def test_consult_twap_observations(self) -> None:
+        pool_key, _ = self.create_pool(
+            token_a=self.token_a, token_b=self.token_b, fee=3, reserve_a=1000000000, reserve_b=2000000000
+        )
+
+        def spot_prices() -> tuple[int, int]:
+            pool = self.get_pool_state(pool_key)
+            return (
+                pool.reserve_b * 10**8 // pool.reserve_a,
+                pool.reserve_a * 10**8 // pool.reserve_b,
+            )
+
+        def swap(timestamp: int, token_in: TokenUid, token_out: TokenUid, amount_in: int) -> None:
+            ctx = self.create_context(timestamp=timestamp, actions=[
+                NCDepositAction(token_uid=token_in, amount=amount_in),
+                NCWithdrawalAction(token_uid=token_out, amount=1),
+            ])
+            self.runner.call_public_method(
+                self.contract_id, 'swap_exact_tokens_for_tokens', ctx, fee=3, deadline=timestamp
+            )
+
+        # Swaps 700 seconds apart keep one observation each, so every window is exact
+        segments = [(1, spot_prices())]
+        timestamp = 1
+        for i in range(20):
+            timestamp += 700
+            if i % 2 == 0:
+                swap(timestamp, self.token_a, self.token_b, 10000000 * (i + 1))
+            else:
+                swap(timestamp, self.token_b, self.token_a, 15000000 * (i + 1))
+            segments.append((timestamp, spot_prices()))
+
+        def cumulative(at: int) -> tuple[int, int]:
+            cumulative_a = cumulative_b = 0
+            for (start, (price_a, price_b)), end in zip(segments, [t for t, _ in segments[1:]] + [at]):
+                elapsed = max(0, min(end, at) - start)
+                cumulative_a += price_a * elapsed
+                cumulative_b += price_b * elapsed
+            return cumulative_a, cumulative_b
+
+        now = timestamp + 300
+        seconds_ago_list = [0, 1, 300, 1000, 1800, 5000, 13999, now - 1]
+        averages = self.runner.call_view_method(self.contract_id, 'consult', pool_key, seconds_ago_list, now)
+        assert averages[0] == spot_prices()
+        now_a, now_b = cumulative(now)
+        for seconds_ago, average in zip(seconds_ago_list[1:], averages[1:]):
+            then_a, then_b = cumulative(now - seconds_ago)
+            assert average == ((now_a - then_a) // seconds_ago, (now_b - then_b) // seconds_ago)
+
+        with pytest.raises(InvalidState):
+            self.runner.call_view_method(self.contract_id, 'consult', pool_key, [now], now)
+        with pytest.raises(InvalidAction):
+            self.runner.call_view_method(self.contract_id, 'consult', pool_key, [-1], now)
+
+        # Frequent swaps overwrite the newest observation instead of keeping a new one
+        contract = self.get_contract()
+        pool_id = contract.pool_ids[pool_key]
+        slot, count = contract.pool_twap_observation_cursor[pool_id]
+        for i in range(10):
+            timestamp += 50
+            swap(timestamp, self.token_a if i % 2 == 0 else self.token_b,
+                 self.token_b if i % 2 == 0 else self.token_a, 1000000)
+        contract = self.get_contract()
+        assert contract.pool_twap_observation_cursor[pool_id] == ((slot + 1) % 144, count + 1)
+
+        # The buffer wraps around and stays bounded
+        for i in range(200):
+            timestamp += 700
+            swap(timestamp, self.token_a if i % 2 == 0 else self.token_b,
+                 self.token_b if i % 2 == 0 else self.token_a, 1000000)
+        contract = self.get_contract()
+        slot, count = contract.pool_twap_observation_cursor[pool_id]
+        assert count == 144
+        assert contract.pool_twap_observations[pool_id][slot].timestamp == timestamp
+        oldest = contract.pool_twap_observations[pool_id][(slot + 1) % 144]
+        averages = self.runner.call_view_method(
+            self.contract_id, 'consult', pool_key, [3600, timestamp - oldest.timestamp], timestamp
+        )
+        for price_a, price_b in averages:
+            assert 0 < price_a and 0 < price_b
+        with pytest.raises(InvalidState):
+            self.runner.call_view_method(
+                self.contract_id, 'consult', pool_key, [timestamp - oldest.timestamp + 1], timestamp
+            )
+
+    def test_get_pool_stats(self) -> None:
+        pool_key, _ = self.create_pool(
+            token_a=self.token_a, token_b=self.token_b, fee=3, reserve_a=1000000000, reserve_b=2000000000
+        )
+        rng = random.Random(7)
+
+        # Record each swap's effect on the lifetime counters as the reference
+        swaps = []
+        timestamp = 1
+        for i in range(300):
+            timestamp += rng.randint(600, 6000)
+            contract = self.get_contract()
+            pool = contract.pools[pool_key]
+            fees = dict(contract.pool_accumulated_fee[pool_key])
+            token_in, token_out = rng.choice([(self.token_a, self.token_b), (self.token_b, self.token_a)])
+            if i % 3 == 0:
+                ctx = self.create_context(timestamp=timestamp, actions=[
+                    NCDepositAction(token_uid=token_in, amount=10000000),
+                    NCWithdrawalAction(token_uid=token_out, amount=1000000),
+                ])
+                self.runner.call_public_method(
+                    self.contract_id, 'swap_tokens_for_exact_tokens', ctx, fee=3, deadline=timestamp
+                )
+            else:
+                ctx = self.create_context(timestamp=timestamp, actions=[
+                    NCDepositAction(token_uid=token_in, amount=rng.randint(1000, 5000000)),
+                    NCWithdrawalAction(token_uid=token_out, amount=1),
+                ])
+                self.runner.call_public_method(
+                    self.contract_id, 'swap_exact_tokens_for_tokens', ctx, fee=3, deadline=timestamp
+                )
+            contract = self.get_contract()
+            pool_after = contract.pools[pool_key]
+            fees_after = contract.pool_accumulated_fee[pool_key]
+            swaps.append((
+                timestamp,
+                pool_after.volume_a - pool.volume_a,
+                pool_after.volume_b - pool.volume_b,
+                fees_after[pool.token_a] - fees[pool.token_a],
+                fees_after[pool.token_b] - fees[pool.token_b],
+            ))
+
+        now = timestamp + 1234
+        for window_seconds in (3600, 86400, 7 * 86400):
+            stats = self.runner.call_view_method(self.contract_id, 'get_pool_stats', pool_key, window_seconds, now)
+            # The window is widened to whole hours, and to at most 168 of them
+            first_hour = max((now - window_seconds + 1) // 3600, now // 3600 - 167)
+            assert stats.window_start == first_hour * 3600
+            in_window = [swap for swap in swaps if swap[0] >= stats.window_start]
+            assert stats.transactions == len(in_window)
+            assert stats.volume_a == sum(swap[1] for swap in in_window)
+            assert stats.volume_b == sum(swap[2] for swap in in_window)
+            assert stats.fee_a == sum(swap[3] for swap in in_window)
+            assert stats.fee_b == sum(swap[4] for swap in in_window)
+            assert 0 < stats.transactions < len(swaps)
+
+        # Buckets older than a week are not counted once their slot is reused
+        stats = self.runner.call_view_method(self.contract_id, 'get_pool_stats', pool_key, 3600, now + 30 * 86400)
+        assert stats.transactions == 0
+
+        with pytest.raises(InvalidAction):
+            self.runner.call_view_method(self.contract_id, 'get_pool_stats', pool_key, 0, now)
+        with pytest.raises(InvalidAction):
+            self.runner.call_view_method(self.contract_id, 'get_pool_stats', pool_key, 7 * 86400 + 1, now)
+
+    def test_get_pool_stats_single_token_liquidity(self) -> None:
+        pool_key, _ = self.create_pool(
+            token_a=self.token_a, token_b=self.token_b, fee=3, reserve_a=1000000000, reserve_b=2000000000
+        )
+        user = self.gen_random_address()
+
+        # Both internal swaps count as swaps of the pool
+        pool = self.get_pool_state(pool_key)
+        ctx = self.create_context(
+            actions=[NCDepositAction(token_uid=self.token_a, amount=1000000)], caller_id=user, timestamp=10
+        )
+        self.runner.call_public_method(
+            self.contract_id, 'add_liquidity_single_token', ctx, token_out=self.token_b, fee=3,
+        )
+        quote = self.runner.call_view_method(
+            self.contract_id, 'quote_remove_liquidity_single_token_percentage', user_address=user,
+            pool_key=pool_key, token_out=self.token_a, percentage=10000
+        )
+        ctx = self.create_context(
+            actions=[NCWithdrawalAction(token_uid=self.token_a, amount=quote.amount_out)], caller_id=user, timestamp=20
+        )
+        self.runner.call_public_method(
+            self.contract_id, 'remove_liquidity_single_token', ctx, pool_key=pool_key, percentage=10000,
+        )
+        pool_after = self.get_pool_state(pool_key)
+
+        stats = self.runner.call_view_method(self.contract_id, 'get_pool_stats', pool_key, 3600, 30)
+        assert stats.transactions == 2
+        assert stats.volume_a == pool_after.volume_a - pool.volume_a
+        assert stats.volume_b == pool_after.volume_b - pool.volume_b
+        assert stats.fee_a > 0
+        assert stats.fee_b > 0
+
+    def test_single_token_quote_batches(self) -> None:
+        pool_key, creator = self.create_pool(
+            token_a=self.token_a, token_b=self.token_b, fee=3, reserve_a=1000000000, reserve_b=2000000000
+        )
+
+        amounts_in = [1, 1000, 123456, 5000000, 77777777]
+        quotes = self.runner.call_view_method(
+            self.contract_id, 'quote_add_liquidity_single_token_batch', self.token_a, amounts_in, self.token_b, 3
+        )
+        assert len(quotes) == len(amounts_in)
+        for amount_in, quote in zip(amounts_in, quotes):
+            assert quote == self.runner.call_view_method(
+                self.contract_id, 'quote_add_liquidity_single_token', self.token_a, amount_in, self.token_b, 3
+            )
+
+        percentages = [1, 250, 5000, 9999, 10000]
+        quotes = self.runner.call_view_method(
+            self.contract_id, 'quote_remove_liquidity_single_token_percentage_batch',
+            creator, pool_key, self.token_b, percentages
+        )
+        assert len(quotes) == len(percentages)
+        for percentage, quote in zip(percentages, quotes):
+            assert quote == self.runner.call_view_method(
+                self.contract_id, 'quote_remove_liquidity_single_token_percentage',
+                creator, pool_key, self.token_b, percentage
+            )
+        assert quotes[-1] == self.runner.call_view_method(
+            self.contract_id, 'quote_remove_liquidity_single_token',
+            creator, self.token_a, self.token_b, self.token_b, 3
+        )
+
+        with pytest.raises(InvalidAction):
+            self.runner.call_view_method(
+                self.contract_id, 'quote_add_liquidity_single_token_batch',
+                self.token_a, [1000] * 51, self.token_b, 3
+            )
+        with pytest.raises(InvalidAction):
+            self.runner.call_view_method(
+                self.contract_id, 'quote_remove_liquidity_single_token_percentage_batch',
+                creator, pool_key, self.token_b, [5000, 10001]
+            )
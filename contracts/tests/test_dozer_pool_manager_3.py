@@ -4,6 +4,9 @@ from hathor import Address, NCDepositAction, NCFail, NCWithdrawalAction, TokenUi
 from hathor_tests.nanocontracts.blueprints.unittest import BlueprintTestCase
 from hathor.nanocontracts.blueprints.dozer_pool_manager import (
     DozerPoolManager,
+    InvalidAction,
+    InvalidPath,
+    PoolNotFound,
     PoolState,
     SwapResult,
 )
@@ -397,3 +400,81 @@ class TestDozerPoolManagerPathSwaps(BlueprintTestCase):
         state3 = self.get_pool_state(pool_key3)
         assert state3.reserve_a == 3000000 + 3004
         assert state3.reserve_b == 4000000 - 4000
+
+    def test_get_depth_curve_single_pool(self) -> None:
+        pool_key, _ = self.create_pool(
+            token_a=self.token_a, token_b=self.token_b, fee=0, reserve_a=1000000, reserve_b=2000000
+        )
+
+        points = self.runner.call_view_method(
+            self.contract_id, 'get_depth_curve', pool_key, self.token_a, [0, 1000, 100000]
+        )
+
+        assert [point.amount_in for point in points] == [0, 1000, 100000]
+        assert points[0].amount_out == 0
+        assert points[0].marginal_price == 200000000  # Spot price: 2 token_b per token_a
+        assert points[0].price_impact == 0
+
+        # Same amount the swap through path produces for this pool
+        assert points[1].amount_out == 1998
+        assert points[1].marginal_price == 199600599
+        assert points[1].price_impact == 10
+
+        for point in points[1:]:
+            expected_out = self.runner.call_view_method(
+                self.contract_id, 'get_amount_out', point.amount_in, 1000000, 2000000, 0, 1000
+            )
+            assert point.amount_out == expected_out
+
+        # Larger inputs get strictly worse marginal prices and larger impact
+        assert points[2].marginal_price < points[1].marginal_price
+        assert points[2].price_impact > points[1].price_impact
+
+    def test_get_path_depth_curve_matches_swap(self) -> None:
+        pool_key1, _ = self.create_pool(
+            token_a=self.token_a, token_b=self.token_b, fee=1, reserve_a=1000000, reserve_b=2000000
+        )
+        pool_key2, _ = self.create_pool(
+            token_a=self.token_b, token_b=self.token_c, fee=5, reserve_a=2000000, reserve_b=3000000
+        )
+        path_str = f"{pool_key1},{pool_key2}"
+
+        points = self.runner.call_view_method(
+            self.contract_id, 'get_path_depth_curve', path_str, self.token_a, [1000, 50000]
+        )
+
+        # Same output as test_swap_exact_through_path_two_hop_mixed_fees
+        assert points[0].amount_out == 2976
+        assert points[1].amount_out < 50000 * 3
+        assert points[1].marginal_price < points[0].marginal_price
+
+        single = self.runner.call_view_method(
+            self.contract_id, 'get_depth_curve', pool_key1, self.token_a, [1000]
+        )
+        assert single[0].amount_out == 1996
+
+    def test_get_path_depth_curve_invalid_path(self) -> None:
+        with pytest.raises(InvalidPath):
+            self.runner.call_view_method(self.contract_id, 'get_path_depth_curve', '', self.token_a, [1000])
+
+        with pytest.raises(PoolNotFound):
+            self.runner.call_view_method(
+                self.contract_id, 'get_path_depth_curve', 'missing/pool/0', self.token_a, [1000]
+            )
+
+    def test_get_depth_curve_too_many_amounts(self) -> None:
+        pool_key, _ = self.create_pool(
+            token_a=self.token_a, token_b=self.token_b, fee=3, reserve_a=1000000, reserve_b=2000000
+        )
+        amounts = [1000 * (i + 1) for i in range(51)]
+
+        with pytest.raises(InvalidAction):
+            self.runner.call_view_method(self.contract_id, 'get_depth_curve', pool_key, self.token_a, amounts)
+
+        with pytest.raises(InvalidAction):
+            self.runner.call_view_method(self.contract_id, 'get_path_depth_curve', pool_key, self.token_a, amounts)
+
+        points = self.runner.call_view_method(
+            self.contract_id, 'get_depth_curve', pool_key, self.token_a, amounts[:50]
+        )
+        assert len(points) == 50
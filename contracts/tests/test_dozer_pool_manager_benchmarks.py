@@ -0,0 +1,640 @@
+import math
+import os
+import random
+import time
+
+import pytest
+
+from hathor import HATHOR_TOKEN_UID, Address, NCDepositAction, NCWithdrawalAction, TokenUid
+from hathor_tests.nanocontracts.blueprints.unittest import BlueprintTestCase
+from hathor.nanocontracts.blueprints.dozer_pool_manager import DozerPoolManager, Unauthorized
+
+POOL_FEES = [0, 3, 5, 10]
+
+# Wall-clock comparisons only run on request (DOZER_BENCHMARKS=1 pytest -s ...), never in CI
+timing_benchmark = pytest.mark.skipif(
+    not os.environ.get('DOZER_BENCHMARKS'), reason='set DOZER_BENCHMARKS=1 to run the timing benchmarks'
+)
+
+
+def baseline_build_token_graph(
+    contract: DozerPoolManager, reference_amount: int
+) -> dict[TokenUid, dict[TokenUid, tuple[int, str, int]]]:
+    """_build_token_graph of the 1.0.0 blueprint: the best signed pool per directed token pair."""
+    graph: dict[TokenUid, dict[TokenUid, tuple[int, str, int]]] = {}
+    count = 0
+    for pool_key in contract.all_pools:
+        if pool_key not in contract.pool_signers:
+            continue
+        if count >= 1000:
+            break
+        count += 1
+        pool = contract.pools[pool_key]
+        if pool.reserve_a <= 0 or pool.reserve_b <= 0 or pool.fee_denominator <= 0:
+            continue
+        a = pool.fee_denominator - pool.fee_numerator
+        b = pool.fee_denominator
+        directions = [
+            (pool.token_a, pool.token_b, pool.reserve_a, pool.reserve_b),
+            (pool.token_b, pool.token_a, pool.reserve_b, pool.reserve_a),
+        ]
+        for token_in, token_out, reserve_in, reserve_out in directions:
+            denominator = reserve_in * b + reference_amount * a
+            if denominator <= 0:
+                continue
+            output = (reserve_out * reference_amount * a) // denominator
+            if output > reserve_out:
+                continue
+            edges = graph.setdefault(token_in, {})
+            if token_out not in edges or output > edges[token_out][0]:
+                edges[token_out] = (output, pool_key, pool.fee_numerator)
+    return graph
+
+
+def baseline_find_best_swap_path(
+    contract: DozerPoolManager, amount_in: int, token_in: TokenUid, token_out: TokenUid, max_hops: int
+) -> tuple[list[str], int]:
+    """find_best_swap_path of the 1.0.0 blueprint (_build_token_graph + _dijkstra_shortest_path).
+
+    Returns:
+        The pool keys of the path and its output amount, ([], 0) without a path
+    """
+    graph = baseline_build_token_graph(contract, amount_in)
+    if token_in not in graph:
+        return [], 0
+
+    distances = {token: (0, 0) for token in graph}
+    previous: dict[TokenUid, tuple[TokenUid, str]] = {}
+    unvisited = set(graph)
+    distances[token_in] = (amount_in, 0)
+
+    while unvisited:
+        current = None
+        max_amount = 0
+        for token in unvisited:
+            amount, _hops = distances[token]
+            if amount > max_amount:
+                max_amount = amount
+                current = token
+        if current is None or current == token_out:
+            break
+
+        current_amount, current_hops = distances[current]
+        unvisited.remove(current)
+        if current_hops >= max_hops:
+            continue
+
+        for neighbor, (_output, pool_key, fee) in graph[current].items():
+            if neighbor not in unvisited:
+                continue
+            pool = contract.pools[pool_key]
+            if pool.token_a == current:
+                reserve_in, reserve_out = pool.reserve_a, pool.reserve_b
+            else:
+                reserve_in, reserve_out = pool.reserve_b, pool.reserve_a
+            a = pool.fee_denominator - fee
+            b = pool.fee_denominator
+            actual_output = (reserve_out * current_amount * a) // (reserve_in * b + current_amount * a)
+            if actual_output <= reserve_out and actual_output > distances[neighbor][0]:
+                distances[neighbor] = (actual_output, current_hops + 1)
+                previous[neighbor] = (current, pool_key)
+
+    if token_out not in previous:
+        return [], 0
+
+    path: list[str] = []
+    current = token_out
+    while current in previous:
+        current, pool_key = previous[current]
+        path.insert(0, pool_key)
+    return path, distances[token_out][0]
+
+
+def half_seeded_isqrt(n: int) -> int:
+    """_isqrt of the 1.0.0 blueprint, Newton's method seeded with n // 2 + 1."""
+    if n <= 3:
+        return 1 if n else 0
+    z, x = n, n // 2 + 1
+    while x < z:
+        z = x
+        x = (n // x + x) // 2
+    return z
+
+
+class TestDozerPoolManagerBenchmarks(BlueprintTestCase):
+    """Equivalence checks for the pricing and routing engines at scale.
+
+    Each check builds a randomized (but seeded) network of signed pools and
+    compares the optimized view against the 1.0.0 algorithm it replaced. The
+    timing_benchmark tests time the two and only report.
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.blueprint_id = self._register_blueprint_class(DozerPoolManager)
+        self.deploy_contract()
+
+    def deploy_contract(self) -> None:
+        """Create a fresh pool manager so each network starts empty."""
+        self.contract_id = self.gen_random_contract_id()
+
+        ctx = self.create_context()
+        self.runner.create_contract(self.contract_id, self.blueprint_id, ctx)
+        assert isinstance(ctx.caller_id, Address)
+        self.owner = ctx.caller_id
+
+    def get_contract(self) -> DozerPoolManager:
+        contract = self.get_readonly_contract(self.contract_id)
+        assert isinstance(contract, DozerPoolManager)
+        return contract
+
+    def create_pool(
+        self, *, token_a: TokenUid, token_b: TokenUid, fee: int, reserve_a: int, reserve_b: int
+    ) -> str:
+        ctx = self.create_context(actions=[
+            NCDepositAction(token_uid=token_a, amount=reserve_a),
+            NCDepositAction(token_uid=token_b, amount=reserve_b),
+        ], timestamp=1)
+        return self.runner.call_public_method(self.contract_id, 'create_pool', ctx, fee)
+
+    def build_pool_network(self, *, num_pools: int, seed: int) -> list[TokenUid]:
+        """Create num_pools signed pools over num_pools // 4 tokens, with HTR-USD as reference."""
+        rng = random.Random(seed)
+        usd_token = self.gen_random_token_uid()
+        tokens = [TokenUid(HATHOR_TOKEN_UID), usd_token]
+        for _ in range(max(2, num_pools // 4)):
+            tokens.append(self.gen_random_token_uid())
+
+        owner_ctx = self.create_context(caller_id=self.owner)
+        pairs: list[tuple[TokenUid, TokenUid, int]] = [(TokenUid(HATHOR_TOKEN_UID), usd_token, 3)]
+        seen = {pairs[0]}
+        while len(pairs) < num_pools:
+            token_a, token_b = rng.sample(tokens, 2)
+            if token_a > token_b:
+                token_a, token_b = token_b, token_a
+            pair = (token_a, token_b, rng.choice(POOL_FEES))
+            if pair in seen:
+                continue
+            seen.add(pair)
+            pairs.append(pair)
+
+        for token_a, token_b, fee in pairs:
+            self.create_pool(
+                token_a=token_a,
+                token_b=token_b,
+                fee=fee,
+                reserve_a=rng.randint(1000_00, 1_000_000_00),
+                reserve_b=rng.randint(1000_00, 1_000_000_00),
+            )
+            self.runner.call_public_method(self.contract_id, 'sign_pool', owner_ctx, token_a, token_b, fee)
+
+        self.runner.call_public_method(
+            self.contract_id, 'set_htr_usd_pool', owner_ctx, TokenUid(HATHOR_TOKEN_UID), usd_token, 3
+        )
+        self.usd_token = usd_token
+        return tokens
+
+    def path_price_in_usd(self, token: TokenUid, pool_keys: list[str]) -> int:
+        """Chain spot reserve ratios from token back to USD along a USD → token path."""
+        contract = self.get_contract()
+        price = 100_000000
+        for pool_key in reversed(pool_keys):
+            pool = contract.pools[pool_key]
+            if token == pool.token_a:
+                price = price * pool.reserve_b // pool.reserve_a
+                token = pool.token_b
+            else:
+                price = price * pool.reserve_a // pool.reserve_b
+                token = pool.token_a
+        return price
+
+    def path_amount_out(self, amount: int, token: TokenUid, pool_keys: list[str]) -> int:
+        """Output of swapping amount of token along pool_keys at the current reserves."""
+        contract = self.get_contract()
+        for pool_key in pool_keys:
+            pool = contract.pools[pool_key]
+            if token == pool.token_a:
+                reserve_in, reserve_out, token = pool.reserve_a, pool.reserve_b, pool.token_b
+            else:
+                reserve_in, reserve_out, token = pool.reserve_b, pool.reserve_a, pool.token_a
+            a = pool.fee_denominator - pool.fee_numerator
+            amount = reserve_out * amount * a // (reserve_in * pool.fee_denominator + amount * a)
+        return amount
+
+    def reference_usd_price(self, token: TokenUid) -> int:
+        """Price a token like the 1.0.0 blueprint: a fresh graph search from USD on every read."""
+        if token == self.usd_token:
+            return 100_000000
+        path, amount_out = baseline_find_best_swap_path(self.get_contract(), 100_00, self.usd_token, token, 3)
+        if not path or amount_out == 0:
+            return 0
+        return self.path_price_in_usd(token, path)
+
+    def _check_usd_price_table(self, num_pools: int) -> None:
+        tokens = self.build_pool_network(num_pools=num_pools, seed=num_pools)
+        contract = self.get_contract()
+        single_pass = self.runner.call_view_method(self.contract_id, 'get_all_token_prices_in_usd')
+
+        same_route = 0
+        for token in tokens:
+            price = self.runner.call_view_method(self.contract_id, 'get_token_price_in_usd', token)
+            assert price == single_pass.get(token.hex(), 0)
+            if token == self.usd_token:
+                assert price == self.reference_usd_price(token)
+                continue
+
+            path, amount_out = baseline_find_best_swap_path(contract, 100_00, self.usd_token, token, 3)
+            if not path or amount_out == 0:
+                continue
+
+            # Every token the old search priced is priced, along a route at least as good
+            route = contract.usd_price_routes[token].split(',')
+            assert price == self.path_price_in_usd(token, route) > 0
+            assert self.path_amount_out(100_00, self.usd_token, route) >= amount_out
+            if route == path:
+                assert price == self.reference_usd_price(token)
+                same_route += 1
+
+        # The old greedy search is usually already optimal; both agree there
+        assert same_route > 0
+
+    def test_usd_price_table_100_pools(self) -> None:
+        self._check_usd_price_table(100)
+
+    def test_usd_price_table_500_pools(self) -> None:
+        self._check_usd_price_table(500)
+
+    def test_usd_price_table_1000_pools(self) -> None:
+        self._check_usd_price_table(1000)
+
+    def test_htr_price_table_matches_per_token(self) -> None:
+        tokens = self.build_pool_network(num_pools=100, seed=1)
+
+        expected = {HATHOR_TOKEN_UID.hex(): 100_000000}
+        for token in tokens:
+            if token == HATHOR_TOKEN_UID:
+                continue
+            price = self.runner.call_view_method(self.contract_id, 'get_token_price_in_htr', token)
+            if price > 0:
+                expected[token.hex()] = price
+
+        assert self.runner.call_view_method(self.contract_id, 'get_all_token_prices_in_htr') == expected
+
+    def test_profit_tracking_uses_current_usd_prices(self) -> None:
+        self.build_pool_network(num_pools=100, seed=2)
+        contract = self.get_contract()
+        user_address = self.gen_random_address()
+
+        for pool_key in list(contract.all_pools)[:20]:
+            pool = self.get_contract().pools[pool_key]
+            amount_a = pool.reserve_a // 100
+            amount_b = pool.reserve_b // 100 + 1
+            ctx = self.create_context(actions=[
+                NCDepositAction(token_uid=pool.token_a, amount=amount_a),
+                NCDepositAction(token_uid=pool.token_b, amount=amount_b),
+            ], caller_id=user_address, timestamp=2)
+            self.runner.call_public_method(self.contract_id, 'add_liquidity', ctx, pool.fee_numerator)
+
+            # The tracked position value must use the prices refreshed by this same call
+            contract = self.get_contract()
+            pool = contract.pools[pool_key]
+            liquidity = contract.pool_user_states[contract.pool_ids[pool_key]][user_address].liquidity
+            price_a = self.runner.call_view_method(self.contract_id, 'get_token_price_in_usd', pool.token_a)
+            price_b = self.runner.call_view_method(self.contract_id, 'get_token_price_in_usd', pool.token_b)
+            expected = (
+                (pool.reserve_a * liquidity // pool.total_liquidity) * price_a // 100_000000
+                + (pool.reserve_b * liquidity // pool.total_liquidity) * price_b // 100_000000
+            )
+            assert contract.pool_user_states[contract.pool_ids[pool_key]][user_address].deposit_value_usd == expected
+
+    def test_lazy_profit_tracking_defers_usd_valuation(self) -> None:
+        self.build_pool_network(num_pools=100, seed=2)
+        with pytest.raises(Unauthorized):
+            self.runner.call_public_method(
+                self.contract_id, 'set_lazy_profit_tracking', self.create_context(), True
+            )
+        self.runner.call_public_method(
+            self.contract_id, 'set_lazy_profit_tracking', self.create_context(caller_id=self.owner), True
+        )
+        contract = self.get_contract()
+        user_address = self.gen_random_address()
+
+        for pool_key in list(contract.all_pools)[:20]:
+            pool = self.get_contract().pools[pool_key]
+            ctx = self.create_context(actions=[
+                NCDepositAction(token_uid=pool.token_a, amount=pool.reserve_a // 100),
+                NCDepositAction(token_uid=pool.token_b, amount=pool.reserve_b // 100 + 1),
+            ], caller_id=user_address, timestamp=2)
+            self.runner.call_public_method(self.contract_id, 'add_liquidity', ctx, pool.fee_numerator)
+
+            # Only the token amounts of the position are recorded
+            contract = self.get_contract()
+            pool = contract.pools[pool_key]
+            state = contract.pool_user_states[contract.pool_ids[pool_key]][user_address]
+            assert state.deposit_value_usd == 0
+            assert state.cost_basis_a == pool.reserve_a * state.liquidity // pool.total_liquidity
+            assert state.cost_basis_b == pool.reserve_b * state.liquidity // pool.total_liquidity
+
+            # The view values the cost basis at current prices, so an untouched position breaks even
+            price_a = self.runner.call_view_method(self.contract_id, 'get_token_price_in_usd', pool.token_a)
+            price_b = self.runner.call_view_method(self.contract_id, 'get_token_price_in_usd', pool.token_b)
+            expected = state.cost_basis_a * price_a // 100_000000 + state.cost_basis_b * price_b // 100_000000
+            info = self.runner.call_view_method(self.contract_id, 'get_user_profit_info', user_address, pool_key)
+            assert info.initial_value_usd == expected
+            assert info.current_value_usd == expected
+            assert info.profit_amount_usd == 0
+            assert info.last_action_timestamp == 2
+
+    def test_user_portfolio_matches_per_pool_views(self) -> None:
+        self.build_pool_network(num_pools=100, seed=4)
+        contract = self.get_contract()
+        user_address = self.gen_random_address()
+        pool_keys = list(contract.all_pools)[:20]
+
+        for index, pool_key in enumerate(pool_keys):
+            if index == 10:
+                # Half of the positions are recorded with a token cost basis
+                self.runner.call_public_method(
+                    self.contract_id, 'set_lazy_profit_tracking', self.create_context(caller_id=self.owner), True
+                )
+            pool = self.get_contract().pools[pool_key]
+            ctx = self.create_context(actions=[
+                NCDepositAction(token_uid=pool.token_a, amount=pool.reserve_a // 100),
+                NCDepositAction(token_uid=pool.token_b, amount=pool.reserve_b // 50),
+            ], caller_id=user_address, timestamp=2)
+            self.runner.call_public_method(self.contract_id, 'add_liquidity', ctx, pool.fee_numerator)
+
+        # Move prices so positions show profits and losses
+        for pool_key in pool_keys[::3]:
+            pool = self.get_contract().pools[pool_key]
+            ctx = self.create_context(actions=[
+                NCDepositAction(token_uid=pool.token_a, amount=pool.reserve_a // 10),
+                NCWithdrawalAction(token_uid=pool.token_b, amount=1),
+            ], timestamp=3)
+            self.runner.call_public_method(
+                self.contract_id, 'swap_exact_tokens_for_tokens', ctx, pool.fee_numerator, 10
+            )
+
+        portfolio = self.runner.call_view_method(self.contract_id, 'get_user_portfolio', user_address)
+        assert [position.pool_key for position in portfolio.positions] == pool_keys
+        for position in portfolio.positions:
+            info = self.runner.call_view_method(self.contract_id, 'user_info', user_address, position.pool_key)
+            profit = self.runner.call_view_method(
+                self.contract_id, 'get_user_profit_info', user_address, position.pool_key
+            )
+            assert (position.amount_a, position.amount_b) == (info.token0Amount, info.token1Amount)
+            assert (position.balance_a, position.balance_b) == (info.balance_a, info.balance_b)
+            assert position.value_usd == profit.current_value_usd
+            assert position.initial_value_usd == profit.initial_value_usd
+            assert position.profit_amount_usd == profit.profit_amount_usd
+            assert position.profit_percentage == profit.profit_percentage
+
+        assert portfolio.total_value_usd == sum(position.value_usd for position in portfolio.positions)
+        assert portfolio.total_cashback_value_usd == sum(
+            position.cashback_value_usd for position in portfolio.positions
+        )
+        assert portfolio.total_profit_amount_usd == sum(
+            position.profit_amount_usd for position in portfolio.positions
+        )
+        assert portfolio.total_profit_amount_usd != 0
+
+        empty = self.runner.call_view_method(self.contract_id, 'get_user_portfolio', self.gen_random_address())
+        assert empty.positions == []
+        assert empty.total_value_usd == 0
+
+    def test_usd_price_oracle_follows_swaps(self) -> None:
+        tokens = self.build_pool_network(num_pools=100, seed=3)
+        rng = random.Random(3)
+        contract = self.get_contract()
+        signed_pool_keys = [pool_key for pool_key in contract.all_pools if pool_key in contract.pool_signers]
+
+        # The first hop out of USD is applied on read, so the HTR-USD pool has no dependents
+        assert contract.pool_ids[contract.htr_usd_pool_key] not in contract.pool_usd_price_dependents
+
+        for _ in range(30):
+            pool_key = rng.choice(signed_pool_keys)
+            contract = self.get_contract()
+            pool = contract.pools[pool_key]
+            prices_before = {token: contract.usd_prices[token] for token in contract.usd_price_tokens}
+            dependents = set(contract.pool_usd_price_dependents.get(contract.pool_ids[pool_key], []))
+
+            token_in, token_out = rng.choice([(pool.token_a, pool.token_b), (pool.token_b, pool.token_a)])
+            reserve_in = pool.reserve_a if token_in == pool.token_a else pool.reserve_b
+            ctx = self.create_context(actions=[
+                NCDepositAction(token_uid=token_in, amount=reserve_in // rng.randint(5, 50)),
+                NCWithdrawalAction(token_uid=token_out, amount=1),
+            ], timestamp=2)
+            self.runner.call_public_method(
+                self.contract_id, 'swap_exact_tokens_for_tokens', ctx, pool.fee_numerator, 10
+            )
+
+            # Every price matches its stored route, and only dependents of the pool moved
+            contract = self.get_contract()
+            for token in contract.usd_price_tokens:
+                pool_keys = contract.usd_price_routes[token].split(',') if contract.usd_price_routes[token] else []
+                assert contract.usd_prices[token] == self.path_price_in_usd(token, pool_keys[1:])
+                price = self.runner.call_view_method(self.contract_id, 'get_token_price_in_usd', token)
+                assert price == self.path_price_in_usd(token, pool_keys)
+                if token not in dependents:
+                    assert contract.usd_prices[token] == prices_before[token]
+
+        with pytest.raises(Unauthorized):
+            self.runner.call_public_method(self.contract_id, 'refresh_usd_prices', self.create_context())
+
+        # A full refresh also re-selects the best routes
+        owner_ctx = self.create_context(caller_id=self.owner)
+        self.runner.call_public_method(self.contract_id, 'refresh_usd_prices', owner_ctx)
+        for token in tokens:
+            if token == self.usd_token:
+                continue
+            price = self.runner.call_view_method(self.contract_id, 'get_token_price_in_usd', token)
+            info = self.runner.call_view_method(
+                self.contract_id, 'find_best_swap_path', 100_00, self.usd_token, token, 3
+            )
+            assert price == (self.path_price_in_usd(token, info.path.split(',')) if info.path else 0)
+
+    def test_twap_usd_prices_follow_stored_routes(self) -> None:
+        htr = TokenUid(HATHOR_TOKEN_UID)
+        usd_token, token_x, token_y = [self.gen_random_token_uid() for _ in range(3)]
+        owner_ctx = self.create_context(caller_id=self.owner)
+        for token_a, token_b, reserve_a, reserve_b in [
+            (htr, usd_token, 1_000_000_00, 100_000_00),
+            (htr, token_x, 1_000_000_00, 500_000_00),
+            (token_x, token_y, 500_000_00, 2_000_000_00),
+        ]:
+            self.create_pool(token_a=token_a, token_b=token_b, fee=3, reserve_a=reserve_a, reserve_b=reserve_b)
+            self.runner.call_public_method(self.contract_id, 'sign_pool', owner_ctx, token_a, token_b, 3)
+        self.runner.call_public_method(self.contract_id, 'set_htr_usd_pool', owner_ctx, htr, usd_token, 3)
+        tokens = [htr, usd_token, token_x, token_y]
+
+        # A single hop TWAP price is the pool's own TWAP price
+        twap_prices = {
+            token: self.runner.call_view_method(self.contract_id, 'get_token_twap_price_in_usd', token, 1000)
+            for token in tokens
+        }
+        assert twap_prices[usd_token] == 100_000000
+        assert twap_prices[htr] == self.runner.call_view_method(
+            self.contract_id, 'get_twap_price', usd_token, htr, 3, 1000
+        )
+
+        # Dump HTR into the HTR-USD pool: spot prices move, TWAP prices do not
+        spot_before = self.runner.call_view_method(self.contract_id, 'get_all_token_prices_in_usd')
+        ctx = self.create_context(actions=[
+            NCDepositAction(token_uid=htr, amount=1_000_000_00),
+            NCWithdrawalAction(token_uid=usd_token, amount=1),
+        ], timestamp=1000)
+        self.runner.call_public_method(self.contract_id, 'swap_exact_tokens_for_tokens', ctx, 3, 1000)
+
+        spot_after = self.runner.call_view_method(self.contract_id, 'get_all_token_prices_in_usd')
+        for token in [htr, token_x, token_y]:
+            assert spot_after[token.hex()] < spot_before[token.hex()] // 3
+            assert self.runner.call_view_method(
+                self.contract_id, 'get_token_twap_price_in_usd', token, 1000
+            ) == twap_prices[token]
+
+        # One block later the manipulated price only carries a single second of weight
+        for token in [htr, token_x, token_y]:
+            twap = self.runner.call_view_method(self.contract_id, 'get_token_twap_price_in_usd', token, 1001)
+            assert twap > twap_prices[token] * 99 // 100
+
+        # The bulk view prices each token exactly like the single-token view
+        all_twap = self.runner.call_view_method(self.contract_id, 'get_all_token_twap_prices_in_usd', 5000)
+        assert all_twap == {
+            token.hex(): self.runner.call_view_method(
+                self.contract_id, 'get_token_twap_price_in_usd', token, 5000
+            )
+            for token in tokens
+        }
+
+    def test_htr_pair_prices_use_htr_token_map(self) -> None:
+        htr = TokenUid(HATHOR_TOKEN_UID)
+        usd_token, token_x, token_y, token_z = [self.gen_random_token_uid() for _ in range(4)]
+        owner_ctx = self.create_context(caller_id=self.owner)
+        pool_keys = {}
+        for token_a, token_b, fee, reserve_a, reserve_b in [
+            (htr, usd_token, 3, 1_000_000_00, 100_000_00),
+            (htr, token_x, 10, 1_000_000_00, 500_000_00),
+            (htr, token_x, 3, 1_000_000_00, 400_000_00),
+            (token_x, token_y, 3, 500_000_00, 2_000_000_00),
+            (htr, token_z, 3, 1_000_000_00, 1_000_000_00),
+        ]:
+            pool_keys[(token_b, fee)] = self.create_pool(
+                token_a=token_a, token_b=token_b, fee=fee, reserve_a=reserve_a, reserve_b=reserve_b
+            )
+        self.runner.call_public_method(self.contract_id, 'set_htr_usd_pool', owner_ctx, htr, usd_token, 3)
+        for token_b, fee in [(usd_token, 3), (token_x, 10), (token_x, 3), (token_y, 3)]:
+            token_a = htr if token_b != token_y else token_x
+            self.runner.call_public_method(self.contract_id, 'sign_pool', owner_ctx, token_a, token_b, fee)
+
+        def htr_price(token: TokenUid) -> int:
+            return self.runner.call_view_method(self.contract_id, 'get_token_price_in_htr', token)
+
+        def assert_bulk_matches() -> None:
+            expected = {}
+            for token in [htr, usd_token, token_x, token_y, token_z]:
+                if htr_price(token) > 0:
+                    expected[token.hex()] = htr_price(token)
+            assert self.runner.call_view_method(self.contract_id, 'get_all_token_prices_in_htr') == expected
+
+        # The lowest fee signed HTR pool prices the token directly; unsigned pools are ignored
+        contract = self.get_contract()
+        assert contract.htr_token_map[token_x] == pool_keys[(token_x, 3)]
+        assert token_z not in contract.htr_token_map
+        assert htr_price(token_x) == 1_000_000_00 * 100_000000 // 400_000_00
+        assert htr_price(token_z) == 0
+        # Tokens without an HTR pair are priced through USD
+        assert htr_price(token_y) > 0
+        assert token_y not in contract.htr_token_map
+        assert_bulk_matches()
+
+        # Unsigning the mapped pool falls back to the next lowest fee signed HTR pool
+        self.runner.call_public_method(self.contract_id, 'unsign_pool', owner_ctx, htr, token_x, 3)
+        assert self.get_contract().htr_token_map[token_x] == pool_keys[(token_x, 10)]
+        assert htr_price(token_x) == 1_000_000_00 * 100_000000 // 500_000_00
+        assert_bulk_matches()
+
+        # Without any signed HTR pool the token falls back to USD, where it has no route left
+        self.runner.call_public_method(self.contract_id, 'unsign_pool', owner_ctx, htr, token_x, 10)
+        assert token_x not in self.get_contract().htr_token_map
+        assert htr_price(token_x) == 0
+        assert_bulk_matches()
+
+        # Signing a pool back restores the direct price
+        self.runner.call_public_method(self.contract_id, 'sign_pool', owner_ctx, htr, token_z, 3)
+        assert htr_price(token_z) == 100_000000
+        assert_bulk_matches()
+
+    def test_isqrt_matches_math_isqrt(self) -> None:
+        contract = self.get_contract()
+        rng = random.Random(20)
+
+        # Exhaustive over the small range, where the special cases live
+        for n in range(1 << 12):
+            assert contract._isqrt(n) == math.isqrt(n)
+
+        # Randomized plus boundary values around every power of two and perfect square
+        for bits in range(1, 513):
+            candidates = {(1 << bits) - 1, 1 << (bits - 1)}
+            candidates.update(rng.getrandbits(bits) for _ in range(20))
+            root = rng.getrandbits((bits + 1) // 2) or 1
+            candidates.update({root * root - 1, root * root, root * root + 1, (root + 1) ** 2 - 1})
+            for n in candidates:
+                assert contract._isqrt(n) == math.isqrt(n), f'isqrt mismatch for {bits}-bit n={n}'
+
+    def test_isqrt_matches_half_seeded_isqrt(self) -> None:
+        """The bit-length seeded isqrt agrees with the n // 2 + 1 seed it replaced."""
+        contract = self.get_contract()
+        rng = random.Random(256)
+        operands = [rng.getrandbits(bits) | (1 << (bits - 1)) for bits in (64, 128, 200, 256) for _ in range(250)]
+
+        reference = [half_seeded_isqrt(n) for n in operands]
+        results = [contract._isqrt(n) for n in operands]
+
+        assert results == reference == [math.isqrt(n) for n in operands]
+
+    @timing_benchmark
+    def test_usd_price_table_timings(self) -> None:
+        """Time per-token pricing with the 1.0.0 graph search against the stored oracle."""
+        for num_pools in (100, 500, 1000):
+            self.deploy_contract()
+            tokens = self.build_pool_network(num_pools=num_pools, seed=num_pools)
+
+            start = time.perf_counter()
+            for token in tokens:
+                self.reference_usd_price(token)
+            per_token_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self.runner.call_view_method(self.contract_id, 'get_all_token_prices_in_usd')
+            single_pass_elapsed = time.perf_counter() - start
+
+            print(
+                f'get_all_token_prices_in_usd pools={num_pools}: '
+                f'1.0.0 per-token graph search {per_token_elapsed:.3f}s, stored oracle {single_pass_elapsed:.3f}s, '
+                f'speedup {per_token_elapsed / single_pass_elapsed:.1f}x'
+            )
+
+    @timing_benchmark
+    def test_isqrt_timings(self) -> None:
+        """Time the bit-length seeded isqrt against the n // 2 + 1 seed per operand size."""
+        contract = self.get_contract()
+        rng = random.Random(256)
+        for bits in (64, 128, 192, 256):
+            operands = [rng.getrandbits(bits) | (1 << (bits - 1)) for _ in range(2000)]
+
+            start = time.perf_counter()
+            for n in operands:
+                half_seeded_isqrt(n)
+            half_seeded_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for n in operands:
+                contract._isqrt(n)
+            seeded_elapsed = time.perf_counter() - start
+
+            print(
+                f'_isqrt {bits}-bit operands={len(operands)}: '
+                f'n // 2 + 1 seed {half_seeded_elapsed:.4f}s, bit-length seed {seeded_elapsed:.4f}s, '
+                f'speedup {half_seeded_elapsed / seeded_elapsed:.1f}x'
+            )
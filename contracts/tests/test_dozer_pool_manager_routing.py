@@ -0,0 +1,463 @@
+import random
+from unittest.mock import patch
+
+import pytest
+
+from hathor import HATHOR_TOKEN_UID, Address, NCDepositAction, NCWithdrawalAction, TokenUid
+from hathor_tests.nanocontracts.blueprints.unittest import BlueprintTestCase
+from hathor.nanocontracts.blueprints import dozer_pool_manager
+from hathor.nanocontracts.blueprints.dozer_pool_manager import (
+    DozerPoolManager,
+    InvalidAction,
+    InvalidPath,
+    Unauthorized,
+)
+
+POOL_FEES = [0, 3, 5, 10]
+
+
+class TestDozerPoolManagerRouting(BlueprintTestCase):
+    """Differential tests of the route search against a brute-force path enumerator."""
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.blueprint_id = self._register_blueprint_class(DozerPoolManager)
+        self.deploy_contract()
+
+    def deploy_contract(self) -> None:
+        """Create a fresh pool manager so each random network starts empty."""
+        self.contract_id = self.gen_random_contract_id()
+
+        ctx = self.create_context()
+        self.runner.create_contract(self.contract_id, self.blueprint_id, ctx)
+        assert isinstance(ctx.caller_id, Address)
+        self.owner = ctx.caller_id
+
+        self.tokens: list[TokenUid] = []
+        self.signed_pool_keys: list[str] = []
+
+    def get_contract(self) -> DozerPoolManager:
+        contract = self.get_readonly_contract(self.contract_id)
+        assert isinstance(contract, DozerPoolManager)
+        return contract
+
+    def build_random_network(self, rng: random.Random, *, num_tokens: int, num_pools: int) -> None:
+        """Create pools between random token pairs, signing most of them."""
+        self.tokens = [self.gen_random_token_uid() for _ in range(num_tokens)]
+        owner_ctx = self.create_context(caller_id=self.owner)
+        seen: set[tuple[TokenUid, TokenUid, int]] = set()
+        # There are only so many distinct (pair, fee) pools over num_tokens tokens
+        num_pools = min(num_pools, len(POOL_FEES) * num_tokens * (num_tokens - 1) // 2)
+
+        while len(seen) < num_pools:
+            token_a, token_b = sorted(rng.sample(self.tokens, 2))
+            fee = rng.choice(POOL_FEES)
+            if (token_a, token_b, fee) in seen:
+                continue
+            seen.add((token_a, token_b, fee))
+
+            ctx = self.create_context(actions=[
+                NCDepositAction(token_uid=token_a, amount=rng.randint(1_000, 1_000_000_000)),
+                NCDepositAction(token_uid=token_b, amount=rng.randint(1_000, 1_000_000_000)),
+            ], timestamp=1)
+            pool_key = self.runner.call_public_method(self.contract_id, 'create_pool', ctx, fee)
+
+            # Unsigned pools must never be used for routing
+            if rng.random() < 0.85:
+                self.runner.call_public_method(self.contract_id, 'sign_pool', owner_ctx, token_a, token_b, fee)
+                self.signed_pool_keys.append(pool_key)
+
+    def hop_amount(self, pool_key: str, token: TokenUid, amount: int, exact_output: bool) -> tuple[int | None, TokenUid]:
+        """Amount on the other side of a pool, as (amount or None, other token)."""
+        pool = self.get_contract().pools[pool_key]
+        if token == pool.token_a:
+            reserve_token, reserve_other, other = pool.reserve_a, pool.reserve_b, pool.token_b
+        else:
+            reserve_token, reserve_other, other = pool.reserve_b, pool.reserve_a, pool.token_a
+        a = pool.fee_denominator - pool.fee_numerator
+        b = pool.fee_denominator
+
+        if not exact_output:
+            amount_out = reserve_other * amount * a // (reserve_token * b + amount * a)
+            return (amount_out if amount_out > 0 else None), other
+
+        if amount >= reserve_token:
+            return None, other
+        return reserve_other * amount * b // ((reserve_token - amount) * a), other
+
+    def brute_force_best(
+        self, source: TokenUid, target: TokenUid, amount: int, max_hops: int, exact_output: bool
+    ) -> int:
+        """Enumerate every simple path of signed pools and return the best amount, or 0."""
+        contract = self.get_contract()
+        best: int | None = None
+
+        def visit(token: TokenUid, current: int, visited: set[TokenUid], hops: int) -> None:
+            nonlocal best
+            if token == target and hops > 0:
+                if best is None or (current < best if exact_output else current > best):
+                    best = current
+                return
+            if hops == max_hops:
+                return
+            for pool_key in self.signed_pool_keys:
+                pool = contract.pools[pool_key]
+                if token != pool.token_a and token != pool.token_b:
+                    continue
+                next_amount, other = self.hop_amount(pool_key, token, current, exact_output)
+                if next_amount is None or other in visited:
+                    continue
+                visit(other, next_amount, visited | {other}, hops + 1)
+
+        visit(source, amount, {source}, 0)
+        return best or 0
+
+    def test_find_best_swap_path_matches_brute_force(self) -> None:
+        for seed in range(20):
+            rng = random.Random(seed)
+            self.deploy_contract()
+            self.build_random_network(rng, num_tokens=rng.randint(3, 8), num_pools=rng.randint(2, 20))
+
+            for _ in range(10):
+                token_in, token_out = rng.sample(self.tokens, 2)
+                max_hops = rng.randint(1, 4)
+                amount_in = rng.choice([1, 100, 10_000, 1_000_000, 100_000_000])
+
+                info = self.runner.call_view_method(
+                    self.contract_id, 'find_best_swap_path', amount_in, token_in, token_out, max_hops
+                )
+                expected = self.brute_force_best(token_in, token_out, amount_in, min(max_hops, 3), False)
+                assert info.amount_out == expected, (seed, token_in, token_out, max_hops, amount_in)
+
+                if not info.path:
+                    continue
+
+                # The returned path and amounts must replay to the returned output
+                assert len(info.path.split(',')) <= max_hops
+                current, token = amount_in, token_in
+                amounts = [current]
+                for pool_key in info.path.split(','):
+                    assert pool_key in self.signed_pool_keys
+                    current, token = self.hop_amount(pool_key, token, current, False)
+                    amounts.append(current)
+                assert token == token_out
+                assert info.amounts == amounts
+
+    def test_find_best_swap_path_exact_output_matches_brute_force(self) -> None:
+        for seed in range(20):
+            rng = random.Random(1000 + seed)
+            self.deploy_contract()
+            self.build_random_network(rng, num_tokens=rng.randint(3, 8), num_pools=rng.randint(2, 20))
+
+            for _ in range(10):
+                token_in, token_out = rng.sample(self.tokens, 2)
+                max_hops = rng.randint(1, 4)
+                amount_out = rng.choice([1, 100, 10_000, 1_000_000, 100_000_000])
+
+                info = self.runner.call_view_method(
+                    self.contract_id, 'find_best_swap_path_exact_output', amount_out, token_in, token_out, max_hops
+                )
+                expected = self.brute_force_best(token_out, token_in, amount_out, min(max_hops, 3), True)
+                assert info.amount_in == expected, (seed, token_in, token_out, max_hops, amount_out)
+
+                if not info.path:
+                    continue
+
+                # Exact output paths are listed from token_out back to token_in
+                current, token = amount_out, token_out
+                for pool_key in info.path.split(','):
+                    assert pool_key in self.signed_pool_keys
+                    current, token = self.hop_amount(pool_key, token, current, True)
+                assert token == token_in
+                assert current == info.amount_in
+
+    def get_signed_index(self) -> dict[TokenUid, list[str]]:
+        contract = self.get_contract()
+        for token in self.tokens:
+            if token in contract.signed_token_to_pools:
+                pool_keys = contract.signed_token_to_pools[token]
+                positions = contract.signed_token_pool_positions[token]
+                assert len(positions) == len(pool_keys)
+                assert all(positions[pool_key] == index for index, pool_key in enumerate(pool_keys))
+        return {token: sorted(contract.signed_token_to_pools[token]) for token in self.tokens
+                if token in contract.signed_token_to_pools}
+
+    def expected_signed_index(self) -> dict[TokenUid, list[str]]:
+        contract = self.get_contract()
+        index: dict[TokenUid, list[str]] = {}
+        for pool_key in self.signed_pool_keys:
+            pool = contract.pools[pool_key]
+            index.setdefault(pool.token_a, []).append(pool_key)
+            index.setdefault(pool.token_b, []).append(pool_key)
+        return {token: sorted(pool_keys) for token, pool_keys in index.items()}
+
+    def test_signed_pool_index_follows_sign_and_unsign(self) -> None:
+        rng = random.Random(7)
+        self.build_random_network(rng, num_tokens=6, num_pools=15)
+        assert self.get_signed_index() == self.expected_signed_index()
+
+        owner_ctx = self.create_context(caller_id=self.owner)
+        contract = self.get_contract()
+        all_pool_keys = list(contract.all_pools)
+        for _ in range(30):
+            pool_key = rng.choice(all_pool_keys)
+            pool = self.get_contract().pools[pool_key]
+            if pool_key in self.signed_pool_keys:
+                self.runner.call_public_method(
+                    self.contract_id, 'unsign_pool', owner_ctx, pool.token_a, pool.token_b, pool.fee_numerator
+                )
+                self.signed_pool_keys.remove(pool_key)
+            else:
+                self.runner.call_public_method(
+                    self.contract_id, 'sign_pool', owner_ctx, pool.token_a, pool.token_b, pool.fee_numerator
+                )
+                self.signed_pool_keys.append(pool_key)
+
+            # Signing an already signed pool must not duplicate index entries
+            if pool_key in self.signed_pool_keys:
+                self.runner.call_public_method(
+                    self.contract_id, 'sign_pool', owner_ctx, pool.token_a, pool.token_b, pool.fee_numerator
+                )
+            assert self.get_signed_index() == self.expected_signed_index()
+
+            token_in, token_out = rng.sample(self.tokens, 2)
+            info = self.runner.call_view_method(
+                self.contract_id, 'find_best_swap_path', 1_000_000, token_in, token_out, 3
+            )
+            assert info.amount_out == self.brute_force_best(token_in, token_out, 1_000_000, 3, False)
+
+    def test_rebuild_signed_pool_index(self) -> None:
+        rng = random.Random(11)
+        self.build_random_network(rng, num_tokens=5, num_pools=10)
+        expected = self.get_signed_index()
+
+        with pytest.raises(Unauthorized):
+            self.runner.call_public_method(
+                self.contract_id, 'rebuild_signed_pool_index', self.create_context(), 0
+            )
+
+        owner_ctx = self.create_context(caller_id=self.owner)
+        prices = self.runner.call_view_method(self.contract_id, 'get_all_token_prices_in_usd')
+        assert self.runner.call_public_method(self.contract_id, 'rebuild_signed_pool_index', owner_ctx, 0) is None
+        assert self.get_signed_index() == expected == self.expected_signed_index()
+        assert self.runner.call_view_method(self.contract_id, 'get_all_token_prices_in_usd') == prices
+
+        with pytest.raises(InvalidAction):
+            self.runner.call_public_method(
+                self.contract_id, 'rebuild_signed_pool_index', owner_ctx, len(self.get_contract().all_pools) + 1
+            )
+
+    def test_rebuild_signed_pool_index_in_batches(self) -> None:
+        rng = random.Random(12)
+        self.build_random_network(rng, num_tokens=5, num_pools=10)
+        expected = self.get_signed_index()
+        owner_ctx = self.create_context(caller_id=self.owner)
+
+        cursors = []
+        cursor = 0
+        with patch.object(dozer_pool_manager, 'MAX_POOLS_TO_ITERATE', 3):
+            while cursor is not None:
+                cursor = self.runner.call_public_method(
+                    self.contract_id, 'rebuild_signed_pool_index', owner_ctx, cursor
+                )
+                cursors.append(cursor)
+        assert cursors == [3, 6, 9, None]
+        assert self.get_signed_index() == expected == self.expected_signed_index()
+
+    def test_route_search_edge_cap(self) -> None:
+        self.tokens = [self.gen_random_token_uid() for _ in range(3)]
+        token_a, token_b, token_c = self.tokens
+        owner_ctx = self.create_context(caller_id=self.owner)
+        for token_x, token_y in [(token_a, token_b), (token_b, token_c)]:
+            ctx = self.create_context(actions=[
+                NCDepositAction(token_uid=token_x, amount=1_000_000_000),
+                NCDepositAction(token_uid=token_y, amount=1_000_000_000),
+            ], timestamp=1)
+            pool_key = self.runner.call_public_method(self.contract_id, 'create_pool', ctx, 3)
+            self.runner.call_public_method(self.contract_id, 'sign_pool', owner_ctx, token_x, token_y, 3)
+            self.signed_pool_keys.append(pool_key)
+
+        info = self.runner.call_view_method(self.contract_id, 'find_best_swap_path', 1_000_000, token_a, token_c, 3)
+        assert info.amount_out == self.brute_force_best(token_a, token_c, 1_000_000, 3, False) > 0
+
+        # With a single edge the search stops after reaching token_b
+        with patch.object(dozer_pool_manager, 'MAX_ROUTE_EDGES', 1):
+            info = self.runner.call_view_method(
+                self.contract_id, 'find_best_swap_path', 1_000_000, token_a, token_c, 3
+            )
+            assert info.amount_out == 0
+            info = self.runner.call_view_method(
+                self.contract_id, 'find_best_swap_path', 1_000_000, token_a, token_b, 3
+            )
+            assert info.amount_out > 0
+
+    def test_find_best_swap_paths_batch_matches_single_quotes(self) -> None:
+        rng = random.Random(21)
+        self.build_random_network(rng, num_tokens=10, num_pools=25)
+
+        # A full 200-request fan-out: 5 input tokens x 4 amounts x 10 output tokens
+        requests = []
+        for token_in in rng.sample(self.tokens, 5):
+            for amount_in in [100, 10_000, 1_000_000, 100_000_000]:
+                for token_out in self.tokens:
+                    requests.append((amount_in, token_in, token_out))
+        rng.shuffle(requests)
+        assert len(requests) == 200
+
+        results = self.runner.call_view_method(self.contract_id, 'find_best_swap_paths_batch', requests, 3)
+
+        assert len(results) == len(requests)
+        for (amount_in, token_in, token_out), result in zip(requests, results):
+            expected = self.runner.call_view_method(
+                self.contract_id, 'find_best_swap_path', amount_in, token_in, token_out, 3
+            )
+            assert result == expected
+
+        with pytest.raises(InvalidAction):
+            self.runner.call_view_method(
+                self.contract_id, 'find_best_swap_paths_batch', requests + requests[:1], 3
+            )
+
+    def test_find_best_split_swap_never_worse_than_single_path(self) -> None:
+        for seed in range(20):
+            rng = random.Random(2000 + seed)
+            self.deploy_contract()
+            self.build_random_network(rng, num_tokens=rng.randint(3, 6), num_pools=rng.randint(2, 20))
+
+            for _ in range(10):
+                token_in, token_out = rng.sample(self.tokens, 2)
+                amount_in = rng.choice([100, 1_000_000, 100_000_000])
+
+                split = self.runner.call_view_method(
+                    self.contract_id, 'find_best_split_swap', amount_in, token_in, token_out, 4, 3
+                )
+                single = self.runner.call_view_method(
+                    self.contract_id, 'find_best_swap_path', amount_in, token_in, token_out, 3
+                )
+                assert split.amount_out >= single.amount_out, (seed, token_in, token_out, amount_in)
+                if not split.paths:
+                    continue
+
+                assert sum(split.amounts_in) == amount_in
+                assert split.amount_out == sum(split.amounts_out)
+
+                # Routes are pool-disjoint, so each one replays independently
+                used_pools: set[str] = set()
+                for path, route_in, route_out in zip(split.paths, split.amounts_in, split.amounts_out):
+                    current, token = route_in, token_in
+                    for pool_key in path.split(','):
+                        assert pool_key in self.signed_pool_keys
+                        assert pool_key not in used_pools
+                        used_pools.add(pool_key)
+                        current, token = self.hop_amount(pool_key, token, current, False)
+                    assert token == token_out
+                    assert current == route_out
+
+    def create_parallel_pools(self) -> tuple[TokenUid, TokenUid]:
+        """Create three signed pools of different depth and fee over the same pair."""
+        token_a = TokenUid(HATHOR_TOKEN_UID)
+        token_b = self.gen_random_token_uid()
+        self.tokens = [token_a, token_b]
+        owner_ctx = self.create_context(caller_id=self.owner)
+        for fee, reserve_a, reserve_b in [
+            (3, 1_000_000_000, 2_000_000_000),
+            (5, 500_000_000, 1_000_000_000),
+            (10, 300_000_000, 700_000_000),
+        ]:
+            ctx = self.create_context(actions=[
+                NCDepositAction(token_uid=token_a, amount=reserve_a),
+                NCDepositAction(token_uid=token_b, amount=reserve_b),
+            ], timestamp=1)
+            pool_key = self.runner.call_public_method(self.contract_id, 'create_pool', ctx, fee)
+            self.runner.call_public_method(self.contract_id, 'sign_pool', owner_ctx, token_a, token_b, fee)
+            self.signed_pool_keys.append(pool_key)
+        return token_a, token_b
+
+    def test_find_best_split_swap_equalizes_parallel_pools(self) -> None:
+        token_a, token_b = self.create_parallel_pools()
+        amount_in = 300_000_000
+
+        split = self.runner.call_view_method(
+            self.contract_id, 'find_best_split_swap', amount_in, token_a, token_b, 4, 3
+        )
+        single = self.runner.call_view_method(
+            self.contract_id, 'find_best_swap_path', amount_in, token_a, token_b, 3
+        )
+        assert len(split.paths) == 3
+        assert split.amount_out > single.amount_out
+
+        # No division on a coarse grid does better than the equalized split
+        best_grid = 0
+        step = amount_in // 60
+        for first in range(0, amount_in + 1, step):
+            for second in range(0, amount_in - first + 1, step):
+                amounts = [first, second, amount_in - first - second]
+                output = 0
+                for pool_key, amount in zip(self.signed_pool_keys, amounts):
+                    if amount > 0:
+                        output += self.hop_amount(pool_key, token_a, amount, False)[0] or 0
+                best_grid = max(best_grid, output)
+        assert split.amount_out >= best_grid
+
+        # A single route never gets split
+        one_route = self.runner.call_view_method(
+            self.contract_id, 'find_best_split_swap', amount_in, token_a, token_b, 1, 3
+        )
+        assert one_route.paths == [single.path]
+        assert one_route.amount_out == single.amount_out
+
+    def test_swap_exact_tokens_for_tokens_split(self) -> None:
+        token_a, token_b = self.create_parallel_pools()
+        amount_in = 300_000_000
+        split = self.runner.call_view_method(
+            self.contract_id, 'find_best_split_swap', amount_in, token_a, token_b, 4, 3
+        )
+        user_address = self.gen_random_address()
+
+        # The slippage check covers the total output of every leg
+        ctx = self.create_context(actions=[
+            NCDepositAction(token_uid=token_a, amount=amount_in),
+            NCWithdrawalAction(token_uid=token_b, amount=split.amount_out + 1),
+        ], caller_id=user_address, timestamp=2)
+        with pytest.raises(InvalidAction):
+            self.runner.call_public_method(
+                self.contract_id, 'swap_exact_tokens_for_tokens_split', ctx, split.paths, split.amounts_in, 10
+            )
+
+        # Amounts must add up to the deposit
+        ctx = self.create_context(actions=[
+            NCDepositAction(token_uid=token_a, amount=amount_in),
+            NCWithdrawalAction(token_uid=token_b, amount=1),
+        ], caller_id=user_address, timestamp=2)
+        with pytest.raises(InvalidAction):
+            self.runner.call_public_method(
+                self.contract_id, 'swap_exact_tokens_for_tokens_split', ctx, split.paths, [amount_in, 1, 1], 10
+            )
+
+        # Paths may not reuse a pool
+        with pytest.raises(InvalidPath):
+            self.runner.call_public_method(
+                self.contract_id, 'swap_exact_tokens_for_tokens_split', ctx,
+                [split.paths[0], split.paths[0]], [amount_in // 2, amount_in - amount_in // 2], 10
+            )
+
+        minimum_out = split.amount_out - 1_000
+        ctx = self.create_context(actions=[
+            NCDepositAction(token_uid=token_a, amount=amount_in),
+            NCWithdrawalAction(token_uid=token_b, amount=minimum_out),
+        ], caller_id=user_address, timestamp=2)
+        result = self.runner.call_public_method(
+            self.contract_id, 'swap_exact_tokens_for_tokens_split', ctx, split.paths, split.amounts_in, 10
+        )
+        assert result.amount_in == amount_in
+        assert result.amount_out == minimum_out
+        assert result.change_in == 1_000
+
+        # Change is kept in the last pool of the first path
+        first_last_pool = split.paths[0].split(',')[-1]
+        change_a, change_b = self.runner.call_view_method(
+            self.contract_id, 'change_of', user_address, first_last_pool
+        )
+        pool = self.get_contract().pools[first_last_pool]
+        assert (change_b if pool.token_b == token_b else change_a) == 1_000
@@ -20,6 +20,7 @@ from hathor.transaction.token_info import TokenVersion
 from hathor.util import not_none
 from hathor.conf import HathorSettings
 from hathor.wallet import KeyPair
+from hathor_tests.nanocontracts.blueprints.oasis_v1 import Oasis as OasisV1
 from hathor_tests.nanocontracts.blueprints.unittest import BlueprintTestCase
 from hathor.nanocontracts.context import Context
 from hathor.nanocontracts.exception import NCFail
@@ -4150,3 +4151,565 @@ class OasisTestCase(BlueprintTestCase):
 
         self.assertEqual(pool1_after.price_a_window_sum, expected_sum_a_pool1)
         self.assertEqual(pool2_after.price_a_window_sum, expected_sum_a_pool2)
+
+    def test_liquidity_snapshot_matches_pool_manager_views(self) -> None:
+        """get_liquidity_snapshot returns what Oasis used to read with four separate views."""
+        user_address, timelock, htr_amount, now = self.test_user_deposit()
+        pool_key = self._get_pool_key()
+        timestamp = self.get_current_timestamp()
+        amount_in = 5_000_00
+
+        snapshot = self.runner.call_view_method(
+            self.dozer_manager_id,
+            "get_liquidity_snapshot",
+            self.oasis_id,
+            pool_key,
+            self.token_b,
+            amount_in,
+            timestamp,
+        )
+        user_info = self.runner.call_view_method(
+            self.dozer_manager_id, "user_info", self.oasis_id, pool_key
+        )
+        reserves = self.runner.call_view_method(
+            self.dozer_manager_id, "get_reserves", HTR_UID, self.token_b, self.pool_fee
+        )
+        twap_price = self.runner.call_view_method(
+            self.dozer_manager_id, "get_twap_price", HTR_UID, self.token_b, self.pool_fee, timestamp
+        )
+        htr_price = self.runner.call_view_method(
+            self.dozer_manager_id, "get_token_price_in_usd", HTR_UID
+        )
+
+        self.assertEqual((snapshot.reserve_a, snapshot.reserve_b), reserves)
+        self.assertEqual(snapshot.liquidity, user_info.liquidity)
+        self.assertEqual(snapshot.token0Amount, user_info.token0Amount)
+        self.assertEqual(snapshot.token1Amount, user_info.token1Amount)
+        self.assertEqual(snapshot.twap_price_b, twap_price)
+        self.assertEqual(snapshot.htr_price_usd, htr_price)
+        self.assertEqual(snapshot.quote_amount, self._quote_add_liquidity_in(amount_in))
+
+        # Skipping the quote leaves the rest of the snapshot unchanged
+        no_quote = self.runner.call_view_method(
+            self.dozer_manager_id,
+            "get_liquidity_snapshot",
+            self.oasis_id,
+            pool_key,
+            self.token_b,
+            0,
+            timestamp,
+        )
+        self.assertEqual(no_quote, snapshot._replace(quote_amount=0))
+
+        # Oasis quotes from the same snapshot
+        quote = self.runner.call_view_method(
+            self.oasis_id, "front_quote_add_liquidity_in", amount_in, timelock, timestamp, user_address
+        )
+        self.assertEqual(quote.htr_amount, snapshot.quote_amount)
+
+    def test_users_info_matches_user_info(self) -> None:
+        """users_info answers every address like user_info does, from one snapshot."""
+        self.initialize_pool()
+        self.initialize_oasis(amount=10_000_000_00)
+
+        deposit_time = self.clock.seconds()
+        users = [self._get_any_address()[0] for _ in range(4)]
+        for i, user_address in enumerate(users):
+            ctx = self.create_context(
+                actions=[NCDepositAction(amount=1_000_00 * (i + 1), token_uid=self.token_b)],
+                vertex=self.tx,
+                caller_id=user_address,
+                timestamp=deposit_time,
+            )
+            self.runner.call_public_method(self.oasis_id, "user_deposit", ctx, 6)
+
+        # Close one position so the batch mixes open, closed and unknown addresses
+        close_time = deposit_time + 6 * MONTHS_IN_SECONDS
+        close_ctx = self.create_context(
+            actions=[], vertex=self.tx, caller_id=users[0], timestamp=close_time
+        )
+        self.runner.call_public_method(self.oasis_id, "close_position", close_ctx)
+
+        addresses = users + [self._get_any_address()[0]]
+        batch = self.runner.call_view_method(self.oasis_id, "users_info", addresses, close_time)
+        self.assertEqual(
+            batch,
+            [
+                self.runner.call_view_method(self.oasis_id, "user_info", address, close_time)
+                for address in addresses
+            ],
+        )
+        self.assertTrue(batch[0].position_closed)
+        self.assertEqual(batch[-1].user_deposit_b, 0)
+
+        with self.assertRaises(NCFail):
+            self.runner.call_view_method(
+                self.oasis_id,
+                "users_info",
+                [self._get_any_address()[0] for _ in range(101)],
+                close_time,
+            )
+
+    def test_positions_registry_and_stats(self) -> None:
+        """The depositor registry pages positions and the running aggregates follow every action."""
+        dev_initial_deposit = 10_000_000_00
+        self.initialize_pool()
+        self.initialize_oasis(amount=dev_initial_deposit)
+
+        deposit_time = self.clock.seconds()
+        timelocks = [6, 9, 12, 6, 12]
+        users = [self._get_any_address()[0] for _ in timelocks]
+        for i, (user_address, timelock) in enumerate(zip(users, timelocks)):
+            ctx = self.create_context(
+                actions=[NCDepositAction(amount=1_000_00 * (i + 1), token_uid=self.token_b)],
+                vertex=self.tx,
+                caller_id=user_address,
+                timestamp=deposit_time,
+            )
+            self.runner.call_public_method(self.oasis_id, "user_deposit", ctx, timelock)
+
+        # A repeated deposit adds to the position without registering the address again
+        ctx = self.create_context(
+            actions=[NCDepositAction(amount=500_00, token_uid=self.token_b)],
+            vertex=self.tx,
+            caller_id=users[0],
+            timestamp=deposit_time,
+        )
+        self.runner.call_public_method(self.oasis_id, "user_deposit", ctx, 9)
+
+        def expected_stats():
+            infos = [self._user_info(address) for address in users]
+            infos = [info for info in infos if info.user_deposit_b > 0]
+            open_infos = [info for info in infos if not info.position_closed]
+            closed_infos = [info for info in infos if info.position_closed]
+            return (
+                len(open_infos),
+                sum(info.user_deposit_b for info in open_infos),
+                sum(info.closed_balance_b for info in closed_infos),
+                sum(info.closed_balance_a for info in closed_infos),
+            )
+
+        stats = self.runner.call_view_method(self.oasis_id, "positions_stats")
+        self.assertEqual(stats.depositors, len(users))
+        self.assertEqual(
+            (stats.open_positions, stats.total_locked_b, stats.total_closed_b, stats.total_closed_htr),
+            expected_stats(),
+        )
+        self.assertEqual(
+            stats.total_bonus_paid,
+            sum(self._user_info(address).user_balance_a for address in users),
+        )
+        self.assertEqual(stats.locked_b_by_timelock, {6: 1_000_00 + 4_000_00, 9: 500_00 + 2_000_00, 12: 3_000_00 + 5_000_00})
+
+        # Close two positions and fully withdraw one of them
+        close_time = deposit_time + 12 * MONTHS_IN_SECONDS
+        for user_address in users[:2]:
+            close_ctx = self.create_context(
+                actions=[], vertex=self.tx, caller_id=user_address, timestamp=close_time
+            )
+            self.runner.call_public_method(self.oasis_id, "close_position", close_ctx)
+
+        user_info = self._user_info(users[1])
+        withdraw_ctx = self.create_context(
+            actions=[
+                NCWithdrawalAction(token_uid=self.token_b, amount=user_info.closed_balance_b),
+                NCWithdrawalAction(token_uid=TokenUid(HTR_UID), amount=user_info.closed_balance_a),
+            ],  # type: ignore
+            vertex=self.tx,
+            caller_id=users[1],
+            timestamp=close_time,
+        )
+        self.runner.call_public_method(self.oasis_id, "user_withdraw", withdraw_ctx)
+
+        stats = self.runner.call_view_method(self.oasis_id, "positions_stats")
+        self.assertEqual(
+            (stats.open_positions, stats.total_locked_b, stats.total_closed_b, stats.total_closed_htr),
+            expected_stats(),
+        )
+        self.assertEqual(stats.locked_b_by_timelock, {6: 4_000_00, 9: 0, 12: 3_000_00 + 5_000_00})
+
+        # Paging skips the fully withdrawn depositor and keeps first deposit order
+        listed = []
+        cursor = 0
+        while cursor is not None:
+            page = self.runner.call_view_method(self.oasis_id, "list_positions", cursor, 2)
+            listed.extend(page.positions)
+            cursor = page.next_cursor
+        self.assertEqual([position.address for position in listed], [users[0]] + users[2:])
+        self.assertTrue(listed[0].position_closed)
+        self.assertEqual(listed[0].closed_balance_b, self._user_info(users[0]).closed_balance_b)
+        self.assertEqual(listed[1].user_deposit_b, 3_000_00)
+
+        with self.assertRaises(NCFail):
+            self.runner.call_view_method(self.oasis_id, "list_positions", len(users) + 1, 10)
+
+    def test_unlock_schedule(self) -> None:
+        """Unlock buckets follow deposits, weighted re-timing and closes."""
+        self.initialize_pool()
+        self.initialize_oasis(amount=10_000_000_00)
+
+        deposit_time = self.clock.seconds()
+        users = [self._get_any_address()[0] for _ in range(3)]
+        paired_htr = {}
+
+        def deposit(user_address, amount, timelock, timestamp):
+            htr_amount = self._quote_add_liquidity_in(amount)
+            ctx = self.create_context(
+                actions=[NCDepositAction(amount=amount, token_uid=self.token_b)],
+                vertex=self.tx,
+                caller_id=user_address,
+                timestamp=timestamp,
+            )
+            self.runner.call_public_method(self.oasis_id, "user_deposit", ctx, timelock)
+            paired_htr[user_address] = paired_htr.get(user_address, 0) + htr_amount
+
+        def expected_schedule(timestamp):
+            buckets = {}
+            for user_address in users:
+                info = self._user_info(user_address, timestamp)
+                if info.user_liquidity == 0:
+                    continue
+                month = info.user_withdrawal_time // MONTHS_IN_SECONDS
+                amount_b, amount_htr, positions = buckets.get(month, (0, 0, 0))
+                buckets[month] = (
+                    amount_b + info.user_deposit_b,
+                    amount_htr + paired_htr[user_address],
+                    positions + 1,
+                )
+            return [
+                (month * MONTHS_IN_SECONDS,) + buckets[month] for month in sorted(buckets)
+            ]
+
+        def schedule(timestamp):
+            entries = self.runner.call_view_method(
+                self.oasis_id, "unlock_schedule", timestamp, timestamp + 13 * MONTHS_IN_SECONDS
+            )
+            return [tuple(entry) for entry in entries]
+
+        deposit(users[0], 1_000_00, 6, deposit_time)
+        deposit(users[1], 2_000_00, 12, deposit_time)
+        deposit(users[2], 3_000_00, 6, deposit_time)
+        self.assertEqual(schedule(deposit_time), expected_schedule(deposit_time))
+        self.assertEqual(sum(entry[4] for entry in schedule(deposit_time)), 3)
+
+        # A second deposit re-times the whole position to the weighted withdrawal time
+        later = deposit_time + 2 * MONTHS_IN_SECONDS
+        old_month = self._user_info(users[0], later).user_withdrawal_time // MONTHS_IN_SECONDS
+        deposit(users[0], 4_000_00, 12, later)
+        new_month = self._user_info(users[0], later).user_withdrawal_time // MONTHS_IN_SECONDS
+        self.assertNotEqual(old_month, new_month)
+        self.assertEqual(schedule(later), expected_schedule(later))
+
+        # Closing a position removes it from its bucket
+        close_time = deposit_time + 6 * MONTHS_IN_SECONDS
+        close_ctx = self.create_context(
+            actions=[], vertex=self.tx, caller_id=users[2], timestamp=close_time
+        )
+        self.runner.call_public_method(self.oasis_id, "close_position", close_ctx)
+        self.assertEqual(schedule(deposit_time), expected_schedule(close_time))
+        self.assertEqual(sum(entry[4] for entry in schedule(deposit_time)), 2)
+
+        # Ranges outside every bucket are empty, and overly long ranges are rejected
+        self.assertEqual(
+            self.runner.call_view_method(
+                self.oasis_id,
+                "unlock_schedule",
+                deposit_time - 3 * MONTHS_IN_SECONDS,
+                deposit_time - MONTHS_IN_SECONDS,
+            ),
+            [],
+        )
+        with self.assertRaises(NCFail):
+            self.runner.call_view_method(
+                self.oasis_id, "unlock_schedule", deposit_time, deposit_time + 60 * MONTHS_IN_SECONDS
+            )
+
+    def test_multiple_vaults(self) -> None:
+        """Vaults keep separate positions and aggregates while sharing the HTR treasury."""
+        dev_initial_deposit = 10_000_000_00
+        self.initialize_pool()
+        self.initialize_oasis(amount=dev_initial_deposit)
+
+        # A second HTR/token_c pool and its vault
+        token_c = self.gen_random_token_uid()
+        self.create_token(token_c, "token_c", "TKC", TokenVersion.DEPOSIT)
+        pool_ctx = self.create_context(
+            actions=[
+                NCDepositAction(amount=2_000_000, token_uid=TokenUid(HTR_UID)),
+                NCDepositAction(amount=5_000_000, token_uid=token_c),
+            ],  # type: ignore
+            vertex=self.tx,
+            caller_id=self.dev_address,
+            timestamp=self.get_current_timestamp(),
+        )
+        self.runner.call_public_method(self.dozer_manager_id, "create_pool", pool_ctx, self.pool_fee)
+
+        dev_ctx = self.create_context(
+            actions=[], vertex=self.tx, caller_id=self.dev_address, timestamp=self.get_current_timestamp()
+        )
+        user_ctx = self.create_context(
+            actions=[],
+            vertex=self.tx,
+            caller_id=self._get_any_address()[0],
+            timestamp=self.get_current_timestamp(),
+        )
+        with self.assertRaises(NCFail):
+            self.runner.call_public_method(self.oasis_id, "create_vault", user_ctx, token_c, self.pool_fee)
+        with self.assertRaises(NCFail):
+            self.runner.call_public_method(self.oasis_id, "create_vault", dev_ctx, self.token_b, self.pool_fee)
+        with self.assertRaises(NCFail):
+            self.runner.call_public_method(self.oasis_id, "create_vault", dev_ctx, token_c, Amount(5))
+
+        self.runner.call_public_method(self.oasis_id, "create_vault", dev_ctx, token_c, self.pool_fee)
+        self.assertEqual(self.runner.call_view_method(self.oasis_id, "get_vault_count"), 2)
+        self.assertEqual(self.runner.call_view_method(self.oasis_id, "get_vault_id", self.token_b, self.pool_fee), 0)
+        vault_id = self.runner.call_view_method(self.oasis_id, "get_vault_id", token_c, self.pool_fee)
+        self.assertEqual(vault_id, 1)
+
+        # One user deposits into both vaults, another only into the default one
+        deposit_time = self.clock.seconds()
+        user_address = self._get_any_address()[0]
+        other_address = self._get_any_address()[0]
+        ctx = self.create_context(
+            actions=[NCDepositAction(amount=1_000_00, token_uid=self.token_b)],
+            vertex=self.tx,
+            caller_id=user_address,
+            timestamp=deposit_time,
+        )
+        self.runner.call_public_method(self.oasis_id, "user_deposit", ctx, 6)
+        ctx = self.create_context(
+            actions=[NCDepositAction(amount=3_000_00, token_uid=self.token_b)],
+            vertex=self.tx,
+            caller_id=other_address,
+            timestamp=deposit_time,
+        )
+        self.runner.call_public_method(self.oasis_id, "vault_user_deposit", ctx, 0, 9)
+        ctx = self.create_context(
+            actions=[NCDepositAction(amount=2_000_00, token_uid=token_c)],
+            vertex=self.tx,
+            caller_id=user_address,
+            timestamp=deposit_time,
+        )
+        self.runner.call_public_method(self.oasis_id, "vault_user_deposit", ctx, vault_id, 12)
+
+        # Depositing the wrong token into a vault fails
+        ctx = self.create_context(
+            actions=[NCDepositAction(amount=1_000_00, token_uid=self.token_b)],
+            vertex=self.tx,
+            caller_id=user_address,
+            timestamp=deposit_time,
+        )
+        with self.assertRaises(NCFail):
+            self.runner.call_public_method(self.oasis_id, "vault_user_deposit", ctx, vault_id, 6)
+
+        default_info, vault_info = self.runner.call_view_method(
+            self.oasis_id, "user_vaults_info", user_address, [0, vault_id], deposit_time
+        )
+        self.assertEqual(default_info, self._user_info(user_address, deposit_time))
+        self.assertEqual(default_info.user_deposit_b, 1_000_00)
+        self.assertEqual(vault_info.user_deposit_b, 2_000_00)
+        self.assertEqual(
+            self.runner.call_view_method(self.oasis_id, "vault_users_info", 0, [user_address, other_address], deposit_time),
+            self.runner.call_view_method(self.oasis_id, "users_info", [user_address, other_address], deposit_time),
+        )
+        self.assertEqual(
+            self.runner.call_view_method(self.oasis_id, "vault_users_info", vault_id, [other_address], deposit_time)[0].user_deposit_b,
+            0,
+        )
+
+        # Both vaults pay bonuses and pair HTR from the shared treasury
+        oasis_contract = self.get_readonly_contract(self.oasis_id)
+        assert isinstance(oasis_contract, Oasis)
+        self.assertEqual(vault_info.oasis_htr_balance, oasis_contract.oasis_htr_balance)
+        other_info = self._user_info(other_address, deposit_time)
+        self.assertEqual(
+            self.oasis_storage.get_balance(HTR_UID).value,
+            oasis_contract.oasis_htr_balance
+            + default_info.user_balance_a
+            + vault_info.user_balance_a
+            + other_info.user_balance_a,
+        )
+
+        default_stats = self.runner.call_view_method(self.oasis_id, "positions_stats")
+        infos = self.runner.call_view_method(self.oasis_id, "vaults_info", [0, vault_id])
+        self.assertEqual(infos[0].stats, default_stats)
+        self.assertEqual(infos[1].token_b, token_c.hex())
+        self.assertEqual(infos[1].total_liquidity, vault_info.user_liquidity)
+        self.assertEqual(
+            (infos[1].stats.depositors, infos[1].stats.open_positions, infos[1].stats.total_locked_b),
+            (1, 1, 2_000_00),
+        )
+        self.assertEqual(infos[1].stats.locked_b_by_timelock, {6: 0, 9: 0, 12: 2_000_00})
+        self.assertEqual(
+            (default_stats.depositors, default_stats.open_positions, default_stats.total_locked_b),
+            (2, 2, 4_000_00),
+        )
+        self.assertEqual(
+            [position.address for position in self.runner.call_view_method(
+                self.oasis_id, "vault_list_positions", vault_id, 0, 10
+            ).positions],
+            [user_address],
+        )
+        with self.assertRaises(NCFail):
+            self.runner.call_view_method(self.oasis_id, "vaults_info", [vault_id + 1])
+
+        # Closing the default position leaves the other vault's position open
+        close_time = deposit_time + 6 * MONTHS_IN_SECONDS
+        close_ctx = self.create_context(
+            actions=[], vertex=self.tx, caller_id=user_address, timestamp=close_time
+        )
+        self.runner.call_public_method(self.oasis_id, "close_position", close_ctx)
+        with self.assertRaises(NCFail):
+            self.runner.call_public_method(self.oasis_id, "vault_close_position", close_ctx, vault_id)
+
+        default_info, vault_info = self.runner.call_view_method(
+            self.oasis_id, "user_vaults_info", user_address, [0, vault_id], close_time
+        )
+        self.assertTrue(default_info.position_closed)
+        self.assertFalse(vault_info.position_closed)
+        self.assertEqual(
+            self.runner.call_view_method(
+                self.oasis_id, "vault_unlock_schedule", vault_id, deposit_time, deposit_time + 13 * MONTHS_IN_SECONDS
+            )[0].positions,
+            1,
+        )
+
+        # The other vault closes and withdraws in its own token
+        close_ctx = self.create_context(
+            actions=[], vertex=self.tx, caller_id=user_address, timestamp=deposit_time + 12 * MONTHS_IN_SECONDS
+        )
+        self.runner.call_public_method(self.oasis_id, "vault_close_position", close_ctx, vault_id)
+        vault_info = self.runner.call_view_method(
+            self.oasis_id, "vault_users_info", vault_id, [user_address], close_time
+        )[0]
+        withdraw_ctx = self.create_context(
+            actions=[NCWithdrawalAction(token_uid=token_c, amount=vault_info.closed_balance_b)],  # type: ignore
+            vertex=self.tx,
+            caller_id=user_address,
+            timestamp=deposit_time + 12 * MONTHS_IN_SECONDS,
+        )
+        self.runner.call_public_method(self.oasis_id, "vault_user_withdraw", withdraw_ctx, vault_id)
+        self.assertEqual(
+            self.runner.call_view_method(
+                self.oasis_id, "vault_users_info", vault_id, [user_address], close_time
+            )[0].closed_balance_b,
+            0,
+        )
+        user_info = self._user_info(user_address, close_time)
+        self.assertTrue(user_info.position_closed)
+        self.assertEqual(user_info.closed_balance_b, default_info.closed_balance_b)
+
+    def test_upgrade_from_v1(self) -> None:
+        """Positions opened on the 1.0.0 layout keep working after an upgrade and migrate on first write."""
+        self.initialize_pool()
+        v1_blueprint_id = self._register_blueprint_class(OasisV1)
+        dev_ctx = self.create_context(
+            actions=[NCDepositAction(token_uid=HTR_UID, amount=10_000_000_00)],  # type: ignore
+            vertex=self.tx,
+            caller_id=self.dev_address,
+            timestamp=self.get_current_timestamp(),
+        )
+        self.runner.create_contract(
+            self.oasis_id, v1_blueprint_id, dev_ctx, self.dozer_manager_id, self.token_b, self.pool_fee, 50
+        )
+
+        deposit_time = self.clock.seconds()
+        closed_address, open_address, idle_address = [self._get_any_address()[0] for _ in range(3)]
+        for address, amount, timelock in ((closed_address, 1_000_00, 6), (open_address, 3_000_00, 12), (idle_address, 2_000_00, 9)):
+            ctx = self.create_context(
+                actions=[NCDepositAction(amount=amount, token_uid=self.token_b)],
+                vertex=self.tx,
+                caller_id=address,
+                timestamp=deposit_time,
+            )
+            self.runner.call_public_method(self.oasis_id, "user_deposit", ctx, timelock)
+        close_time = deposit_time + 6 * MONTHS_IN_SECONDS
+        close_ctx = self.create_context(
+            actions=[], vertex=self.tx, caller_id=closed_address, timestamp=close_time
+        )
+        self.runner.call_public_method(self.oasis_id, "close_position", close_ctx)
+
+        addresses = [closed_address, open_address, idle_address, self.dev_address]
+        infos = [self._user_info(address, close_time) for address in addresses]
+        total_liquidity = self.runner.call_view_method(self.oasis_id, "oasis_info").total_liquidity
+
+        dev_ctx = self.create_context(
+            actions=[], vertex=self.tx, caller_id=self.dev_address, timestamp=close_time
+        )
+        self.runner.call_public_method(self.oasis_id, "upgrade_contract", dev_ctx, self.oasis_blueprint_id, "1.1.0")
+
+        # Every view answers from the legacy layout before anything is written
+        self.assertEqual(self.runner.call_view_method(self.oasis_id, "users_info", addresses, close_time), infos)
+        self.assertEqual(self.runner.call_view_method(self.oasis_id, "get_vault_count"), 1)
+        stats = self.runner.call_view_method(self.oasis_id, "positions_stats")
+        self.assertEqual((stats.depositors, stats.open_positions, stats.total_locked_b), (0, 0, 0))
+        self.assertEqual(stats.unmigrated_liquidity, total_liquidity)
+
+        # A deposit migrates the position on its way, keeping the pre-upgrade part out of the timelock split
+        ctx = self.create_context(
+            actions=[NCDepositAction(amount=1_000_00, token_uid=self.token_b)],
+            vertex=self.tx,
+            caller_id=open_address,
+            timestamp=close_time,
+        )
+        self.runner.call_public_method(self.oasis_id, "user_deposit", ctx, 6)
+        open_info = self._user_info(open_address, close_time)
+        new_deposit = open_info.user_deposit_b - infos[1].user_deposit_b
+        stats = self.runner.call_view_method(self.oasis_id, "positions_stats")
+        self.assertEqual((stats.depositors, stats.open_positions), (1, 1))
+        self.assertEqual(stats.total_locked_b, open_info.user_deposit_b)
+        self.assertEqual(stats.locked_b_by_timelock, {6: new_deposit, 9: 0, 12: 0})
+        self.assertEqual(stats.legacy_locked_b, infos[1].user_deposit_b)
+        self.assertEqual(stats.total_bonus_paid, open_info.user_balance_a)
+        self.assertEqual(stats.unmigrated_liquidity, total_liquidity - infos[1].user_liquidity)
+        infos = self.runner.call_view_method(self.oasis_id, "users_info", addresses, close_time)
+
+        user_ctx = self.create_context(
+            actions=[], vertex=self.tx, caller_id=closed_address, timestamp=close_time
+        )
+        with self.assertRaises(NCFail):
+            self.runner.call_public_method(self.oasis_id, "migrate_to_vaults", user_ctx, addresses)
+
+        # The dev migrates the rest in batches, repeated addresses are skipped
+        self.runner.call_public_method(self.oasis_id, "migrate_to_vaults", dev_ctx, addresses[:1])
+        self.runner.call_public_method(self.oasis_id, "migrate_to_vaults", dev_ctx, addresses)
+        self.runner.call_public_method(self.oasis_id, "migrate_to_vaults", dev_ctx, addresses)
+        self.assertEqual(self.runner.call_view_method(self.oasis_id, "users_info", addresses, close_time), infos)
+
+        stats = self.runner.call_view_method(self.oasis_id, "positions_stats")
+        self.assertEqual((stats.depositors, stats.open_positions), (3, 2))
+        self.assertEqual(stats.total_locked_b, open_info.user_deposit_b + infos[2].user_deposit_b)
+        self.assertEqual(stats.legacy_locked_b, open_info.user_deposit_b - new_deposit + infos[2].user_deposit_b)
+        self.assertEqual(stats.total_bonus_paid, open_info.user_balance_a + infos[2].user_balance_a)
+        self.assertEqual(
+            (stats.total_closed_b, stats.total_closed_htr), (infos[0].closed_balance_b, infos[0].closed_balance_a)
+        )
+        self.assertEqual(stats.unmigrated_liquidity, 0)
+        schedule = self.runner.call_view_method(
+            self.oasis_id, "unlock_schedule", close_time, close_time + 13 * MONTHS_IN_SECONDS
+        )
+        self.assertEqual(sum(entry.positions for entry in schedule), 2)
+        self.assertEqual(sum(entry.amount_b for entry in schedule), stats.total_locked_b)
+
+        oasis_contract = self.get_readonly_contract(self.oasis_id)
+        assert isinstance(oasis_contract, Oasis)
+        self.assertEqual(oasis_contract.total_liquidity, 0)
+        for address in addresses:
+            self.assertNotIn(address, oasis_contract.user_deposit_b)
+            self.assertNotIn(address, oasis_contract.user_balances)
+
+        # The closed position withdraws and leaves the registry
+        withdraw_ctx = self.create_context(
+            actions=[
+                NCWithdrawalAction(token_uid=self.token_b, amount=infos[0].closed_balance_b),
+                NCWithdrawalAction(token_uid=TokenUid(HTR_UID), amount=infos[0].closed_balance_a),
+            ],  # type: ignore
+            vertex=self.tx,
+            caller_id=closed_address,
+            timestamp=close_time,
+        )
+        self.runner.call_public_method(self.oasis_id, "user_withdraw", withdraw_ctx)
+        page = self.runner.call_view_method(self.oasis_id, "list_positions", 0, 10)
+        self.assertEqual([position.address for position in page.positions], [open_address, idle_address])
+        stats = self.runner.call_view_method(self.oasis_id, "positions_stats")
+        self.assertEqual((stats.total_closed_b, stats.total_closed_htr), (0, 0))